@@ -4,7 +4,10 @@ from .ant import Colony  # noqa: F401
 from .solvers import Solver  # noqa: F401
 from .solvers import Solution  # noqa: F401
 from .solvers import SolverPlugin  # noqa: F401
+from . import initializers  # noqa: F401
+from . import pheromone  # noqa: F401
 from . import plugins  # noqa: F401
+from . import sparse  # noqa: F401
 from . import utils  # noqa: F401
 
 
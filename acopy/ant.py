@@ -3,7 +3,9 @@ import sys
 import itertools
 import bisect
 import random
+import collections
 
+from .utils import IndexedSet
 from .utils import positive
 from .solvers import Solution
 
@@ -18,9 +20,16 @@ class Ant:
     :param float beta: how much distance matters
     """
 
+    #: type of solution built by the ant
+    solution_class = Solution
+
+    #: whether to reuse the same solution for every tour
+    pooled = False
+
     def __init__(self, alpha=1, beta=3):
         self.alpha = alpha
         self.beta = beta
+        self._solution = None
 
     @property
     def alpha(self):
@@ -43,18 +52,21 @@ class Ant:
     def __repr__(self):
         return f'Ant(alpha={self.alpha}, beta={self.beta})'
 
-    def tour(self, graph):
+    def tour(self, graph, pheromone=None):
         """Find a solution to the given graph.
 
         :param graph: the graph to solve
         :type graph: :class:`networkx.Graph`
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
         :return: one solution
         :rtype: :class:`~acopy.solvers.Solution`
         """
         solution = self.initialize_solution(graph)
         unvisited = self.get_unvisited_nodes(graph, solution)
         while unvisited:
-            node = self.choose_destination(graph, solution.current, unvisited)
+            node = self.choose_destination(graph, solution.current, unvisited,
+                                           pheromone=pheromone)
             solution.add_node(node)
             unvisited.remove(node)
         solution.close()
@@ -63,13 +75,23 @@ class Ant:
     def initialize_solution(self, graph):
         """Return a newly initialized solution for the given graph.
 
+        A pooled ant resets and returns the solution of its previous tour of
+        the same graph.
+
         :param graph: the graph to solve
         :type graph: :class:`networkx.Graph`
         :return: intialized solution
         :rtype: :class:`~acopy.solvers.Solution`
         """
         start = self.get_starting_node(graph)
-        return Solution(graph, start, ant=self)
+        solution = self._solution
+        if self.pooled and solution is not None and solution.graph is graph:
+            solution.reset(start)
+            return solution
+        solution = self.solution_class(graph, start, ant=self)
+        if self.pooled:
+            self._solution = solution
+        return solution
 
     def get_starting_node(self, graph):
         """Return a starting node for an ant.
@@ -96,36 +118,41 @@ class Ant:
                 nodes.append(node)
         return nodes
 
-    def choose_destination(self, graph, current, unvisited):
+    def choose_destination(self, graph, current, unvisited, pheromone=None):
         """Return the next node.
 
         :param graph: the graph being solved
         :type graph: :class:`networkx.Graph`
         :param current: starting node
         :param list unvisited: available nodes
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
         :return: chosen edge
         """
         if len(unvisited) == 1:
             return unvisited[0]
-        scores = self.get_scores(graph, current, unvisited)
+        scores = self.get_scores(graph, current, unvisited,
+                                 pheromone=pheromone)
         return self.choose_node(unvisited, scores)
 
-    def get_scores(self, graph, current, destinations):
+    def get_scores(self, graph, current, destinations, pheromone=None):
         """Return scores for the given destinations.
 
         :param graph: the graph being solved
         :type graph: :class:`networkx.Graph`
         :param current: the node from which to score the destinations
         :param list destinations: available, unvisited nodes
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
         :return: scores
         :rtype: list
         """
-        scores = []
-        for node in destinations:
-            edge = graph.edges[current, node]
-            score = self.score_edge(edge)
-            scores.append(score)
-        return scores
+        edges = graph[current]
+        if pheromone is None:
+            return [self.score_edge(edges[node]) for node in destinations]
+        levels = pheromone.get_levels(current, destinations)
+        return [self.score(edges[node].get('weight', 1), level)
+                for node, level in zip(destinations, levels)]
 
     def choose_node(self, choices, scores):
         """Return one of the choices.
@@ -148,12 +175,172 @@ class Ant:
         :return: score
         :rtype: float
         """
-        weight = edge.get('weight', 1)
+        return self.score(edge.get('weight', 1), edge['pheromone'])
+
+    def score(self, weight, level):
+        """Return the score for an edge with the given weight and pheromone.
+
+        :param float weight: the weight of the edge
+        :param float level: the pheromone on the edge
+        :return: score
+        :rtype: float
+        """
         if weight == 0:
             return sys.float_info.max
-        pre = 1 / weight
-        post = edge['pheromone']
-        return post ** self.alpha * pre ** self.beta
+        return level ** self.alpha * (1 / weight) ** self.beta
+
+
+class HeuristicCache:
+    """Least recently used cache of heuristic tables.
+
+    The heuristic table for a given beta holds ``(1 / weight) ** beta`` for
+    every edge of the graph, so ants that share a beta can score edges without
+    raising the weight to a power each time. Edges without weight hold
+    ``None``, as their score does not depend on the pheromone (see
+    :meth:`Ant.score`). Only the tables for the most recently used values of
+    beta are kept.
+
+    :param int size: maximum number of tables to keep
+    """
+
+    def __init__(self, size=8):
+        self.size = size
+        self.graph = None
+        self.tables = collections.OrderedDict()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(size={self.size})'
+
+    def get(self, graph, beta):
+        """Return the heuristic table for the graph and beta.
+
+        :param graph: the graph being solved
+        :type graph: :class:`networkx.Graph`
+        :param float beta: how much distance matters
+        :return: map of heuristic values by node by node
+        :rtype: dict
+        """
+        if graph is not self.graph:
+            self.clear()
+            self.graph = graph
+        try:
+            self.tables.move_to_end(beta)
+        except KeyError:
+            self.tables[beta] = self._build(graph, beta)
+            if len(self.tables) > self.size:
+                self.tables.popitem(last=False)
+        return self.tables[beta]
+
+    def clear(self):
+        """Forget every table, such as after the weights have changed."""
+        self.tables.clear()
+
+    def _build(self, graph, beta):
+        table = {}
+        for u, edges in graph.adjacency():
+            row = table[u] = {}
+            for v, edge in edges.items():
+                weight = edge.get('weight', 1)
+                row[v] = (1 / weight) ** beta if weight else None
+        return table
+
+
+class FastAnt(Ant):
+    """An ant for complete graphs.
+
+    Unvisited nodes are kept in an :class:`~acopy.utils.IndexedSet` so
+    removing the chosen node takes constant time rather than a linear search
+    of a list. The choice of node follows the same distribution as
+    :meth:`~Ant.choose_node`.
+
+    Given a :class:`HeuristicCache`, edges are scored from the shared
+    heuristic table for the beta of the ant.
+
+    :param float alpha: how much pheromone matters
+    :param float beta: how much distance matters
+    :param heuristics: shared heuristic tables
+    :type heuristics: :class:`HeuristicCache`
+    """
+
+    def __init__(self, alpha=1, beta=3, heuristics=None):
+        super().__init__(alpha=alpha, beta=beta)
+        self.heuristics = heuristics
+        self._unvisited = None
+
+    def __repr__(self):
+        return f'FastAnt(alpha={self.alpha}, beta={self.beta})'
+
+    def tour(self, graph, pheromone=None):
+        """Find a solution to the given complete graph.
+
+        :param graph: the graph to solve
+        :type graph: :class:`networkx.Graph`
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: one solution
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        solution = self.initialize_solution(graph)
+        unvisited = self._get_unvisited()
+        unvisited.reset(n for n in graph.nodes if n not in solution)
+        while len(unvisited) > 1:
+            scores = self.get_scores(graph, solution.current, unvisited,
+                                     pheromone=pheromone)
+            solution.add_node(unvisited.pop(self.choose_index(scores)))
+        if unvisited:
+            solution.add_node(unvisited.pop())
+        solution.close()
+        return solution
+
+    def choose_index(self, scores):
+        """Return the index of one of the scores.
+
+        :param list scores: the scores of the unvisited nodes
+        :return: index of the chosen score
+        :rtype: int
+        """
+        cumdist = list(itertools.accumulate(scores))
+        index = bisect.bisect(cumdist, random.random() * cumdist[-1])
+        return min(index, len(scores) - 1)
+
+    def _get_unvisited(self):
+        if self.pooled and self._unvisited is not None:
+            return self._unvisited
+        unvisited = IndexedSet()
+        if self.pooled:
+            self._unvisited = unvisited
+        return unvisited
+
+    def get_scores(self, graph, current, destinations, pheromone=None):
+        """Return scores for the given destinations.
+
+        :param graph: the graph being solved
+        :type graph: :class:`networkx.Graph`
+        :param current: the node from which to score the destinations
+        :param list destinations: available, unvisited nodes
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: scores
+        :rtype: list
+        """
+        if self.heuristics is None:
+            return super().get_scores(graph, current, destinations,
+                                      pheromone=pheromone)
+        table = self.heuristics.get(graph, self.beta)[current]
+        alpha = self.alpha
+        if pheromone is None:
+            edges = graph[current]
+            levels = (edges[node]['pheromone'] for node in destinations)
+        else:
+            levels = pheromone.get_levels(current, destinations)
+        scores = []
+        for node, level in zip(destinations, levels):
+            heuristic = table[node]
+            if heuristic is None:
+                scores.append(sys.float_info.max)
+            else:
+                scores.append(level ** alpha * heuristic)
+        return scores
 
 
 class Colony:
@@ -166,6 +353,9 @@ class Colony:
     :param float beta: relative factor for edge weight
     """
 
+    #: type of ant produced by the colony
+    ant_class = Ant
+
     def __init__(self, alpha=1, beta=3):
         self.alpha = alpha
         self.beta = beta
@@ -180,4 +370,24 @@ class Colony:
         :param int count: number of ants to return
         :rtype: list
         """
-        return [Ant(**vars(self)) for __ in range(count)]
+        return [self.ant_class(**vars(self)) for __ in range(count)]
+
+
+class FastColony(Colony):
+    """Colony of :class:`~acopy.ant.FastAnt` s.
+
+    The ants share a :class:`HeuristicCache`, which pays off when many ants
+    have the same beta (see the ``step`` and ``buckets`` of
+    :class:`~acopy.plugins.Darwin`).
+
+    :param float alpha: relative factor for edge pheromone
+    :param float beta: relative factor for edge weight
+    :param int cache_size: number of heuristic tables to keep (0 to not
+                           cache them)
+    """
+
+    ant_class = FastAnt
+
+    def __init__(self, alpha=1, beta=3, cache_size=8):
+        super().__init__(alpha=alpha, beta=beta)
+        self.heuristics = HeuristicCache(cache_size) if cache_size else None
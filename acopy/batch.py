@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""Solve many graph files in parallel."""
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import random
+
+from . import plugins
+from .utils import data
+
+
+#: fields of each result
+FIELDS = ['path', 'cost', 'iterations', 'seconds', 'seed', 'error']
+
+
+def find_files(pattern):
+    """Return the files in a directory or matching a glob pattern.
+
+    A leading ``~`` is expanded to the home directory, since the shell leaves
+    it alone in quoted patterns.
+
+    :param str pattern: directory or glob pattern
+    :return: sorted file paths
+    :rtype: list
+    """
+    pattern = os.path.expanduser(pattern)
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, '*')
+    return sorted(p for p in glob.glob(pattern) if os.path.isfile(p))
+
+
+def get_seed(seed, path):
+    """Return the seed for one file of a batch.
+
+    The seed depends only on the batch seed and the name of the file, so
+    results do not depend on which worker solves which file or when.
+
+    :param str seed: the seed for the batch
+    :param str path: path to the file
+    :rtype: str
+    """
+    return f'{seed}:{os.path.basename(path)}'
+
+
+def solve_file(path, format_, solver, colony, gen_size=None, limit=None,
+               seed=None):
+    """Solve the graph in a file.
+
+    :param str path: path to the file
+    :param str format_: format of the file
+    :param solver: solver to use
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony from which to source the ants
+    :type colony: :class:`~acopy.ant.Colony`
+    :param int gen_size: number of ants to use
+    :param int limit: maximum number of iterations
+    :param str seed: random seed
+    :return: result with the fields in :data:`FIELDS`
+    :rtype: dict
+    """
+    result = dict.fromkeys(FIELDS)
+    result.update(path=path, seed=seed)
+    try:
+        random.seed(seed)
+        graph = data.read_graph_data(path, format_)
+        timer = plugins.Timer()
+        solver.add_plugin(timer)
+        best = solver.solve(graph, colony, gen_size=gen_size, limit=limit)
+    except Exception as e:
+        result['error'] = f'{e.__class__.__name__}: {e}'
+    else:
+        result.update(cost=best.cost if best else None,
+                      iterations=timer.iterations,
+                      seconds=timer.duration)
+    return result
+
+
+def _solve_task(task):
+    return solve_file(**task)
+
+
+def solve_files(paths, format_, solver, colony, gen_size=None, limit=None,
+                seed=None, workers=None):
+    """Solve the graphs in many files using a pool of processes.
+
+    The largest files are handed out first and each idle worker takes the
+    next file as soon as it is done, so a few large files do not leave the
+    other workers idle at the end.
+
+    :param list paths: paths to the files
+    :param str format_: format of the files
+    :param solver: solver to use (copied for each file)
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony from which to source the ants
+    :type colony: :class:`~acopy.ant.Colony`
+    :param int gen_size: number of ants to use
+    :param int limit: maximum number of iterations per file
+    :param str seed: random seed for the batch
+    :param int workers: number of processes (default is one per CPU)
+    :return: results as they complete
+    :rtype: iter
+    """
+    if seed is None:
+        seed = str(random.getrandbits(64))
+    paths = sorted(paths, key=os.path.getsize, reverse=True)
+    tasks = [{
+        'path': path,
+        'format_': format_,
+        'solver': solver,
+        'colony': colony,
+        'gen_size': gen_size,
+        'limit': limit,
+        'seed': get_seed(seed, path),
+    } for path in paths]
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_solve_task, tasks, chunksize=1)
+
+
+class SummaryWriter:
+    """Write results as CSV or JSON lines, one result at a time.
+
+    :param file: writable text file
+    :param str format_: either ``'csv'`` or ``'jsonl'``
+    """
+
+    def __init__(self, file, format_='csv'):
+        self.file = file
+        self.format = format_
+        if format_ == 'csv':
+            self._writer = csv.DictWriter(file, fieldnames=FIELDS)
+            self._writer.writeheader()
+
+    def write(self, result):
+        """Write and flush a single result.
+
+        :param dict result: the result to write
+        """
+        if self.format == 'csv':
+            self._writer.writerow(result)
+        else:
+            self.file.write(json.dumps(result) + '\n')
+        self.file.flush()
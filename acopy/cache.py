@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""Cache the results of solving the same graph again and again.
+
+Results are stored on disk under a key derived from the content of the graph
+and everything else that decides the result: the parameters of the solver
+and colony, the plugins, the number of ants, the seed, and the number of
+iterations. A repeated request is answered from the cache without solving.
+
+Each result also keeps the pheromone levels and random state at the end of
+its run, so a request that differs only in asking for more iterations resumes
+from the longest cached run instead of starting over. A resumed run is a
+continuation of the cached one, but it is not always identical to a run of
+all the iterations from scratch (the ants and plugins start afresh).
+
+When the cache grows beyond its size, the least recently used results are
+evicted.
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+
+from .plugins import PheromoneExchange
+from .solvers import Solution
+
+
+def get_graph_hash(graph, weight='weight'):
+    """Return a hash of the nodes and edge weights of a graph.
+
+    The hash does not depend on the order in which nodes or edges were added.
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    :param str weight: name of the edge attribute holding the weight
+    :return: hexadecimal digest
+    :rtype: str
+    """
+    directed = graph.is_directed()
+    edges = []
+    for u, v, w in graph.edges(data=weight, default=1):
+        u, v = repr(u), repr(v)
+        if not directed and v < u:
+            u, v = v, u
+        edges.append((u, v, w))
+    content = {
+        'directed': directed,
+        'nodes': sorted(map(repr, graph.nodes)),
+        'edges': sorted(edges),
+    }
+    return _hash(content)
+
+
+def get_params(solver, colony, gen_size=None, seed=None):
+    """Return everything besides the graph and limit that decides a result.
+
+    :param solver: the solver
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: the colony
+    :type colony: :class:`~acopy.ant.Colony`
+    :param int gen_size: number of ants
+    :param str seed: random seed
+    :rtype: dict
+    """
+    return {
+        'solver': {
+            'class': solver.__class__.__qualname__,
+            'rho': solver.rho,
+            'q': solver.q,
+            'top': solver.top,
+            'init': _get_init_params(solver.init),
+            'store': repr(solver.store),
+            'pooled': solver.pooled,
+            'top_only': solver.top_only,
+        },
+        'colony': repr(colony),
+        'plugins': [repr(plugin) for plugin in solver.get_plugins()],
+        'gen_size': gen_size,
+        'seed': seed,
+    }
+
+
+class ResultCache:
+    """Content-addressed cache of solver results on disk.
+
+    Results without a limit or a seed are never cached, since their runs end
+    only when a plugin stops them or differ from one run to the next.
+
+    :param str path: directory of the cache (created if necessary)
+    :param int max_size: most bytes of results to keep
+    """
+
+    def __init__(self, path, max_size=100 * 2 ** 20):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.resumes = 0
+        os.makedirs(path, exist_ok=True)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(path={self.path!r}, '
+                f'max_size={self.max_size})')
+
+    def solve(self, solver, graph, colony, gen_size=None, limit=None,
+              seed=None):
+        """Return the best solution, from the cache if possible.
+
+        :param solver: solver to use
+        :type solver: :class:`~acopy.solvers.Solver`
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :param colony: colony from which to source the ants
+        :type colony: :class:`~acopy.ant.Colony`
+        :param int gen_size: number of ants to use
+        :param int limit: number of iterations to perform
+        :param str seed: random seed
+        :return: best solution found
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        if limit is None or seed is None:
+            self.misses += 1
+            random.seed(seed)
+            return solver.solve(graph, colony, gen_size=gen_size,
+                                limit=limit)
+
+        key = _hash({'graph': get_graph_hash(graph),
+                     **get_params(solver, colony, gen_size, seed)})
+        entry = self.get(key, limit)
+        if entry is not None:
+            self.hits += 1
+            return self._get_solution(graph, entry)
+
+        edges = list(graph.edges)
+        previous = self.get_latest(key, limit)
+        if previous is None:
+            self.misses += 1
+            random.seed(seed)
+            exchange = PheromoneExchange(edges)
+            iterations = limit
+        else:
+            self.resumes += 1
+            random.setstate(_to_state(previous['random_state']))
+            exchange = PheromoneExchange(edges, previous['levels'])
+            iterations = limit - previous['limit']
+
+        solver.add_plugin(exchange)
+        try:
+            best = solver.solve(graph, colony, gen_size=gen_size,
+                                limit=iterations)
+        finally:
+            solver.plugins.pop(exchange.__class__.__qualname__, None)
+        if previous is not None:
+            cached = self._get_solution(graph, previous)
+            if best is None or (cached is not None and cached < best):
+                best = cached
+
+        self.put(key, limit, {
+            'limit': limit,
+            'tour': best.nodes if best else None,
+            'cost': best.cost if best else None,
+            'levels': exchange.final,
+            'random_state': random.getstate(),
+        })
+        return best
+
+    def get(self, key, limit):
+        """Return a cached result and mark it as recently used.
+
+        :param str key: key of the request without the limit
+        :param int limit: number of iterations
+        :return: the result or ``None`` if it is not cached
+        :rtype: dict
+        """
+        path = self._get_path(key, limit)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            # another process may have evicted the result meanwhile
+            return None
+        return entry
+
+    def get_latest(self, key, limit):
+        """Return the cached result with the most iterations below a limit.
+
+        :param str key: key of the request without the limit
+        :param int limit: number of iterations
+        :return: the result or ``None`` if there is none
+        :rtype: dict
+        """
+        limits = []
+        prefix = f'{key}-'
+        for name in os.listdir(self.path):
+            if name.startswith(prefix) and name.endswith('.json'):
+                cached = int(name[len(prefix):-len('.json')])
+                if cached < limit:
+                    limits.append(cached)
+        for cached in sorted(limits, reverse=True):
+            entry = self.get(key, cached)
+            if entry is not None:
+                return entry
+        return None
+
+    def put(self, key, limit, entry):
+        """Store a result and evict old results if the cache is too big.
+
+        :param str key: key of the request without the limit
+        :param int limit: number of iterations
+        :param dict entry: the result
+        """
+        fd, temp = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(temp, self._get_path(key, limit))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used results until the cache fits.
+
+        Results that another process removes meanwhile are skipped.
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, name))
+        size = sum(entry[1] for entry in entries)
+        for __, file_size, name in sorted(entries):
+            if size <= self.max_size:
+                break
+            self._remove(name)
+            size -= file_size
+
+    def clear(self):
+        """Remove every result."""
+        for name in os.listdir(self.path):
+            if name.endswith('.json'):
+                self._remove(name)
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.path, name))
+        except FileNotFoundError:
+            pass
+
+    def _get_path(self, key, limit):
+        return os.path.join(self.path, f'{key}-{limit}.json')
+
+    def _get_solution(self, graph, entry):
+        if entry['tour'] is None:
+            return None
+        return Solution.from_nodes(graph, _to_nodes(graph, entry['tour']))
+
+
+def _hash(content):
+    data = json.dumps(content, sort_keys=True, default=repr)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _get_init_params(init):
+    # the repr of an initializer may leave out what decides the levels (such
+    # as the nodes of seed tours), so its attributes are part of the key too
+    if init is None:
+        return None
+    return {'class': init.__class__.__qualname__, **vars(init)}
+
+
+def _to_state(value):
+    # JSON turns the tuples of the random state into lists
+    version, internal, gauss_next = value
+    return version, tuple(internal), gauss_next
+
+
+def _to_nodes(graph, tour):
+    # JSON may have turned the nodes into other types (such as tuples into
+    # lists), so they are matched by their representation
+    nodes = {repr(node): node for node in graph.nodes}
+    return [nodes[repr(_to_tuple(node))] for node in tour]
+
+
+def _to_tuple(value):
+    if isinstance(value, list):
+        return tuple(_to_tuple(v) for v in value)
+    return value
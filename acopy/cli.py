@@ -1,27 +1,107 @@
 # -*- coding: utf-8 -*-
 
 """Console script for acopy."""
+import sys
 import time
 import random
 
 import click
 
 from . import ant
+from . import batch as batch_
+from . import initializers
 from . import solvers
 from . import plugins
+from . import preprocessing
+from . import tuning
 from . import utils
 
 
+class GraphFormat(click.ParamType):
+    """Format of a graph file, checked only when one is given.
+
+    The supported formats depend on networkx, which is slow to import, so
+    they are not listed as choices up front.
+    """
+
+    name = 'format'
+
+    def convert(self, value, param, ctx):
+        formats = utils.data.get_formats()
+        if value not in formats:
+            self.fail(f'{value!r} is not one of {", ".join(formats)}', param,
+                      ctx)
+        return value
+
+
+GRAPH_FORMAT = GraphFormat()
+
+
+def load_config(ctx, param, value):
+    if value is not None:
+        try:
+            config = tuning.load_config(value)
+        except (OSError, ValueError) as e:
+            raise click.BadParameter(f'cannot load {value}: {e}')
+        ctx.default_map = {**(ctx.default_map or {}), **config}
+    return value
+
+
 def solver_options(f):
+    click.option('--config',
+                 type=click.Path(dir_okay=False),
+                 default=None,
+                 is_eager=True,
+                 expose_value=False,
+                 callback=load_config,
+                 help='JSON file with default values for the solver options '
+                      '(such as one written by the tune command)')(f)
     click.option('--seed',
                  type=str,
                  default=None,
                  help='set the random seed')(f)
+    click.option('--init',
+                 type=click.Choice(['zero', 'nn', 'greedy']),
+                 default='zero',
+                 show_default=True,
+                 help='initial pheromone levels: none, or 1/(n*C) where C '
+                      'is the cost of a nearest neighbor or greedy edge '
+                      'tour')(f)
+    click.option('--emit',
+                 type=str,
+                 default=None,
+                 metavar='TARGET',
+                 help='write each new best solution as a line of JSON to a '
+                      'file, to a unix socket given as unix:PATH, or to '
+                      'stdout given as -')(f)
+    click.option('--collapse',
+                 type=float,
+                 default=None,
+                 metavar='TOLERANCE',
+                 help='collapse nodes within this weight of each other '
+                      'before solving and visit them together')(f)
+    click.option('--memprofile',
+                 default=False,
+                 is_flag=True,
+                 help='account for the memory used by each phase and '
+                      'component of the solver, writing a sample as a line '
+                      'of JSON to stderr every 50 iterations and a report '
+                      'at the end (set PYTHONTRACEMALLOC=1 to trace every '
+                      'iteration, at a much higher cost)')(f)
+    click.option('--metrics-file',
+                 type=click.Path(dir_okay=False),
+                 default=None,
+                 help='file to which metrics are written periodically in '
+                      'the OpenMetrics text format')(f)
+    click.option('--live',
+                 default=False,
+                 is_flag=True,
+                 help='refresh the graphs while solving (implies --plot)')(f)
     click.option('--plot',
                  default=False,
                  is_flag=True,
                  help='enable pretty graphs that show interation data (you '
-                      'must have matplotlib and pandas installed)')(f)
+                      'must have matplotlib installed)')(f)
     click.option('--darwin',
                  default=0.0,
                  help='sigma factor for variation of the alpha/beta settings '
@@ -29,9 +109,10 @@ def solver_options(f):
     click.option('--flip',
                  type=int,
                  default=None,
-                 help='seconds between periodic inversions of the pheromone '
-                      'levels on all edges, meaning the edges with the least '
-                      'pheromone will have the most and vice versa')(f)
+                 help='iterations between periodic inversions of the '
+                      'pheromone levels on all edges, meaning the edges with '
+                      'the least pheromone will have the most and vice '
+                      'versa')(f)
     click.option('--threshold',
                  type=float,
                  default=None,
@@ -39,8 +120,15 @@ def solver_options(f):
     click.option('--reset',
                  type=int,
                  default=False,
-                 help='seconds between periodic resets of the pheromone '
+                 help='iterations between periodic resets of the pheromone '
                       'levels on all edges')(f)
+    click.option('--restart',
+                 type=int,
+                 default=None,
+                 help='reset the pheromone levels whenever the ants stop '
+                      'finding different solutions and stop after this many '
+                      'restarts in a row fail to improve the best solution '
+                      '(0 to never stop early)')(f)
     click.option('--elite',
                  default=0.0,
                  help='how many times the best solution is re-traced')(f)
@@ -72,20 +160,63 @@ def solver_options(f):
     return f
 
 
-def run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed,
+INITIALIZERS = {
+    'zero': lambda: None,
+    'nn': initializers.NearestNeighbor,
+    'greedy': initializers.GreedyEdge,
+}
+
+
+def get_plugins(plugin_settings):
+    plugins_ = []
+    if plugin_settings.get('darwin'):
+        plugins_.append(plugins.Darwin(sigma=plugin_settings['darwin']))
+    if plugin_settings.get('elite'):
+        plugins_.append(plugins.EliteTracer(factor=plugin_settings['elite']))
+    if plugin_settings.get('reset'):
+        plugins_.append(plugins.PeriodicReset(period=plugin_settings['reset']))
+    if plugin_settings.get('flip'):
+        plugins_.append(plugins.PheromoneFlip(period=plugin_settings['flip']))
+    if plugin_settings.get('restart') is not None:
+        patience = plugin_settings['restart'] or None
+        plugins_.append(plugins.StagnationRestart(patience=patience))
+    if plugin_settings.get('threshold'):
+        plugins_.append(plugins.Threshold(plugin_settings['threshold']))
+    if plugin_settings.get('time_limit'):
+        plugins_.append(plugins.TimeLimit(plugin_settings['time_limit']))
+    if plugin_settings.get('emit'):
+        plugins_.append(plugins.RecordEmitter(plugin_settings['emit']))
+    if plugin_settings.get('metrics_file'):
+        path = plugin_settings['metrics_file']
+        plugins_.append(plugins.MetricsExporter(path))
+    return plugins_
+
+
+def run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed, init,
                plugin_settings):
-    if plugin_settings.get('plot') and not utils.is_plot_enabled():
-        raise click.UsageError('you must install matplotlib and pandas to '
-                               'use the --plot option')
+    plot = plugin_settings.get('plot') or plugin_settings.get('live')
+    if plot and not utils.is_plot_enabled():
+        raise click.UsageError('you must install matplotlib to use the '
+                               '--plot and --live options')
     seed = seed or str(hash(time.time()))
     click.echo(f'SEED={seed}')
     random.seed(seed)
 
     colony = ant.Colony(alpha=alpha, beta=beta)
-    solver = solvers.Solver(rho=rho, q=q, top=top)
+    solver = solvers.Solver(rho=rho, q=q, top=top,
+                            init=INITIALIZERS[init]())
 
     click.echo(solver)
 
+    tolerance = plugin_settings.get('collapse')
+    if tolerance is not None:
+        reduction = preprocessing.collapse(graph, tolerance)
+        click.echo(f'Collapsed {reduction.removed} of {len(graph)} nodes '
+                   f'within {tolerance}, solving {len(reduction.graph)}')
+        graph = reduction.graph
+    else:
+        reduction = None
+
     printout = plugins.Printout()
     click.echo(f'Registering plugin: {printout}')
     solver.add_plugin(printout)
@@ -94,38 +225,37 @@ def run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed,
     click.echo(f'Registering plugin: {timer}')
     solver.add_plugin(timer)
 
-    if plugin_settings.get('darwin'):
-        plugin = plugins.Darwin(sigma=plugin_settings['darwin'])
-        click.echo(f'Registering plugin: {plugin}')
-        solver.add_plugin(plugin)
-    if plugin_settings.get('elite'):
-        plugin = plugins.EliteTracer(factor=plugin_settings['elite'])
-        click.echo(f'Registering plugin: {plugin}')
-        solver.add_plugin(plugin)
-    if plugin_settings.get('reset'):
-        plugin = plugins.PeriodicReset(period=plugin_settings['reset'])
+    for plugin in get_plugins(plugin_settings):
         click.echo(f'Registering plugin: {plugin}')
         solver.add_plugin(plugin)
-    if plugin_settings.get('flip'):
-        plugin = plugins.PheromoneFlip(period=plugin_settings['flip'])
-        click.echo(f'Registering plugin: {plugin}')
-        solver.add_plugin(plugin)
-    if plugin_settings.get('threshold'):
-        plugin = plugins.Threshold(plugin_settings['threshold'])
-        click.echo(f'Registering plugin: {plugin}')
-        solver.add_plugin(plugin)
-    if plugin_settings.get('plot'):
+    if plot:
         recorder = plugins.StatsRecorder()
         click.echo(f'Registering plugin: {recorder}')
         solver.add_plugin(recorder)
+        plotter = utils.plot.Plotter(recorder.stats)
+    else:
+        plotter = None
+    if plugin_settings.get('live'):
+        live = plugins.LivePlot(plotter)
+        click.echo(f'Registering plugin: {live}')
+        solver.add_plugin(live)
+    if plugin_settings.get('memprofile'):
+        profiler = plugins.MemoryProfiler(file=sys.stderr)
+        click.echo(f'Registering plugin: {profiler}')
+        solver.add_plugin(profiler)
     else:
-        recorder = None
+        profiler = None
 
-    solver.solve(graph, colony, gen_size=ants, limit=limit)
+    best = solver.solve(graph, colony, gen_size=ants, limit=limit)
+    if reduction and best:
+        best = reduction.expand(best)
+        click.echo(f'Expanded to {len(best.nodes)} nodes with cost '
+                   f'{best.cost}')
 
     click.echo(timer.get_report())
-    if recorder:
-        plotter = utils.plot.Plotter(recorder.stats)
+    if profiler:
+        click.echo(profiler.get_report())
+    if plotter:
         plotter.plot()
 
 
@@ -133,15 +263,16 @@ def run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed,
 def main():
     if not utils.is_plot_enabled():
         click.echo(click.style('warning: plotting feature disabled',
-                               fg='yellow'))
+                               fg='yellow'), err=True)
 
 
 @main.command(short_help='run the demo')
 @solver_options
-def demo(alpha, beta, rho, q, limit, top, ants, seed, **plugin_settings):
+def demo(alpha, beta, rho, q, limit, top, ants, seed, init,
+         **plugin_settings):
     """Run the solver against the 33-city demo graph."""
     graph = utils.data.get_demo_graph()
-    run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed,
+    run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed, init,
                plugin_settings)
 
 
@@ -151,21 +282,186 @@ def demo(alpha, beta, rho, q, limit, top, ants, seed, **plugin_settings):
                 type=click.Path(dir_okay=False, readable=True))
 @click.option('--format',
               default='json',
-              type=click.Choice(utils.data.get_formats()),
+              type=GRAPH_FORMAT,
               show_default=True,
               metavar='FORMAT',
-              help='format of the file containing the graph to use; choices '
-                   f'are {", ".join(utils.data.get_formats())}')
+              help='format of the file containing the graph to use; json, '
+                   'tsplib95, or any format networkx can read (such as '
+                   'graphml)')
 def solve(alpha, beta, rho, q, limit, top, ants, filepath, format, seed,
-          **plugin_settings):
+          init, **plugin_settings):
     """Use the solver on a graph in a file in one of several formats."""
     try:
         graph = utils.data.read_graph_data(filepath, format)
     except Exception:
         raise click.UsageError(f'failed to parse {filepath} as {format}')
-    run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed,
+    run_solver(graph, alpha, beta, rho, q, limit, top, ants, seed, init,
                plugin_settings)
 
 
+@main.command(short_help='use the solver on many graphs')
+@solver_options
+@click.argument('pattern')
+@click.option('--format',
+              default='json',
+              type=GRAPH_FORMAT,
+              show_default=True,
+              metavar='FORMAT',
+              help='format of the files containing the graphs to use')
+@click.option('--workers',
+              type=int,
+              default=None,
+              help='number of worker processes (defaults to one per CPU)')
+@click.option('--time-limit',
+              type=float,
+              default=None,
+              help='maximum number of seconds to spend on each graph')
+@click.option('--output',
+              type=click.File('w'),
+              default='-',
+              help='file to which the summary is written (defaults to '
+                   'stdout)')
+@click.option('--output-format',
+              type=click.Choice(['csv', 'jsonl']),
+              default='csv',
+              show_default=True,
+              help='format of the summary')
+def batch(alpha, beta, rho, q, limit, top, ants, pattern, format, seed, init,
+          workers, output, output_format, **plugin_settings):
+    """Use the solver on every graph in a directory or matching a pattern.
+
+    The graphs are solved in parallel and one line of summary is written for
+    each as soon as it is done.
+    """
+    names = ('plot', 'live', 'emit', 'metrics_file', 'memprofile')
+    if any(plugin_settings.get(name) for name in names):
+        raise click.UsageError('--plot, --live, --emit, --metrics-file, and '
+                               '--memprofile are not supported for batches')
+    if plugin_settings.get('collapse') is not None:
+        raise click.UsageError('--collapse is not supported for batches')
+    paths = batch_.find_files(pattern)
+    if not paths:
+        raise click.UsageError(f'no files found for {pattern}')
+    seed = seed or str(hash(time.time()))
+    click.echo(f'SEED={seed}', err=True)
+
+    colony = ant.Colony(alpha=alpha, beta=beta)
+    solver = solvers.Solver(rho=rho, q=q, top=top, init=INITIALIZERS[init](),
+                            plugins=get_plugins(plugin_settings))
+    click.echo(solver, err=True)
+
+    writer = batch_.SummaryWriter(output, output_format)
+    results = batch_.solve_files(paths, format, solver, colony,
+                                 gen_size=ants, limit=limit, seed=seed,
+                                 workers=workers)
+    for i, result in enumerate(results, 1):
+        writer.write(result)
+        click.echo(f'[{i}/{len(paths)}] {result["path"]}', err=True)
+
+
+def parameter_values(type_):
+    def parse(ctx, param, value):
+        values = []
+        for text in value.split(','):
+            text = text.strip()
+            try:
+                values.append(None if text == 'none' else type_(text))
+            except ValueError:
+                raise click.BadParameter(f'invalid value: {text}')
+        return values
+    return parse
+
+
+@main.command(short_help='tune the solver settings for some graphs')
+@click.argument('pattern')
+@click.option('--format',
+              default='json',
+              type=GRAPH_FORMAT,
+              show_default=True,
+              metavar='FORMAT',
+              help='format of the files containing the graphs to use')
+@click.option('--alpha', default='1', show_default=True,
+              callback=parameter_values(float),
+              help='comma separated values to try for alpha')
+@click.option('--beta', default='3', show_default=True,
+              callback=parameter_values(float),
+              help='comma separated values to try for beta')
+@click.option('--rho', default='0.03', show_default=True,
+              callback=parameter_values(float),
+              help='comma separated values to try for rho')
+@click.option('--q', default='1', show_default=True,
+              callback=parameter_values(float),
+              help='comma separated values to try for q')
+@click.option('--top', default='none', show_default=True,
+              callback=parameter_values(int),
+              help='comma separated values to try for top')
+@click.option('--ants', default='none', show_default=True,
+              callback=parameter_values(int),
+              help='comma separated values to try for the number of ants')
+@click.option('--candidates',
+              type=int,
+              default=None,
+              help='number of combinations of the values to race (defaults '
+                   'to all of them)')
+@click.option('--limit',
+              default=100,
+              show_default=True,
+              help='maximum number of iterations for each solve')
+@click.option('--budget',
+              type=int,
+              default=None,
+              help='maximum number of solves (defaults to five per file for '
+                   'each candidate)')
+@click.option('--confidence',
+              default=0.95,
+              show_default=True,
+              help='confidence level for eliminating candidates')
+@click.option('--seed',
+              type=str,
+              default=None,
+              help='set the random seed')
+@click.option('--workers',
+              type=int,
+              default=None,
+              help='number of worker processes (defaults to one per CPU)')
+@click.option('--output',
+              type=click.Path(dir_okay=False, writable=True),
+              default='acopy.json',
+              show_default=True,
+              help='file to which the best settings are written')
+def tune(pattern, format, candidates, limit, budget, confidence, seed,
+         workers, output, **space):
+    """Find the best solver settings for the graphs in a directory or
+    matching a pattern.
+
+    Candidate settings race against each other and are eliminated as soon as
+    they are significantly worse than the best. The best settings are saved
+    to a file that can be used with the --config option of other commands.
+    """
+    paths = batch_.find_files(pattern)
+    if not paths:
+        raise click.UsageError(f'no files found for {pattern}')
+    seed = seed or str(hash(time.time()))
+    click.echo(f'SEED={seed}')
+    random.seed(seed)
+
+    configs = tuning.get_candidates(space, candidates)
+    if budget is not None and budget < len(configs):
+        raise click.UsageError(f'--budget must allow one solve for each of '
+                               f'the {len(configs)} candidates')
+    click.echo(f'Racing {len(configs)} candidates on {len(paths)} files')
+    survivors = []
+    race = tuning.race(configs, paths, format, limit=limit, budget=budget,
+                       confidence=confidence, seed=seed, workers=workers)
+    for block, survivors in enumerate(race, 1):
+        click.echo(f'Block {block}: {len(survivors)} candidates remain')
+
+    for config, mean_rank in survivors:
+        click.echo(f'{mean_rank:<8.3f} {config}')
+    best, __ = survivors[0]
+    tuning.save_config(best, output)
+    click.echo(f'Saved the best settings to {output}')
+
+
 if __name__ == "__main__":
     main()
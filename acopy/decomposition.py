@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""Solve very large instances by spatial decomposition.
+
+The points are partitioned into small clusters by recursively splitting them
+at the median of their widest coordinate. Each cluster is solved on its own
+(in parallel worker processes), the clusters are visited in the order of a
+tour through their centroids, and the cluster tours are cut open and joined
+where they come closest to their neighbors. Optionally, a window of the tour
+around each seam is solved again to smooth out the joins.
+
+Only the distances within a cluster or window are ever computed, so the
+complete graph of the instance is never built.
+"""
+import math
+import multiprocessing
+import random
+
+import networkx
+
+from .ant import Colony
+from .solvers import Solution
+from .solvers import Solver
+
+
+def partition(points, size):
+    """Partition points into clusters of at most the given size.
+
+    :param dict points: map of coordinates by node
+    :param int size: largest number of nodes in a cluster
+    :return: clusters as lists of nodes
+    :rtype: list
+    """
+    clusters = []
+    stack = [list(points)]
+    while stack:
+        nodes = stack.pop()
+        if len(nodes) <= size:
+            clusters.append(nodes)
+            continue
+        dimensions = range(len(points[nodes[0]]))
+        axis = max(dimensions, key=lambda a: _spread(points, nodes, a))
+        nodes.sort(key=lambda n: points[n][axis])
+        half = len(nodes) // 2
+        stack.append(nodes[half:])
+        stack.append(nodes[:half])
+    return clusters
+
+
+def euclidean(p, q):
+    """Return the straight line distance between two coordinates.
+
+    :param tuple p: one coordinate
+    :param tuple q: another coordinate
+    :rtype: float
+    """
+    return math.sqrt(sum((a - b) ** 2 for a, b in zip(p, q)))
+
+
+def get_centroid(points, nodes):
+    """Return the centroid of some of the points.
+
+    :param dict points: map of coordinates by node
+    :param list nodes: the nodes
+    :rtype: tuple
+    """
+    return tuple(sum(c) / len(nodes) for c in zip(*(points[n] for n in nodes)))
+
+
+def get_graph(points, distance=None):
+    """Return the complete graph of the points.
+
+    :param dict points: map of coordinates by node
+    :param callable distance: distance between two coordinates (default is
+                              :func:`euclidean`)
+    :rtype: :class:`networkx.Graph`
+    """
+    distance = distance or euclidean
+    graph = networkx.Graph()
+    graph.add_nodes_from(points)
+    nodes = list(points)
+    for i, u in enumerate(nodes):
+        for v in nodes[i + 1:]:
+            graph.add_edge(u, v, weight=distance(points[u], points[v]))
+    return graph
+
+
+def solve_tour(points, solver, colony, distance=None, gen_size=None,
+               limit=None, seed=None):
+    """Return the best tour through the points.
+
+    :param dict points: map of coordinates by node
+    :param solver: solver to use
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony from which to source the ants
+    :type colony: :class:`~acopy.ant.Colony`
+    :param callable distance: distance between two coordinates (default is
+                              :func:`euclidean`)
+    :param int gen_size: number of ants to use
+    :param int limit: maximum number of iterations
+    :param str seed: random seed
+    :return: nodes in visited order
+    :rtype: list
+    """
+    if len(points) < 4:
+        return list(points)
+    random.seed(seed)
+    graph = get_graph(points, distance)
+    return solver.solve(graph, colony, gen_size=gen_size, limit=limit).nodes
+
+
+def _solve_task(task):
+    return solve_tour(**task)
+
+
+def stitch(tours, points, distance=None):
+    """Join the tours of the clusters into one tour.
+
+    Each tour is cut open at the edge that makes the cheapest detour from the
+    end of the previous tour to the centroid of the next cluster.
+
+    :param list tours: tours of the clusters in visited order
+    :param dict points: map of coordinates by node
+    :param callable distance: distance between two coordinates (default is
+                              :func:`euclidean`)
+    :return: nodes in visited order
+    :rtype: list
+    """
+    distance = distance or euclidean
+    centroids = [get_centroid(points, tour) for tour in tours]
+    nodes = []
+    for i, tour in enumerate(tours):
+        last = points[nodes[-1]] if nodes else centroids[-1]
+        target = centroids[(i + 1) % len(tours)]
+        best = None
+        for k in range(len(tour)):
+            a, b = tour[k - 1], tour[k]
+            saved = distance(points[a], points[b])
+            # enter at b and leave at a, or the other way around
+            for cost, start, reverse in (
+                    (distance(last, points[b]) +
+                     distance(points[a], target), k, False),
+                    (distance(last, points[a]) +
+                     distance(points[b], target), k - 1, True)):
+                if best is None or cost - saved < best[0]:
+                    best = cost - saved, start, reverse
+        __, start, reverse = best
+        if reverse:
+            nodes.extend(tour[start::-1] + tour[:start:-1])
+        else:
+            nodes.extend(tour[start:] + tour[:start])
+    return nodes
+
+
+def refine_path(nodes, points, solver, colony, distance=None,
+                gen_size=None, limit=None, seed=None):
+    """Return a shorter path with the same ends through the nodes, if found.
+
+    The path is solved as a tour in which the edge between its ends costs
+    nothing, so good tours tend to use that edge and cutting it there gives a
+    path between the ends.
+
+    :param list nodes: the path as nodes in visited order
+    :param dict points: map of coordinates by node
+    :param solver: solver to use
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony from which to source the ants
+    :type colony: :class:`~acopy.ant.Colony`
+    :param callable distance: distance between two coordinates (default is
+                              :func:`euclidean`)
+    :param int gen_size: number of ants to use
+    :param int limit: maximum number of iterations
+    :param str seed: random seed
+    :return: the shorter path or ``None``
+    :rtype: list
+    """
+    distance = distance or euclidean
+    first, last = nodes[0], nodes[-1]
+    random.seed(seed)
+    graph = get_graph({n: points[n] for n in nodes}, distance)
+    graph.edges[first, last]['weight'] = 0
+    tour = solver.solve(graph, colony, gen_size=gen_size, limit=limit).nodes
+
+    i, j = tour.index(first), tour.index(last)
+    if (j - i) % len(tour) == 1:
+        path = tour[i::-1] + tour[:i:-1]
+    elif (i - j) % len(tour) == 1:
+        path = tour[i:] + tour[:i]
+    else:
+        return None
+    if _get_path_cost(path, points, distance) < _get_path_cost(nodes, points,
+                                                               distance):
+        return path
+    return None
+
+
+def _refine_task(task):
+    return refine_path(**task)
+
+
+class DecompositionSolver:
+    """Solve very large instances by solving clusters of points.
+
+    Clusters are solved with copies of the given solver and colony in
+    parallel worker processes, as is the order in which the clusters are
+    visited (at the same time as the clusters). With a ``window``, that many
+    nodes around each seam between two clusters are solved again and replaced
+    if the result is shorter.
+
+    :param solver: solver for each piece (default is a new
+                   :class:`~acopy.solvers.Solver`)
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony for each piece (default is a new
+                   :class:`~acopy.ant.Colony`)
+    :type colony: :class:`~acopy.ant.Colony`
+    :param int cluster_size: largest number of nodes in a cluster
+    :param int window: number of nodes around each seam to solve again
+    :param int gen_size: number of ants to use for each piece
+    :param int limit: maximum number of iterations for each piece
+    :param int workers: number of processes (default is one per CPU)
+    """
+
+    def __init__(self, solver=None, colony=None, cluster_size=100,
+                 window=None, gen_size=None, limit=100, workers=None):
+        self.solver = solver or Solver()
+        self.colony = colony or Colony()
+        self.cluster_size = cluster_size
+        self.window = window
+        self.gen_size = gen_size
+        self.limit = limit
+        self.workers = workers
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(cluster_size={self.cluster_size}, '
+                f'window={self.window}, limit={self.limit})')
+
+    def solve(self, points, distance=None, seed=None):
+        """Return the best tour found through the points.
+
+        The graph of the solution holds only the edges of the tour.
+
+        :param dict points: map of coordinates by node
+        :param callable distance: distance between two coordinates (default is
+                                  :func:`euclidean`; must be picklable, such
+                                  as a module level function)
+        :param str seed: random seed
+        :return: the tour
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        distance = distance or euclidean
+        if seed is None:
+            seed = str(random.getrandbits(64))
+        clusters = partition(points, self.cluster_size)
+        with multiprocessing.Pool(self.workers) as pool:
+            # the order of the clusters only depends on their centroids, so
+            # it is solved by a worker alongside the clusters themselves
+            centroids = dict(enumerate(get_centroid(points, nodes)
+                                       for nodes in clusters))
+            ordering = pool.apply_async(_solve_task, (self._get_task(
+                centroids, distance, f'{seed}:order'),))
+            tasks = [self._get_task({n: points[n] for n in nodes}, distance,
+                                    f'{seed}:{i}')
+                     for i, nodes in enumerate(clusters)]
+            tours = pool.map(_solve_task, tasks, chunksize=1)
+            order = ordering.get()
+            nodes = stitch([tours[i] for i in order], points, distance)
+
+            if self.window and len(clusters) > 1:
+                seams = []
+                for i in order:
+                    seams.append((seams[-1] if seams else 0) + len(tours[i]))
+                nodes = self.refine(pool, nodes, seams, points, distance,
+                                    seed)
+
+        graph = networkx.Graph()
+        for u, v in zip(nodes, nodes[1:] + nodes[:1]):
+            graph.add_edge(u, v, weight=distance(points[u], points[v]))
+        return Solution.from_nodes(graph, nodes)
+
+    def refine(self, pool, nodes, seams, points, distance=None,
+               seed=None):
+        """Solve the window of nodes around each seam again.
+
+        Windows that would overlap the previous one are skipped.
+
+        :param pool: pool of worker processes
+        :type pool: :class:`multiprocessing.pool.Pool`
+        :param list nodes: the tour as nodes in visited order
+        :param list seams: position in the tour after each cluster
+        :param dict points: map of coordinates by node
+        :param callable distance: distance between two coordinates (default is
+                                  :func:`euclidean`)
+        :param str seed: random seed
+        :return: the refined tour
+        :rtype: list
+        """
+        n = len(nodes)
+        size = min(self.window, n)
+        if size < 4:
+            return nodes
+        starts = []
+        for seam in seams:
+            start = seam - size // 2
+            if not starts or start >= starts[-1] + size:
+                if not starts or start + size <= starts[0] + n:
+                    starts.append(start)
+
+        tasks = []
+        for i, start in enumerate(starts):
+            path = [nodes[(start + j) % n] for j in range(size)]
+            task = self._get_task({p: points[p] for p in path}, distance,
+                                  f'{seed}:window:{i}')
+            tasks.append({'nodes': path, **task})
+
+        nodes = list(nodes)
+        paths = pool.map(_refine_task, tasks, chunksize=1)
+        for start, path in zip(starts, paths):
+            if path is not None:
+                for j, node in enumerate(path):
+                    nodes[(start + j) % n] = node
+        return nodes
+
+    def _get_task(self, points, distance, seed):
+        return {
+            'points': points,
+            'solver': self.solver,
+            'colony': self.colony,
+            'distance': distance,
+            'gen_size': self.gen_size,
+            'limit': self.limit,
+            'seed': seed,
+        }
+
+
+def _spread(points, nodes, axis):
+    values = [points[n][axis] for n in nodes]
+    return max(values) - min(values)
+
+
+def _get_path_cost(nodes, points, distance):
+    return sum(distance(points[u], points[v])
+               for u, v in zip(nodes, nodes[1:]))
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""Run colonies on several hosts that share a coordinator.
+
+Workers connect to a :class:`Coordinator` over plain TCP and pull the
+instance once, compiled into the arrays of a :class:`~acopy.sparse.CSRGraph`
+(nodes are referred to by index, so nothing is pickled). Then, round after
+round, each worker is handed the current pheromone levels, runs a number of
+iterations of its own :class:`~acopy.solvers.Solver` starting from them, and
+pushes back its best tour and the change in the level of each edge.
+
+The coordinator keeps the best tour and merges the changes into its levels
+as they arrive, scaling each by the number of connected workers so that the
+result is the average change of a round. Every worker starts its next round
+from the merged levels. Workers can join or leave at any time; a round that
+is never pushed back is simply lost.
+
+Messages are JSON objects, each preceded by its length as four bytes.
+"""
+import json
+import random
+import socket
+import socketserver
+import struct
+import threading
+
+from .ant import Colony
+from .plugins import PheromoneExchange
+from .solvers import Solution
+from .solvers import Solver
+from .sparse import CSRGraph
+
+
+def send_message(sock, message):
+    """Send a message.
+
+    :param sock: connected socket
+    :type sock: :class:`socket.socket`
+    :param dict message: the message
+    """
+    data = json.dumps(message).encode()
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+
+def recv_message(sock):
+    """Receive a message.
+
+    :param sock: connected socket
+    :type sock: :class:`socket.socket`
+    :return: the message or ``None`` if the connection was closed
+    :rtype: dict
+    """
+    header = _recv_exactly(sock, 4)
+    if header is None:
+        return None
+    data = _recv_exactly(sock, struct.unpack('>I', header)[0])
+    if data is None:
+        return None
+    return json.loads(data)
+
+
+def compile_instance(graph, weight='weight'):
+    """Return the arrays of a graph as a message.
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    :param str weight: name of the edge attribute holding the weight
+    :return: the arrays and the number of edges
+    :rtype: dict
+    """
+    csr = CSRGraph.from_graph(graph, weight=weight)
+    return {
+        'nodes': len(csr),
+        'directed': graph.is_directed(),
+        'indptr': csr.indptr.tolist(),
+        'indices': csr.indices.tolist(),
+        'weights': csr.weights.tolist(),
+        'edges': csr.edges.tolist(),
+        'num_edges': len(csr.pheromone),
+    }
+
+
+def load_instance(instance):
+    """Return the graph and its edges from the arrays of a graph.
+
+    :param dict instance: the arrays (see :func:`compile_instance`)
+    :return: the graph, with nodes numbered from zero, and its edges in the
+             order of their levels
+    :rtype: tuple
+    """
+    import networkx
+
+    graph = networkx.DiGraph() if instance['directed'] else networkx.Graph()
+    graph.add_nodes_from(range(instance['nodes']))
+    edges = [None] * instance['num_edges']
+    indptr, indices = instance['indptr'], instance['indices']
+    for u in range(instance['nodes']):
+        for slot in range(indptr[u], indptr[u + 1]):
+            v = indices[slot]
+            graph.add_edge(u, v, weight=instance['weights'][slot])
+            edge = instance['edges'][slot]
+            if edges[edge] is None:
+                edges[edge] = (u, v)
+    return graph, edges
+
+
+class Coordinator:
+    """Hand out rounds of iterations to workers and merge their results.
+
+    The coordinator listens as soon as it is created (use port 0 to pick any
+    free port and :attr:`address` to find out which) and stops handing out
+    rounds once the given number of results have been merged or the time
+    limit has passed.
+
+    :param graph: graph to solve
+    :type graph: :class:`networkx.Graph`
+    :param int iterations: number of iterations in each round
+    :param int rounds: number of results to merge
+    :param float time_limit: most seconds to hand out rounds for
+    :param str host: host to listen on
+    :param int port: port to listen on
+    :param str seed: random seed
+    :param float grace: most seconds to wait for workers to finish their last
+                        round
+    :raises ValueError: if neither a number of rounds nor a time limit is
+                        given
+    """
+
+    def __init__(self, graph, iterations=10, rounds=None, time_limit=None,
+                 host='127.0.0.1', port=0, seed=None, grace=5):
+        if rounds is None and time_limit is None:
+            raise ValueError('either rounds or time_limit must be given')
+        self.graph = graph
+        self.iterations = iterations
+        self.rounds = rounds
+        self.time_limit = time_limit
+        self.seed = str(random.getrandbits(64)) if seed is None else seed
+        self.grace = grace
+        self.instance = compile_instance(graph)
+        self.nodes = list(graph.nodes)
+        self.levels = None
+        self.best = None  # (cost, node indices)
+        self.merged = 0
+        self.handed_out = 0
+        self.workers = 0
+        self._lock = threading.Condition()
+        self._done = threading.Event()
+        self.server = _Server((host, port), _Handler)
+        self.server.coordinator = self
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(iterations={self.iterations}, '
+                f'rounds={self.rounds}, time_limit={self.time_limit})')
+
+    @property
+    def address(self):
+        """The host and port the coordinator listens on."""
+        return self.server.server_address
+
+    @property
+    def is_done(self):
+        """Whether the coordinator has stopped handing out rounds."""
+        return self._done.is_set()
+
+    def serve(self):
+        """Hand out rounds until done and return the best tour found.
+
+        :return: best solution found (or ``None`` if no worker finished a
+                 round)
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        thread = threading.Thread(target=self.server.serve_forever,
+                                  daemon=True)
+        thread.start()
+        try:
+            self._done.wait(self.time_limit)
+            self._done.set()
+            # let connected workers push back their last round and hear that
+            # they should stop
+            with self._lock:
+                self._lock.wait_for(lambda: not self.workers, self.grace)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return self.get_solution()
+
+    def get_solution(self):
+        """Return the best tour found so far.
+
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        with self._lock:
+            if self.best is None:
+                return None
+            nodes = [self.nodes[i] for i in self.best[1]]
+        return Solution.from_nodes(self.graph, nodes)
+
+    def join(self):
+        """Register a newly connected worker."""
+        with self._lock:
+            self.workers += 1
+
+    def leave(self):
+        """Register a disconnected worker."""
+        with self._lock:
+            self.workers -= 1
+            self._lock.notify_all()
+
+    def get_work(self, first=False):
+        """Return the next round for a worker.
+
+        :param bool first: whether the worker needs the instance
+        :return: the round or ``None`` if the coordinator is done
+        :rtype: dict
+        """
+        if self.is_done:
+            return None
+        with self._lock:
+            work = {
+                'type': 'work',
+                'iterations': self.iterations,
+                'levels': self.levels,
+                'seed': f'{self.seed}:{self.handed_out}',
+            }
+            self.handed_out += 1
+        if first:
+            work['instance'] = self.instance
+        return work
+
+    def merge(self, result):
+        """Merge the result of a round.
+
+        :param dict result: best tour, its cost, and the changes in the levels
+        """
+        with self._lock:
+            if result['tour'] is not None:
+                if self.best is None or result['cost'] < self.best[0]:
+                    self.best = result['cost'], result['tour']
+            if self.is_done:
+                return  # a late round only counts for its tour
+            if self.levels is None:
+                self.levels = result['levels']
+            else:
+                scale = 1 / max(1, self.workers)
+                self.levels = [max(0, level + delta * scale) for level, delta
+                               in zip(self.levels, result['deltas'])]
+            self.merged += 1
+            if self.rounds is not None and self.merged >= self.rounds:
+                self._done.set()
+
+
+class Worker:
+    """Run rounds of iterations handed out by a :class:`Coordinator`.
+
+    :param solver: solver to use (default is a new
+                   :class:`~acopy.solvers.Solver`)
+    :type solver: :class:`~acopy.solvers.Solver`
+    :param colony: colony from which to source the ants (default is a new
+                   :class:`~acopy.ant.Colony`)
+    :type colony: :class:`~acopy.ant.Colony`
+    :param int gen_size: number of ants to use
+    """
+
+    def __init__(self, solver=None, colony=None, gen_size=None):
+        self.solver = solver or Solver()
+        self.colony = colony or Colony()
+        self.gen_size = gen_size
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(solver={self.solver}, '
+                f'colony={self.colony}, gen_size={self.gen_size})')
+
+    def run(self, address, rounds=None, timeout=None):
+        """Connect to a coordinator and run rounds until told to stop.
+
+        :param tuple address: host and port of the coordinator
+        :param int rounds: most rounds to run before leaving
+        :param float timeout: most seconds to wait to connect
+        :return: number of rounds run
+        :rtype: int
+        """
+        done = 0
+        graph = edges = None
+        with socket.create_connection(address, timeout) as sock:
+            sock.settimeout(None)
+            try:
+                send_message(sock, {'type': 'hello'})
+                while rounds is None or done < rounds:
+                    work = recv_message(sock)
+                    if work is None or work['type'] == 'stop':
+                        break
+                    if 'instance' in work:
+                        graph, edges = load_instance(work['instance'])
+                    send_message(sock, self.run_round(graph, edges, work))
+                    done += 1
+            except ConnectionError:
+                pass  # the coordinator is gone
+        return done
+
+    def run_round(self, graph, edges, work):
+        """Run one round of iterations.
+
+        :param graph: the graph
+        :type graph: :class:`networkx.Graph`
+        :param list edges: the edges in the order of their levels
+        :param dict work: the round handed out by the coordinator
+        :return: the result of the round
+        :rtype: dict
+        """
+        random.seed(work['seed'])
+        exchange = PheromoneExchange(edges, work['levels'])
+        self.solver.add_plugin(exchange)
+        try:
+            best = self.solver.solve(graph, self.colony,
+                                     gen_size=self.gen_size,
+                                     limit=work['iterations'])
+        finally:
+            self.solver.plugins.pop(exchange.__class__.__qualname__, None)
+        return {
+            'type': 'result',
+            'tour': best.nodes if best else None,
+            'cost': best.cost if best else None,
+            'deltas': exchange.get_deltas(),
+            'levels': exchange.final,
+        }
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _Handler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        if recv_message(self.request) is None:
+            return
+        coordinator.join()
+        try:
+            first = True
+            while True:
+                work = coordinator.get_work(first=first)
+                if work is None:
+                    send_message(self.request, {'type': 'stop'})
+                    break
+                send_message(self.request, work)
+                first = False
+                result = recv_message(self.request)
+                if result is None:
+                    break  # the worker left mid round
+                coordinator.merge(result)
+        except OSError:
+            pass  # the worker is gone
+        finally:
+            coordinator.leave()
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
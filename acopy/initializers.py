@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""Strategies for the initial pheromone levels of a graph.
+
+Without pheromone every edge scores zero, so the first iterations of a solver
+are effectively random walks. An initializer sets a starting level on every
+edge and can provide seed tours, which the solver reports as its first
+record before any ant has moved.
+"""
+from .pheromone import DictPheromoneStore
+from .solvers import Solution
+
+
+def nearest_neighbor_tour(graph, start=None):
+    """Return a tour that always moves to the closest unvisited node.
+
+    :param graph: a graph
+    :type graph: :class:`networkx.Graph`
+    :param start: starting node (default is the first node in the graph)
+    :return: nodes in visited order
+    :rtype: list
+    :raises ValueError: if the tour reaches a dead end
+    """
+    if start is None:
+        start = next(iter(graph.nodes))
+    tour = [start]
+    unvisited = set(graph.nodes) - {start}
+    while unvisited:
+        current = tour[-1]
+        choices = [(data.get('weight', 1), i, node)
+                   for i, (node, data) in enumerate(graph[current].items())
+                   if node in unvisited]
+        if not choices:
+            raise ValueError(f'dead end at node {current}')
+        __, __, node = min(choices)
+        tour.append(node)
+        unvisited.remove(node)
+    return tour
+
+
+def greedy_edge_tour(graph):
+    """Return a tour built by repeatedly adding the lightest usable edge.
+
+    An edge is usable if neither of its nodes already has two edges and it
+    does not close a cycle (unless the cycle includes every node).
+
+    :param graph: a graph
+    :type graph: :class:`networkx.Graph`
+    :return: nodes in visited order
+    :rtype: list
+    :raises ValueError: if the edges do not form a tour
+    """
+    nodes = list(graph.nodes)
+    if len(nodes) < 3:
+        return nodes
+
+    parents = {node: node for node in nodes}
+
+    def find(node):
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    edges = sorted(graph.edges(data='weight', default=1),
+                   key=lambda edge: edge[2])
+    links = {node: [] for node in nodes}
+    num_links = 0
+    for u, v, __ in edges:
+        if u == v or len(links[u]) == 2 or len(links[v]) == 2:
+            continue
+        ru, rv = find(u), find(v)
+        if ru == rv and num_links < len(nodes) - 1:
+            continue
+        parents[ru] = rv
+        links[u].append(v)
+        links[v].append(u)
+        num_links += 1
+        if num_links == len(nodes):
+            break
+    if num_links != len(nodes):
+        raise ValueError('the edges do not form a tour')
+
+    tour = [nodes[0]]
+    previous, current = None, nodes[0]
+    while len(tour) < len(nodes):
+        a, b = links[current]
+        previous, current = current, b if a == previous else a
+        tour.append(current)
+    return tour
+
+
+class Initializer:
+    """Pheromone initialization strategy.
+
+    Subclasses provide the seed tours and the level set on every edge.
+    """
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def initialize(self, graph, pheromone=None):
+        """Set the pheromone on every edge of the graph.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: seed solutions
+        :rtype: list
+        """
+        if pheromone is None:
+            pheromone = DictPheromoneStore(graph)
+        solutions = [Solution.from_nodes(graph, tour)
+                     for tour in self.get_tours(graph)]
+        pheromone.reset(self.get_level(graph, solutions))
+        return solutions
+
+    def get_tours(self, graph):
+        """Return the seed tours for the graph.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :return: tours as lists of nodes in visited order
+        :rtype: list
+        """
+        return []
+
+    def get_level(self, graph, solutions):
+        """Return the initial pheromone level.
+
+        The default is the classic ``1 / (n * C)`` where ``C`` is the cost of
+        the best seed solution. Without seed solutions, the level is zero as it
+        is for a solver without an initializer.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :param list solutions: seed solutions
+        :return: pheromone level
+        :rtype: float
+        """
+        if not solutions:
+            return 0
+        cost = min(solutions).cost
+        return 1 / (len(graph.nodes) * cost) if cost else 1
+
+
+class Constant(Initializer):
+    """Set every edge to the same pheromone level.
+
+    :param float level: the pheromone level
+    """
+
+    def __init__(self, level=0):
+        self.level = level
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(level={self.level})'
+
+    def get_level(self, graph, solutions):
+        return self.level
+
+
+class NearestNeighbor(Initializer):
+    """Derive the level from a nearest neighbor tour.
+
+    The tour is also reported as the first record.
+    """
+
+    def get_tours(self, graph):
+        return [nearest_neighbor_tour(graph)]
+
+
+class GreedyEdge(Initializer):
+    """Derive the level from a greedy edge tour.
+
+    The tour is also reported as the first record.
+    """
+
+    def get_tours(self, graph):
+        return [greedy_edge_tour(graph)]
+
+
+class SeedTours(Initializer):
+    """Start from known tours, such as the routes found on a previous run.
+
+    The level is derived from the best of the tours unless given explicitly,
+    and each tour deposits ``q / cost`` pheromone on top of it.
+
+    :param list tours: tours as lists of nodes in visited order
+    :param float q: amount of pheromone each tour deposits
+    :param float level: pheromone level set on every edge
+    """
+
+    def __init__(self, tours, q=1, level=None):
+        self.tours = [list(tour) for tour in tours]
+        self.q = q
+        self.level = level
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(tours={len(self.tours)}, '
+                f'q={self.q}, level={self.level})')
+
+    def initialize(self, graph, pheromone=None):
+        if pheromone is None:
+            pheromone = DictPheromoneStore(graph)
+        solutions = super().initialize(graph, pheromone)
+        for solution in solutions:
+            solution.trace(self.q, pheromone=pheromone)
+        return solutions
+
+    def get_tours(self, graph):
+        return self.tours
+
+    def get_level(self, graph, solutions):
+        if self.level is not None:
+            return self.level
+        return super().get_level(graph, solutions)
@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""Storage for the pheromone levels on the edges of a graph.
+
+The solver creates a store for each graph it solves and all reads and writes
+of pheromone levels go through it, so the storage can be swapped without
+changing the ants or the plugins. By default the levels are kept apart from
+the graph, which the solver then only reads, so many solvers can share one
+graph at a time. Use :meth:`PheromoneStore.export` to write the levels to the
+graph.
+"""
+import array
+
+
+class PheromoneStore:
+    """Pheromone levels for the edges of a graph.
+
+    Edges are given as ``(u, v)`` pairs of nodes. Subclasses must implement
+    :meth:`get`, :meth:`set`, :meth:`deposit`, :meth:`scale`, :meth:`reset`,
+    :meth:`snapshot`, and :meth:`restore`.
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    """
+
+    #: whether nodes added to the graph after the store was created can be
+    #: given levels
+    growable = True
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    def get(self, u, v):
+        """Return the level on an edge.
+
+        :param u: one node of the edge
+        :param v: the other node of the edge
+        :rtype: float
+        """
+        raise NotImplementedError()
+
+    def get_levels(self, u, nodes):
+        """Return the levels on the edges from one node to many others.
+
+        :param u: the node the edges start from
+        :param list nodes: the nodes the edges lead to
+        :return: one level per node
+        :rtype: list
+        """
+        return [self.get(u, v) for v in nodes]
+
+    def set(self, u, v, level):
+        """Set the level on an edge.
+
+        :param u: one node of the edge
+        :param v: the other node of the edge
+        :param float level: the new level
+        """
+        raise NotImplementedError()
+
+    def deposit(self, path, amount):
+        """Add the same amount to the level on each edge of a path.
+
+        :param list path: edges
+        :param float amount: amount of pheromone per edge
+        """
+        raise NotImplementedError()
+
+    def scale(self, factor):
+        """Multiply the level on every edge by the same factor.
+
+        :param float factor: the factor
+        """
+        raise NotImplementedError()
+
+    def evaporate(self, rho):
+        """Evaporate a fraction of the pheromone on every edge.
+
+        :param float rho: the fraction that evaporates
+        """
+        self.scale(1 - rho)
+
+    def reset(self, level=0, keep=False):
+        """Set every edge to the same level.
+
+        :param float level: the level
+        :param bool keep: only set edges that have no level yet
+        """
+        raise NotImplementedError()
+
+    def items(self):
+        """Return the level on each edge.
+
+        :return: edge and level pairs
+        :rtype: iter
+        """
+        for u, v in self.graph.edges:
+            yield (u, v), self.get(u, v)
+
+    def levels(self):
+        """Return the level on each edge.
+
+        :rtype: iter
+        """
+        for __, level in self.items():
+            yield level
+
+    def snapshot(self):
+        """Return a copy of all levels that can be passed to :meth:`restore`.
+
+        :return: opaque copy of the levels
+        """
+        raise NotImplementedError()
+
+    def restore(self, snapshot):
+        """Restore the levels from a snapshot.
+
+        :param snapshot: value returned by :meth:`snapshot`
+        """
+        raise NotImplementedError()
+
+    def export(self, graph=None, name='pheromone'):
+        """Write the levels to the edges of a graph.
+
+        :param graph: graph with the same edges (default is the graph of the
+                      store)
+        :type graph: :class:`networkx.Graph`
+        :param str name: name of the edge attribute to write
+        """
+        graph = self.graph if graph is None else graph
+        for (u, v), level in self.items():
+            graph.edges[u, v][name] = level
+
+
+class DictPheromoneStore(PheromoneStore):
+    """Pheromone levels kept in the ``'pheromone'`` attribute of each edge.
+
+    This keeps the levels visible in the graph itself, so only one solver at
+    a time can solve the graph.
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    """
+
+    def get(self, u, v):
+        return self.graph[u][v]['pheromone']
+
+    def get_levels(self, u, nodes):
+        edges = self.graph[u]
+        return [edges[v]['pheromone'] for v in nodes]
+
+    def set(self, u, v, level):
+        self.graph[u][v]['pheromone'] = level
+
+    def deposit(self, path, amount):
+        adjacency = self.graph.adj
+        for u, v in path:
+            adjacency[u][v]['pheromone'] += amount
+
+    def scale(self, factor):
+        for edge in self.graph.edges.values():
+            edge['pheromone'] *= factor
+
+    def reset(self, level=0, keep=False):
+        for edge in self.graph.edges.values():
+            if keep:
+                edge.setdefault('pheromone', level)
+            else:
+                edge['pheromone'] = level
+
+    def items(self):
+        for u, v, level in self.graph.edges(data='pheromone'):
+            yield (u, v), level
+
+    def snapshot(self):
+        return dict(self.items())
+
+    def restore(self, snapshot):
+        for (u, v), level in snapshot.items():
+            self.set(u, v, level)
+
+
+class MapPheromoneStore(PheromoneStore):
+    """Pheromone levels kept apart from the graph in a map of their own.
+
+    This is the default. The graph is only read, so one graph can be solved
+    by many solvers at once, in threads or in forked processes (without
+    copying the pages of the graph). Levels already present on the edges of
+    the graph are copied in, and edges can be added at any time.
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    """
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.symmetric = not graph.is_directed()
+        self.adj = {node: {} for node in graph}
+        for u, v, level in graph.edges(data='pheromone'):
+            if level is not None:
+                self.set(u, v, level)
+
+    def get(self, u, v):
+        return self.adj[u][v]
+
+    def get_levels(self, u, nodes):
+        levels = self.adj[u]
+        return [levels[v] for v in nodes]
+
+    def set(self, u, v, level):
+        self.adj.setdefault(u, {})[v] = level
+        if self.symmetric:
+            self.adj.setdefault(v, {})[u] = level
+
+    def deposit(self, path, amount):
+        adj = self.adj
+        if self.symmetric:
+            for u, v in path:
+                adj[u][v] = adj[v][u] = adj[u][v] + amount
+        else:
+            for u, v in path:
+                adj[u][v] += amount
+
+    def scale(self, factor):
+        for levels in self.adj.values():
+            for v, level in levels.items():
+                levels[v] = level * factor
+
+    def reset(self, level=0, keep=False):
+        for u, v in self.graph.edges:
+            if not keep or v not in self.adj.get(u, ()):
+                self.set(u, v, level)
+
+    def items(self):
+        adj = self.adj
+        for u, v in self.graph.edges:
+            yield (u, v), adj[u][v]
+
+    def snapshot(self):
+        return {u: dict(levels) for u, levels in self.adj.items()}
+
+    def restore(self, snapshot):
+        self.adj = {u: dict(levels) for u, levels in snapshot.items()}
+
+
+class ArrayPheromoneStore(PheromoneStore):
+    """Pheromone levels kept in a dense array indexed by node position.
+
+    Evaporation only changes a common scale factor instead of touching every
+    level, so it takes constant time. Levels already present on the edges of
+    the graph are copied in. The set of nodes is fixed when the store is
+    created.
+
+    To save memory on large graphs, levels can be kept as single precision
+    floats (``typecode='f'``) and, for undirected graphs, only the upper
+    triangle of the matrix can be kept (``packed=True``). Together these take
+    about a quarter of the memory of the default, at some cost in speed. Use
+    :func:`functools.partial` to pass these options to a solver::
+
+        store = functools.partial(ArrayPheromoneStore, typecode='f',
+                                  packed=True)
+        solver = Solver(store=store)
+
+    :param graph: the graph
+    :type graph: :class:`networkx.Graph`
+    :param str typecode: ``'d'`` for double or ``'f'`` for single precision
+    :param bool packed: whether to keep only the upper triangle
+    :raises ValueError: if the typecode is not supported or if a directed
+                        graph is packed
+    """
+
+    #: scale factor below which the levels are rescaled, by typecode; single
+    #: precision needs a much higher limit to avoid overflowing the levels
+    MIN_SCALES = {'d': 1e-100, 'f': 1e-10}
+
+    growable = False
+
+    def __init__(self, graph, typecode='d', packed=False):
+        if typecode not in self.MIN_SCALES:
+            raise ValueError(f'unsupported typecode {typecode!r}')
+        if packed and graph.is_directed():
+            raise ValueError('only undirected graphs can be packed')
+        super().__init__(graph)
+        self.typecode = typecode
+        self.packed = packed
+        self.min_scale = self.MIN_SCALES[typecode]
+        self.nodes = list(graph.nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.size = len(self.nodes)
+        self.symmetric = not graph.is_directed()
+        self.data = self._allocate(0)
+        self.factor = 1.0
+        # until a reset, either no slot has a level (blank) or the slots
+        # without one are flagged, which takes a byte per slot only when the
+        # graph holds some levels
+        self._blank = True
+        self._unset = None
+        missing = 0
+        for u, v, level in graph.edges(data='pheromone'):
+            if level is None:
+                missing += 1
+            else:
+                self.set(u, v, level)
+        if not missing:
+            self._blank = False
+            self._unset = None
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(typecode={self.typecode!r}, '
+                f'packed={self.packed})')
+
+    def _allocate(self, level):
+        n = self.size
+        length = n * (n + 1) // 2 if self.packed else n * n
+        return array.array(self.typecode, [level]) * length
+
+    def _offset(self, i, j):
+        if not self.packed:
+            return i * self.size + j
+        if i > j:
+            i, j = j, i
+        return i * self.size - i * (i - 1) // 2 + j - i
+
+    def _position(self, u, v):
+        return self._offset(self.index[u], self.index[v])
+
+    def get(self, u, v):
+        return self.data[self._position(u, v)] * self.factor
+
+    def get_levels(self, u, nodes):
+        data = self.data
+        index = self.index
+        factor = self.factor
+        if self.packed:
+            n = self.size
+            i = index[u]
+            row = i * n - i * (i - 1) // 2 - i
+            levels = []
+            for v in nodes:
+                j = index[v]
+                if j >= i:
+                    levels.append(data[row + j] * factor)
+                else:
+                    levels.append(data[j * n - j * (j - 1) // 2 + i - j] *
+                                  factor)
+            return levels
+        row = index[u] * self.size
+        return [data[row + index[v]] * factor for v in nodes]
+
+    def set(self, u, v, level):
+        value = level / self.factor
+        position = self._position(u, v)
+        self.data[position] = value
+        if self.symmetric and not self.packed:
+            mirror = self._position(v, u)
+            self.data[mirror] = value
+        else:
+            mirror = position
+        if self._blank:
+            self._unset = bytearray(b'\x01') * len(self.data)
+            self._blank = False
+        if self._unset is not None:
+            self._unset[position] = self._unset[mirror] = 0
+
+    def deposit(self, path, amount):
+        data = self.data
+        index = self.index
+        value = amount / self.factor
+        if self.packed:
+            for u, v in path:
+                data[self._offset(index[u], index[v])] += value
+            return
+        size = self.size
+        for u, v in path:
+            i, j = index[u], index[v]
+            data[i * size + j] += value
+            if self.symmetric:
+                data[j * size + i] += value
+
+    def scale(self, factor):
+        if not factor:
+            self.reset(0)
+            return
+        self.factor *= factor
+        if self.factor < self.min_scale:
+            self.data = array.array(self.typecode,
+                                    (x * self.factor for x in self.data))
+            self.factor = 1.0
+
+    def reset(self, level=0, keep=False):
+        if keep and not self._blank:
+            if self._unset is not None:
+                value = level / self.factor
+                self.data = array.array(self.typecode, (
+                    value if unset else x
+                    for x, unset in zip(self.data, self._unset)))
+        else:
+            self.data = self._allocate(level)
+            self.factor = 1.0
+        self._blank = False
+        self._unset = None
+
+    def snapshot(self):
+        return array.array(self.typecode, self.data), self.factor
+
+    def restore(self, snapshot):
+        data, self.factor = snapshot
+        self.data = array.array(self.typecode, data)
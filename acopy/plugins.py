@@ -1,12 +1,130 @@
 # -*- coding: utf-8 -*-
 import collections
+import functools
+import inspect
+import json
+import os
+import queue
 import random
+import socket
+import sys
+import threading
 import time
+import tracemalloc
 
+from . import utils
+from .initializers import Initializer
+from .pheromone import DictPheromoneStore
+from .solvers import Solution
 from .solvers import SolverPlugin
+from .sparse import CSRGraph
 
 
-class Printout(SolverPlugin):
+class ReportingPlugin(SolverPlugin):
+    """Report on the solver from a background thread.
+
+    The hooks only take a snapshot of the state and hand it to a thread
+    through a bounded queue, so slow output (such as a terminal or a pipe)
+    does not hold up the solver. Snapshots are taken at the start, for each
+    new record, and at the finish, and for other iterations at most once
+    every ``interval`` seconds. When the queue is full, snapshots of other
+    iterations are dropped and the others wait for room.
+
+    Subclasses implement :meth:`get_snapshot` and :meth:`report`. Errors
+    raised by :meth:`report` are raised again when the solver finishes.
+
+    :param float interval: least number of seconds between snapshots of
+                           iterations that are not new records
+    :param int maxsize: most snapshots waiting to be reported
+    """
+
+    def __init__(self, interval=.1, maxsize=100, **kwargs):
+        super().__init__(interval=interval, **kwargs)
+        self.interval = interval
+        self.maxsize = maxsize
+
+    def on_start(self, state):
+        self.iteration = 0
+        self.dropped = 0
+        self._error = None
+        self._queue = queue.Queue(self.maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.submit('start', state)
+
+    def on_iteration(self, state):
+        self.iteration += 1
+        if state.is_new_record:
+            self.submit('record', state)
+        elif time.monotonic() >= self._next_time:
+            self.submit('iteration', state, block=False)
+
+    def on_finish(self, state):
+        self.submit('finish', state)
+        self._queue.put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, event, state, block=True):
+        """Hand a snapshot of the state to the background thread.
+
+        :param str event: one of ``'start'``, ``'iteration'``, ``'record'``,
+                          or ``'finish'``
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :param bool block: whether to wait for room in the queue
+        """
+        try:
+            self._queue.put((event, self.get_snapshot(event, state)), block)
+        except queue.Full:
+            self.dropped += 1
+        self._next_time = time.monotonic() + self.interval
+
+    def get_snapshot(self, event, state):
+        """Return what the report of an event needs to know.
+
+        This runs in the solver, so it should only pick out values without
+        formatting them. Note that the solutions of pooled solvers are reused
+        (but records are not).
+
+        :param str event: the event
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        """
+        raise NotImplementedError()
+
+    def report(self, event, snapshot):
+        """Report an event from the background thread.
+
+        :param str event: the event
+        :param snapshot: the snapshot taken for the event
+        """
+        raise NotImplementedError()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is None:
+                try:
+                    self.report(*item)
+                except Exception as e:
+                    self._error = e
+
+
+class Printout(ReportingPlugin):
+    """Print the progress of the solver.
+
+    Each new record is printed on a line of its own along with its tour. In
+    between, the latest iteration and the cost of its best solution are
+    printed over one line at most every ``interval`` seconds.
+
+    :param float interval: least number of seconds between progress lines
+    :param int maxsize: most lines waiting to be printed
+    """
+
     _ROW = '{:<10} {:<20} {}'
 
     def initialize(self, solver):
@@ -14,22 +132,483 @@ class Printout(SolverPlugin):
         self.iteration = 0
         self._last_line = ''
 
+    def get_snapshot(self, event, state):
+        if event == 'start':
+            return state.gen_size, state.colony, state.limit
+        if event == 'record':
+            return self.iteration, state.record
+        if event == 'iteration':
+            return self.iteration, state.best.cost
+        return None
+
+    def report(self, event, snapshot):
+        if event == 'start':
+            gen_size, colony, limit = snapshot
+            print(f'Using {gen_size} ants from {colony}')
+            print(f'Performing {limit} iterations:')
+            print(self._ROW.format('Iteration', 'Cost', 'Solution'))
+        elif event == 'record':
+            iteration, record = snapshot
+            line = self._ROW.format(iteration, record.cost,
+                                    record.get_easy_id())
+            print(line)
+            self._last_line = line
+        elif event == 'iteration':
+            print(self._ROW.format(*snapshot, ''), end='\r')
+        else:
+            eraser = '-' * len(self._last_line)
+            print(f'\r{eraser}')
+
+
+class RecordEmitter(SolverPlugin):
+    """Write each new record as a line of JSON as soon as it is found.
+
+    Each line holds the iteration, the elapsed seconds, the cost, and the tour
+    as indices into the nodes of the graph. The target is a file path, a unix
+    domain socket given as ``unix:<path>``, or ``-`` for stdout.
+
+    :param str target: where to write the records
+    """
+
+    def __init__(self, target):
+        super().__init__(target=target)
+        self.target = target
+        self.file = None
+
     def on_start(self, state):
+        self.file = self.open(self.target)
         self.iteration = 0
-        print(f'Using {state.gen_size} ants from {state.colony}')
-        print(f'Performing {state.limit} iterations:')
-        print(self._ROW.format('Iteration', 'Cost', 'Solution'))
+        self.start_time = time.time()
+        self._last = None
+        if isinstance(state.graph, CSRGraph):
+            self._index = None
+        else:
+            self._index = {node: i for i, node in enumerate(state.graph)}
 
     def on_iteration(self, state):
         self.iteration += 1
-        line = self._ROW.format(self.iteration, state.best.cost,
-                                state.best.get_easy_id())
-        print(line, end='\n' if state.is_new_record else '\r')
-        self._last_line = line
+        if state.record is self._last:
+            return
+        self._last = state.record
+        self.emit(state.record)
+
+    def on_finish(self, state):
+        if self.file is not None and self.file is not sys.stdout:
+            self.file.close()
+        self.file = None
+
+    def open(self, target):
+        """Return a writable text file for the target.
+
+        :param str target: file path, ``unix:<path>``, or ``-``
+        :return: file object
+        """
+        if target == '-':
+            return sys.stdout
+        if target.startswith('unix:'):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(target[len('unix:'):])
+            file = sock.makefile('w', encoding='utf-8')
+            sock.close()  # the file keeps the connection open
+            return file
+        return open(target, 'w', encoding='utf-8')
+
+    def emit(self, record):
+        """Write a record as a single line of JSON.
+
+        :param record: the record to write
+        :type record: :class:`~acopy.solvers.Solution`
+        """
+        if self._index is None:
+            tour = list(record.nodes)
+        else:
+            tour = [self._index[node] for node in record.nodes]
+        line = json.dumps({
+            'iteration': self.iteration,
+            'elapsed': time.time() - self.start_time,
+            'cost': record.cost,
+            'tour': tour,
+        })
+        self.file.write(line + '\n')
+        self.file.flush()
+
+
+class MetricsExporter(SolverPlugin):
+    """Periodically write metrics about the solver to a file.
+
+    The metrics are written in the OpenMetrics text format (which the
+    textfile collector of the Prometheus node exporter reads) by writing a
+    temporary file and renaming it, so readers never see a partial file.
+
+    Files are written at most once every ``interval`` seconds, and never more
+    often than keeps the time spent writing below ``overhead`` of the time
+    spent solving. A final file is written when the solver finishes.
+
+    :param str path: path to the file
+    :param float interval: least number of seconds between writes
+    :param float overhead: largest fraction of the time spent writing
+    :param str prefix: prefix of the metric names
+    """
+
+    def __init__(self, path, interval=15, overhead=.01, prefix='acopy'):
+        super().__init__(path=path, interval=interval)
+        self.path = path
+        self.interval = interval
+        self.overhead = overhead
+        self.prefix = prefix
+
+    def on_start(self, state):
+        self.iterations = 0
+        self.start_time = time.time()
+        self.next_time = self.start_time
+        self.write(state)
+
+    def on_iteration(self, state):
+        self.iterations += 1
+        if time.time() >= self.next_time:
+            self.write(state)
 
     def on_finish(self, state):
-        eraser = '-' * len(self._last_line)
-        print(f'\r{eraser}')
+        self.write(state, running=False)
+
+    def write(self, state, running=True):
+        """Write the metrics atomically and schedule the next write.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :param bool running: whether the solver is still running
+        """
+        start = time.time()
+        text = self.format(self.get_metrics(state, running))
+        directory, name = os.path.split(os.path.abspath(self.path))
+        temp = os.path.join(directory, f'.{name}.{os.getpid()}.tmp')
+        with open(temp, 'w') as f:
+            f.write(text)
+        os.replace(temp, self.path)
+        finish = time.time()
+        spacing = (finish - start) / self.overhead
+        self.next_time = finish + max(self.interval, spacing)
+
+    def get_metrics(self, state, running=True):
+        """Return the metrics for the state of the solver.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :param bool running: whether the solver is still running
+        :return: name, type, help, and samples of each metric, where the
+                 samples are pairs of labels and values
+        :rtype: list
+        """
+        elapsed = time.time() - self.start_time
+        metrics = [
+            ('running', 'gauge', 'Whether the solver is running.',
+             [({}, int(running))]),
+            ('iterations', 'counter', 'Iterations performed.',
+             [({}, self.iterations)]),
+            ('iterations_per_second', 'gauge',
+             'Average iterations per second.',
+             [({}, self.iterations / elapsed if elapsed else 0)]),
+            ('phase_seconds', 'counter', 'Seconds spent in each phase.',
+             [({'phase': phase}, seconds)
+              for phase, seconds in sorted(state.timings.items())]),
+        ]
+        if state.record is not None:
+            metrics.append(('record_cost', 'gauge',
+                            'Cost of the best solution so far.',
+                            [({}, state.record.cost)]))
+        if state.solutions:
+            metrics.extend([
+                ('iteration_best_cost', 'gauge',
+                 'Cost of the best solution of the last iteration.',
+                 [({}, state.solutions[0].cost)]),
+                ('unique_solutions', 'gauge',
+                 'Unique solutions found in the last iteration.',
+                 [({}, len(state.tour_hashes))]),
+            ])
+        if state.pheromone is not None:
+            count = total = 0
+            low, high = float('inf'), float('-inf')
+            for level in state.pheromone.levels():
+                count += 1
+                total += level
+                low = min(low, level)
+                high = max(high, level)
+            if count:
+                metrics.append(('pheromone', 'gauge',
+                                'Pheromone levels on the edges.',
+                                [({'stat': 'min'}, low),
+                                 ({'stat': 'max'}, high),
+                                 ({'stat': 'mean'}, total / count)]))
+        return metrics
+
+    def format(self, metrics):
+        """Return the metrics in the OpenMetrics text format.
+
+        :param list metrics: metrics as returned by :meth:`get_metrics`
+        :rtype: str
+        """
+        lines = []
+        for name, type_, help_, samples in metrics:
+            name = f'{self.prefix}_{name}'
+            lines.append(f'# TYPE {name} {type_}')
+            lines.append(f'# HELP {name} {help_}')
+            suffix = '_total' if type_ == 'counter' else ''
+            for labels, value in samples:
+                labels = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                labels = f'{{{labels}}}' if labels else ''
+                lines.append(f'{name}{suffix}{labels} {value}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+class MemoryProfiler(SolverPlugin):
+    """Account for the memory used by each component of the solver.
+
+    At the end of each phase of an iteration (finding solutions, updating
+    the pheromone, and running the plugins), the peak resident set size
+    (RSS) of the process and the peak of the memory traced by
+    :mod:`tracemalloc` during the phase are recorded. Since the peak RSS
+    only grows, each rise is charged to the phase in which it happened.
+
+    Every ``interval`` iterations a sample is taken: the traced memory is
+    attributed to a component by where it was allocated (``graph``,
+    ``solutions``, ``pheromone``, ``solver``, and each plugin by its class,
+    with ``other`` for the rest), and the items held by each component are
+    counted. Note that memory is charged to where it was allocated, not to
+    whoever keeps it; the counts show who keeps what.
+
+    Tracing slows down every allocation several times, so unless tracing
+    was already started (such as with ``PYTHONTRACEMALLOC=1``), only the
+    iterations that end with a sample are traced. Their traced memory is
+    then what the iteration allocated and still holds, which shows how fast
+    each component grows, and the peaks of the phases are those of the
+    traced iterations. Without ``trace``, only the RSS and the counts are
+    measured. Before Python 3.9, :mod:`tracemalloc` cannot reset its peak,
+    so the peak of each phase is the highest since tracing started.
+
+    :param int interval: iterations between samples
+    :param bool trace: whether to trace allocations
+    :param file: writable text file to which each sample is written as a
+                 line of JSON as soon as it is taken
+    """
+
+    def __init__(self, interval=50, trace=True, file=None):
+        super().__init__(interval=interval, trace=trace)
+        self.interval = interval
+        self.trace = trace
+        self.file = file
+
+    def on_start(self, state):
+        self.iterations = 0
+        self.samples = []
+        self.peaks = collections.Counter()
+        self.growth = collections.Counter()
+        self._sampled = self.trace and not tracemalloc.is_tracing()
+        self._sources = self.get_sources(state)
+        self._rss = utils.get_peak_rss()
+        self._sampling_peak = 0
+        state.meters.append(self.measure)
+        self.sample(state)
+        self._trace_next()
+
+    def on_iteration(self, state):
+        self.iterations += 1
+        if self.iterations % self.interval == 0:
+            self.sample(state)
+
+    def on_finish(self, state):
+        if self.samples[-1]['iteration'] != self.iterations:
+            self.sample(state)
+        state.meters.remove(self.measure)
+        if self._sampled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def measure(self, phase):
+        """Record the peak memory of a phase that has just ended.
+
+        :param str phase: name of the phase
+        """
+        rss = utils.get_peak_rss()
+        if rss is not None and rss > self._rss:
+            self.growth[phase] += rss - self._rss
+            self._rss = rss
+        if tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1],
+                       self._sampling_peak)
+            self.peaks[phase] = max(self.peaks[phase], peak)
+            self._sampling_peak = 0
+            _reset_peak()
+        if phase == 'plugins' and self._sampled:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self._trace_next()
+
+    def _trace_next(self):
+        # trace the next iteration if it ends with a sample
+        if self._sampled and (self.iterations + 1) % self.interval == 0:
+            tracemalloc.start()
+
+    def sample(self, state):
+        """Take a sample and write it to the file, if any.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        """
+        sample = {
+            'iteration': self.iterations,
+            'rss': utils.get_peak_rss(),
+            'counts': self.get_counts(state),
+        }
+        if tracemalloc.is_tracing():
+            # taking the snapshot must not count as the peak of a phase
+            self._sampling_peak = max(self._sampling_peak,
+                                      tracemalloc.get_traced_memory()[1])
+            sample['traced'] = self.get_traced()
+            sample['peaks'] = dict(self.peaks)
+            _reset_peak()
+        self.samples.append(sample)
+        if self.file is not None:
+            self.file.write(json.dumps(sample) + '\n')
+            self.file.flush()
+
+    def get_sources(self, state):
+        """Return the lines of code that allocate for each component.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :return: first and last line and component of each class, by file
+        :rtype: dict
+        """
+        classes = [(type(self.solver), 'solver'),
+                   (type(state.pheromone), 'pheromone'),
+                   (type(state.graph), 'graph')]
+        for ant in {type(ant) for ant in state.ants}:
+            classes.extend([(ant, 'solutions'),
+                            (ant.solution_class, 'solutions')])
+        for plugin in self.solver.get_plugins():
+            classes.append((type(plugin), type(plugin).__qualname__))
+
+        sources = collections.defaultdict(list)
+        for cls, component in classes:
+            for base in cls.__mro__:
+                if base in (object, SolverPlugin):
+                    break
+                try:
+                    lines, first = inspect.getsourcelines(base)
+                    filename = inspect.getsourcefile(base)
+                except (OSError, TypeError):
+                    continue  # defined outside of a source file
+                last = first + len(lines) - 1
+                sources[filename].append((first, last, component))
+        return sources
+
+    def get_component(self, filename, lineno):
+        """Return the component that allocates at a line of code.
+
+        :param str filename: name of the file
+        :param int lineno: line number
+        :rtype: str
+        """
+        for first, last, component in self._sources.get(filename, ()):
+            if first <= lineno <= last:
+                return component
+        if f'{os.sep}networkx{os.sep}' in filename:
+            return 'graph'
+        return 'other'
+
+    def get_traced(self):
+        """Return the traced memory of each component.
+
+        :return: bytes by component
+        :rtype: dict
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ])
+        traced = collections.Counter()
+        for stat in snapshot.statistics('lineno'):
+            frame = stat.traceback[0]
+            traced[self.get_component(frame.filename, frame.lineno)] += \
+                stat.size
+        return dict(traced)
+
+    def get_counts(self, state):
+        """Return the number of items held by each component.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :return: counts by component
+        :rtype: dict
+        """
+        graph = state.graph
+        if isinstance(graph, CSRGraph):
+            edges = len(graph.indices)
+        else:
+            edges = graph.number_of_edges()
+        solutions = state.solutions or []
+        counts = {
+            'graph': len(graph) + edges,
+            'solutions': len(solutions) + sum(len(s.path) for s in solutions),
+            'pheromone': sum(1 for __ in state.pheromone.levels()),
+        }
+        for plugin in self.solver.get_plugins():
+            items = {k: v for k, v in vars(plugin).items() if k != 'solver'}
+            counts[type(plugin).__qualname__] = _count_items(items)
+        return counts
+
+    def get_report(self):
+        """Return a report of the memory used by each phase and component.
+
+        :rtype: str
+        """
+        lines = []
+        rss = self.samples[-1]['rss'] if self.samples else None
+        if rss is not None:
+            lines.append(f'Peak RSS: {_format_bytes(rss)}')
+        phases = sorted(set(self.peaks) | set(self.growth))
+        if phases:
+            lines.append(f'{"Phase":<16} {"Peak traced":>12} '
+                         f'{"RSS growth":>12}')
+            for phase in phases:
+                lines.append(f'{phase:<16} '
+                             f'{_format_bytes(self.peaks[phase]):>12} '
+                             f'{_format_bytes(self.growth[phase]):>12}')
+        if self.samples:
+            last = self.samples[-1]
+            traced = last.get('traced', {})
+            lines.append(f'{"Component":<16} {"Traced":>12} {"Items":>12}')
+            for component in sorted(set(traced) | set(last['counts'])):
+                size = traced.get(component)
+                size = _format_bytes(size) if size is not None else '-'
+                count = last['counts'].get(component, '-')
+                lines.append(f'{component:<16} {size:>12} {count:>12}')
+        return '\n'.join(lines)
+
+
+def _count_items(value, depth=3):
+    # the number of items in nested containers, looking only a few levels
+    # deep so that counting stays cheap
+    if isinstance(value, (str, bytes)) or not hasattr(value, '__len__'):
+        return 0
+    count = len(value)
+    if depth and isinstance(value, (dict, list, set, tuple)):
+        items = value.values() if isinstance(value, dict) else value
+        count += sum(_count_items(item, depth - 1) for item in items)
+    return count
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            break
+        size /= 1024
+    return f'{size:.1f} {unit}'
+
+
+def _reset_peak():
+    # tracemalloc.reset_peak is new in Python 3.9
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
 
 
 class EliteTracer(SolverPlugin):
@@ -39,7 +618,8 @@ class EliteTracer(SolverPlugin):
         self.factor = factor
 
     def on_iteration(self, state):
-        state.best.trace(self.solver.q * self.factor)
+        state.best.trace(self.solver.q * self.factor,
+                         pheromone=state.pheromone)
 
 
 class PeriodicActionPlugin(SolverPlugin):
@@ -64,20 +644,167 @@ class PeriodicActionPlugin(SolverPlugin):
 class PeriodicReset(PeriodicActionPlugin):
 
     def action(self, state):
-        for edge in state.graph.edges:
-            state.graph.edges[edge]['pheromone'] = 0
+        state.pheromone.reset(0)
 
 
 class PheromoneFlip(PeriodicActionPlugin):
 
     def action(self, state):
-        data = []
-        for edge in state.graph.edges.values():
-            datum = edge['pheromone'], edge
-            data.append(datum)
-        levels, edges = zip(*data)
-        for edge, level in zip(edges, reversed(levels)):
-            edge['pheromone'] = level
+        edges, levels = zip(*state.pheromone.items())
+        for (u, v), level in zip(edges, reversed(levels)):
+            state.pheromone.set(u, v, level)
+
+
+class StagnationRestart(SolverPlugin):
+    """Reinitialize the pheromone once the colony stops exploring.
+
+    The colony is considered stagnant when an iteration finds too few unique
+    tours, or (optionally) when the average λ-branching factor drops too low.
+    The λ-branching factor of a node counts its edges whose pheromone is
+    within ``lambda_`` of the lowest level relative to the range of levels on
+    the edges of that node; a converged colony approaches 2.
+
+    On a restart the pheromone is reinitialized with the initializer of the
+    solver (or set to ``1 / (n * C)`` for the cost ``C`` of the record) and
+    the record tour deposits ``q`` pheromone so the search restarts around
+    it. If ``patience`` is given, the solver stops
+    once that many restarts in a row fail to improve on the record.
+
+    :param float min_unique: fraction of the ants that must find unique tours
+    :param float min_branching: lowest acceptable average branching factor
+    :param float lambda_: λ used for the branching factor
+    :param int patience: number of fruitless restarts before stopping
+    """
+
+    def __init__(self, min_unique=.05, min_branching=None, lambda_=.05,
+                 patience=None):
+        super().__init__(min_unique=min_unique, min_branching=min_branching,
+                         lambda_=lambda_, patience=patience)
+        self.min_unique = min_unique
+        self.min_branching = min_branching
+        self.lambda_ = lambda_
+        self.patience = patience
+
+    def initialize(self, solver):
+        super().initialize(solver)
+        self.restarts = 0
+        self.fruitless = 0
+        self._last_cost = None
+
+    def on_start(self, state):
+        self.restarts = 0
+        self.fruitless = 0
+        self._last_cost = None
+
+    def on_iteration(self, state):
+        if not self.is_stagnant(state):
+            return
+        cost = state.record.cost
+        if self._last_cost is not None and cost >= self._last_cost:
+            self.fruitless += 1
+        else:
+            self.fruitless = 0
+        self._last_cost = cost
+        if self.patience is not None and self.fruitless >= self.patience:
+            raise StopIteration()
+        self.restart(state)
+
+    def is_stagnant(self, state):
+        """Return whether the colony has stopped exploring.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        :rtype: bool
+        """
+        unique = len(state.tour_hashes)
+        if unique <= max(1, self.min_unique * len(state.costs)):
+            return True
+        if self.min_branching is not None:
+            branching = self.get_branching_factor(state.graph,
+                                                  state.pheromone)
+            return branching <= self.min_branching
+        return False
+
+    def get_branching_factor(self, graph, pheromone=None):
+        """Return the average λ-branching factor of the graph.
+
+        :param graph: the graph being solved
+        :type graph: :class:`networkx.Graph`
+        :param pheromone: pheromone levels (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :rtype: float
+        """
+        if pheromone is None:
+            pheromone = DictPheromoneStore(graph)
+        total = 0
+        for node, edges in graph.adjacency():
+            levels = pheromone.get_levels(node, list(edges))
+            if levels:
+                low = min(levels)
+                cutoff = low + self.lambda_ * (max(levels) - low)
+                total += sum(1 for level in levels if level >= cutoff)
+        return total / len(graph)
+
+    def restart(self, state):
+        """Reinitialize the pheromone, keeping the record tour.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        """
+        self.restarts += 1
+        if self.solver.init is not None:
+            self.solver.init.initialize(state.graph, state.pheromone)
+        else:
+            # with no pheromone off the record every ant would retrace it
+            level = Initializer().get_level(state.graph, [state.record])
+            state.pheromone.reset(level)
+        state.record.trace(self.solver.q, pheromone=state.pheromone)
+
+
+class PheromoneExchange(SolverPlugin):
+    """Start from given pheromone levels and measure how they change.
+
+    This lets pheromone levels be carried from one run of a solver to
+    another, such as from another host or from a cache.
+
+    :param list edges: the edges whose levels are exchanged
+    :param list levels: the starting level of each edge (default is to keep
+                        the levels the solver starts with)
+    """
+
+    def __init__(self, edges, levels=None):
+        super().__init__()
+        self.edges = edges
+        self.levels = levels
+        self.start = None
+        self.final = None
+
+    def on_start(self, state):
+        if self.levels is not None:
+            for (u, v), level in zip(self.edges, self.levels):
+                state.pheromone.set(u, v, level)
+        self.start = [state.pheromone.get(u, v) for u, v in self.edges]
+
+    def on_finish(self, state):
+        self.final = [state.pheromone.get(u, v) for u, v in self.edges]
+
+    def get_deltas(self):
+        """Return the change in the level of each edge."""
+        return [b - a for a, b in zip(self.start, self.final)]
+
+
+class PheromoneExport(SolverPlugin):
+    """Write the pheromone levels to the graph when the solver finishes.
+
+    :param str name: name of the edge attribute to write
+    """
+
+    def __init__(self, name='pheromone'):
+        super().__init__(name=name)
+        self.name = name
+
+    def on_finish(self, state):
+        state.pheromone.export(name=self.name)
 
 
 class Timer(SolverPlugin):
@@ -87,14 +814,19 @@ class Timer(SolverPlugin):
         self.start_time = None
         self.finish = None
         self.duration = None
+        self.iterations = 0
 
     def on_start(self, state):
         self.start_time = time.time()
+        self.iterations = 0
+
+    def on_iteration(self, state):
+        self.iterations += 1
 
     def on_finish(self, state):
         self.finish = time.time()
         self.duration = self.finish - self.start_time
-        self.time_per_iter = self.duration / state.limit
+        self.time_per_iter = self.duration / max(self.iterations, 1)
 
     def get_report(self):
         return '\n'.join([
@@ -104,10 +836,23 @@ class Timer(SolverPlugin):
 
 
 class Darwin(SolverPlugin):
+    """Vary the alpha and beta of the ants between iterations.
+
+    By default every ant gets its own values. To let ants share values (and
+    thus the heuristic tables of a :class:`~acopy.ant.FastColony`), values can
+    be rounded to a multiple of ``step`` and drawn for only ``buckets`` groups
+    of ants.
+
+    :param float sigma: standard deviation of the variation
+    :param float step: precision to which values are rounded
+    :param int buckets: number of distinct pairs of values per iteration
+    """
 
-    def __init__(self, sigma=.1):
-        super().__init__(sigma=sigma)
+    def __init__(self, sigma=.1, step=None, buckets=None):
+        super().__init__(sigma=sigma, step=step, buckets=buckets)
         self.sigma = sigma
+        self.step = step
+        self.buckets = buckets
 
     def on_start(self, state):
         size = len(state.ants)
@@ -117,9 +862,28 @@ class Darwin(SolverPlugin):
     def on_iteration(self, state):
         alpha = (self.alpha + state.best.ant.alpha) / 2
         beta = (self.beta + state.best.ant.beta) / 2
-        for ant in state.ants:
-            ant.alpha = random.gauss(alpha, self.sigma)
-            ant.beta = random.gauss(beta, self.sigma)
+        if self.buckets:
+            pairs = [self.vary(alpha, beta) for __ in range(self.buckets)]
+            for ant in state.ants:
+                ant.alpha, ant.beta = random.choice(pairs)
+        else:
+            for ant in state.ants:
+                ant.alpha, ant.beta = self.vary(alpha, beta)
+
+    def vary(self, alpha, beta):
+        """Return randomly varied values of alpha and beta.
+
+        :param float alpha: mean alpha
+        :param float beta: mean beta
+        :return: alpha and beta
+        :rtype: tuple
+        """
+        alpha = random.gauss(alpha, self.sigma)
+        beta = random.gauss(beta, self.sigma)
+        if self.step:
+            alpha = round(alpha / self.step) * self.step
+            beta = round(beta / self.step) * self.step
+        return alpha, beta
 
 
 class EarlyTerminationPlugin(SolverPlugin):
@@ -163,7 +927,7 @@ class StatsRecorder(SolverPlugin):
         self.data = {'solutions': set()}
 
     def on_start(self, state):
-        levels = [edge['pheromone'] for edge in state.graph.edges.values()]
+        levels = list(state.pheromone.levels())
         num_edges = len(levels)
         total_pheromone = sum(levels)
 
@@ -190,10 +954,10 @@ class StatsRecorder(SolverPlugin):
         self.pump(stats)
 
     def on_iteration(self, state):
-        levels = [edge['pheromone'] for edge in state.graph.edges.values()]
-        distances = [solution.cost for solution in state.solutions]
+        levels = list(state.pheromone.levels())
+        distances = list(state.costs)
 
-        solutions = set(state.solutions)
+        solutions = state.tour_hashes
         solutions_seen = self.data['solutions']
 
         old_count = len(solutions_seen)
@@ -229,3 +993,187 @@ class StatsRecorder(SolverPlugin):
     def pump(self, stats):
         for stat, data in stats.items():
             self.stats[stat].append(data)
+
+
+class LivePlot(SolverPlugin):
+    """Refresh a plot of the stats while the solver runs.
+
+    The plot is refreshed at most once every ``interval`` seconds and each
+    refresh only summarises the stats recorded since the last one, so the
+    solver spends little time drawing. Add it after the
+    :class:`StatsRecorder` that collects the stats.
+
+    :param plotter: plotter of the stats
+    :type plotter: :class:`~acopy.utils.plot.Plotter`
+    :param float interval: least number of seconds between refreshes
+    """
+
+    def __init__(self, plotter, interval=1):
+        super().__init__(interval=interval)
+        self.plotter = plotter
+        self.interval = interval
+        self._last = None
+
+    def on_start(self, state):
+        self.plotter.show(block=False)
+        self._last = time.time()
+
+    def on_iteration(self, state):
+        if time.time() - self._last >= self.interval:
+            self.plotter.refresh()
+            self._last = time.time()
+
+    def on_finish(self, state):
+        self.plotter.refresh()
+
+
+class GraphUpdater(SolverPlugin):
+    """Apply changes to the graph of a running solver between iterations.
+
+    Changes can be queued from another thread at any time and are applied
+    together once the current iteration completes. Pheromone is kept: new
+    edges are seeded with the average pheromone on the edges of the existing
+    node they connect to, and all levels are rescaled by the ratio of the old
+    and new record costs. The record is repaired by dropping removed nodes,
+    inserting new nodes where they add the least cost, and re-evaluating its
+    cost against the new weights. The solver yields the repaired record, so
+    :meth:`~acopy.solvers.Solver.solve` returns a tour of the changed graph.
+
+    New nodes need a pheromone store that can grow with the graph, such as
+    the default :class:`~acopy.pheromone.MapPheromoneStore`. With any other
+    store, changes that add nodes raise :class:`ValueError` when they are
+    queued, or when the solver starts if they were queued before.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.pending = collections.deque()
+        # nodes of a store that cannot grow (None if it can or is unknown)
+        self.fixed_nodes = None
+
+    def on_start(self, state):
+        if state.pheromone.growable:
+            self.fixed_nodes = None
+        else:
+            self.fixed_nodes = set(state.graph)
+        for __, nodes in self.pending:
+            self._check_nodes(nodes)
+
+    def set_weight(self, u, v, weight):
+        """Change the weight of an edge, adding the edge if necessary.
+
+        :param u: one node of the edge
+        :param v: the other node of the edge
+        :param float weight: the new weight
+        :raises ValueError: if the edge adds a node to a graph whose
+                            pheromone store cannot grow
+        """
+        change = functools.partial(self._set_weight, u, v, weight)
+        self._queue(change, [u, v])
+
+    def add_node(self, node, edges):
+        """Add a node to the graph.
+
+        :param node: the new node
+        :param dict edges: map of edge weights by neighbor
+        :raises ValueError: if the pheromone store of the graph cannot grow
+        """
+        edges = dict(edges)
+        change = functools.partial(self._add_node, node, edges)
+        self._queue(change, [node, *edges])
+
+    def remove_node(self, node):
+        """Remove a node and its edges from the graph.
+
+        :param node: the node to remove
+        """
+        self._queue(functools.partial(self._remove_node, node), [])
+
+    def on_iteration(self, state):
+        if not self.pending:
+            return
+        while self.pending:
+            change, __ = self.pending.popleft()
+            change(state.graph, state.pheromone)
+        heuristics = getattr(state.colony, 'heuristics', None)
+        if heuristics is not None:
+            heuristics.clear()
+        self.repair_record(state)
+
+    def repair_record(self, state):
+        """Repair the record and rescale the pheromone to the new graph.
+
+        :param state: solver state
+        :type state: :class:`acopy.solvers.State`
+        """
+        if state.record is None:
+            return
+        graph = state.graph
+        nodes = [node for node in state.record.nodes if node in graph]
+        visited = set(nodes)
+        for node in graph.nodes:
+            if node not in visited:
+                self._insert(graph, nodes, node)
+
+        try:
+            record = Solution.from_nodes(graph, nodes, ant=state.record.ant)
+        except (ValueError, KeyError):
+            # no tour through the changed graph follows the old record
+            state.record = None
+            return
+
+        if record.cost:
+            state.pheromone.scale(state.record.cost / record.cost)
+        state.record = record
+
+    def _queue(self, change, nodes):
+        self._check_nodes(nodes)
+        self.pending.append((change, nodes))
+
+    def _check_nodes(self, nodes):
+        if self.fixed_nodes is None:
+            return
+        for node in nodes:
+            if node not in self.fixed_nodes:
+                raise ValueError(f'cannot add node {node!r}: the pheromone '
+                                 'store of the solver cannot grow')
+
+    def _set_weight(self, u, v, weight, graph, pheromone):
+        if not graph.has_edge(u, v):
+            self._add_edge(graph, pheromone, u, v, weight)
+        else:
+            graph.edges[u, v]['weight'] = weight
+
+    def _add_node(self, node, edges, graph, pheromone):
+        graph.add_node(node)
+        for neighbor, weight in edges.items():
+            self._add_edge(graph, pheromone, node, neighbor, weight)
+
+    def _remove_node(self, node, graph, pheromone):
+        if node in graph:
+            graph.remove_node(node)
+
+    def _add_edge(self, graph, pheromone, u, v, weight):
+        levels = []
+        for node in (u, v):
+            if node in graph:
+                levels.extend(pheromone.get_levels(node, list(graph[node])))
+        graph.add_edge(u, v, weight=weight)
+        pheromone.set(u, v, sum(levels) / len(levels) if levels else 0)
+
+    def _insert(self, graph, nodes, node):
+        if not nodes:
+            nodes.append(node)
+            return
+        best = None
+        for i, (a, b) in enumerate(zip(nodes, nodes[1:] + nodes[:1])):
+            if not (graph.has_edge(a, node) and graph.has_edge(node, b)):
+                continue
+            delta = (graph.edges[a, node].get('weight', 1) +
+                     graph.edges[node, b].get('weight', 1))
+            if len(nodes) > 1:
+                delta -= graph.edges[a, b].get('weight', 1)
+            if best is None or delta < best[0]:
+                best = delta, i + 1
+        index = best[1] if best else len(nodes)
+        nodes.insert(index, node)
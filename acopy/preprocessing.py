@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Shrink instances before solving them.
+
+Real instances often hold several stops at (nearly) the same location. They
+add nodes without changing the shape of the best tour, and their zero
+weights give edges the largest possible score. Collapsing each group of
+nodes within a tolerance of one another into one of them gives a smaller
+graph to solve, whose tour is then expanded back into a tour through every
+node of the original graph.
+"""
+import functools
+
+
+def collapse(graph, tolerance=0, weight='weight'):
+    """Collapse the nodes within a tolerance of each other.
+
+    Nodes are taken in order and each joins the group of the nearest earlier
+    node that was kept, if one is within the tolerance (in both directions
+    for directed graphs), so every node is within the tolerance of the node
+    that stands for its group.
+
+    :param graph: a complete graph
+    :type graph: :class:`networkx.Graph`
+    :param float tolerance: largest weight between nodes that are collapsed
+    :param str weight: name of the edge attribute holding the weight
+    :return: the reduction
+    :rtype: :class:`Reduction`
+    """
+    groups = {}
+    for node in graph.nodes:
+        nearest = None
+        for other, data in graph[node].items():
+            cost = data.get(weight, 1)
+            if other in groups and cost <= tolerance:
+                if graph.is_directed():
+                    cost = max(cost, graph.edges[other, node].get(weight, 1))
+                    if cost > tolerance:
+                        continue
+                if nearest is None or cost < nearest[0]:
+                    nearest = cost, other
+        if nearest is None:
+            groups[node] = [node]
+        else:
+            groups[nearest[1]].append(node)
+    return Reduction(graph, groups, weight=weight)
+
+
+class Reduction:
+    """A graph with some of its nodes collapsed into others.
+
+    :param graph: the original graph
+    :type graph: :class:`networkx.Graph`
+    :param dict groups: nodes of the original graph in the group of each
+                        kept node, starting with the kept node
+    :param str weight: name of the edge attribute holding the weight
+    """
+
+    def __init__(self, graph, groups, weight='weight'):
+        self.original = graph
+        self.groups = groups
+        self.weight = weight
+        self.graph = graph.subgraph(groups).copy()
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(nodes={len(self.original)}, '
+                f'kept={len(self.graph)}, removed={self.removed})')
+
+    @property
+    def removed(self):
+        """Number of nodes collapsed into others."""
+        return len(self.original) - len(self.graph)
+
+    def expand(self, solution):
+        """Return the tour through every node of the original graph.
+
+        The nodes of each group are visited where the tour visits the node
+        that stands for them, starting with the one nearest the previous node
+        and going on to the nearest one not yet visited.
+
+        :param solution: a tour of the reduced graph
+        :type solution: :class:`~acopy.solvers.Solution`
+        :return: the tour of the original graph
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        nodes = []
+        previous = solution.nodes[-1]
+        for node in solution.nodes:
+            group = self.groups[node]
+            if len(group) > 1:
+                group = self._order(previous, group)
+            nodes.extend(group)
+            previous = nodes[-1]
+        return solution.from_nodes(self.original, nodes, ant=solution.ant)
+
+    def _order(self, previous, group):
+        remaining = list(group)
+        ordered = []
+        while remaining:
+            nearest = min(remaining,
+                          key=functools.partial(self._get_weight, previous))
+            remaining.remove(nearest)
+            ordered.append(nearest)
+            previous = nearest
+        return ordered
+
+    def _get_weight(self, u, v):
+        if u == v:
+            return 0
+        return self.original.edges[u, v].get(self.weight, 1)
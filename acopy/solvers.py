@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 import sys
+import copy
+import time
+import heapq
+import operator
 import functools
 import collections
 
 from . import utils
+from .pheromone import DictPheromoneStore
+from .pheromone import MapPheromoneStore
 
 
 @functools.total_ordering
@@ -27,6 +33,25 @@ class Solution:
         self.nodes = [start]
         self.visited = set(self.nodes)
 
+    @classmethod
+    def from_nodes(cls, graph, nodes, ant=None):
+        """Return the closed tour that visits the nodes in the given order.
+
+        :param graph: a graph
+        :type graph: :class:`networkx.Graph`
+        :param list nodes: the nodes in visited order
+        :param ant: ant responsible
+        :type ant: :class:`~acopy.ant.Ant`
+        :return: closed solution
+        :rtype: :class:`~Solution`
+        """
+        start, *rest = nodes
+        solution = cls(graph, start, ant=ant)
+        for node in rest:
+            solution.add_node(node)
+        solution.close()
+        return solution
+
     def __iter__(self):
         return iter(self.path)
 
@@ -56,14 +81,46 @@ class Solution:
     def get_id(self):
         """Return the ID of the solution.
 
-        The default implementation is just each of the nodes in visited order.
+        The default implementation is just each of the nodes in visited order,
+        starting from the smallest. On undirected graphs, a tour and its
+        reverse are the same, so the tour goes towards the smaller of the
+        neighbors of that node.
 
         :return: solution ID
         :rtype: tuple
         """
         first = min(self.nodes)
         index = self.nodes.index(first)
-        return tuple(self.nodes[index:] + self.nodes[:index])
+        nodes = self.nodes[index:] + self.nodes[:index]
+        if (len(nodes) > 2 and not self.graph.is_directed() and
+                nodes[-1] < nodes[1]):
+            nodes[1:] = nodes[:0:-1]
+        return tuple(nodes)
+
+    def reset(self, start):
+        """Start over from the given node, reusing the buffers of the tour.
+
+        :param start: starting node
+        """
+        self.start = start
+        self.current = start
+        self.cost = 0
+        self.path.clear()
+        self.nodes.clear()
+        self.nodes.append(start)
+        self.visited.clear()
+        self.visited.add(start)
+
+    def copy(self):
+        """Return a copy of the solution that does not share its buffers.
+
+        :rtype: :class:`~Solution`
+        """
+        solution = copy.copy(self)
+        solution.path = self.path.copy()
+        solution.nodes = self.nodes.copy()
+        solution.visited = self.visited.copy()
+        return solution
 
     def add_node(self, node):
         """Record a node as visited.
@@ -85,20 +142,22 @@ class Solution:
         self.cost += data['weight']
         self.current = node
 
-    def trace(self, q, rho=0):
+    def trace(self, q, rho=0, pheromone=None):
         """Deposit pheromone on the edges.
 
         Note that by default no pheromone evaporates.
 
         :param float q: the amount of pheromone
         :param float rho: the percentage of pheromone to evaporate
+        :param pheromone: where to deposit (default is the graph edges)
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
         """
+        if pheromone is None:
+            pheromone = DictPheromoneStore(self.graph)
         amount = q / self.cost
-        for edge in self.path:
-            self.graph.edges[edge]['pheromone'] += amount
-            self.graph.edges[edge]['pheromone'] *= 1 - rho
-            if not self.graph.edges[edge]['pheromone']:
-                self.graph.edges[edge]['pheromone'] = sys.float_info.min
+        for u, v in self.path:
+            level = (pheromone.get(u, v) + amount) * (1 - rho)
+            pheromone.set(u, v, level or sys.float_info.min)
 
 
 class State:
@@ -120,6 +179,13 @@ class State:
     ``is_new_record``     whether the best is a new record
     ``record``            best solution found so far
     ``previous_record``   previously best solution
+    ``pheromone``         pheromone levels of the graph
+    ``costs``             costs of the solutions found this iteration
+    ``tour_hashes``       hashes of the distinct tours found this
+                          iteration
+    ``timings``           total seconds spent in each phase
+    ``meters``            callables told the name of each phase as
+                          it ends
     ===================== ======================================
 
     :param graph: a graph
@@ -129,24 +195,42 @@ class State:
     :param int gen_size: number of ants to use
     :param colony: source colony for the ants
     :type colony: :class:`~acopy.ant.Colony`
+    :param pheromone: pheromone levels of the graph
+    :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
     """
 
-    def __init__(self, graph, ants, limit, gen_size, colony):
+    def __init__(self, graph, ants, limit, gen_size, colony, pheromone=None):
         self.graph = graph
+        self.pheromone = pheromone
         self.ants = ants
         self.limit = limit
         self.gen_size = gen_size
         self.colony = colony
         self.solutions = None
+        self.costs = None
         self.record = None
         self.previous_record = None
         self.is_new_record = False
+        self.timings = collections.Counter()
+        self.meters = []
         self._best = None
+        self._tour_hashes = None
 
     @property
     def best(self):
         return self._best
 
+    def end_phase(self, phase, start):
+        """Account for a phase that has just ended.
+
+        :param str phase: name of the phase
+        :param float start: value of :func:`time.perf_counter` when the phase
+                            started
+        """
+        self.timings[phase] += time.perf_counter() - start
+        for meter in self.meters:
+            meter(phase)
+
     @best.setter
     def best(self, best):
         self.is_new_record = self.record is None or best < self.record
@@ -155,6 +239,18 @@ class State:
             self.record = best
         self._best = best
 
+    @property
+    def tour_hashes(self):
+        # unless the solver filled them in (because it kept only some of the
+        # solutions), they are computed from the solutions when first used
+        if self._tour_hashes is None and self.solutions is not None:
+            self._tour_hashes = {hash(s) for s in self.solutions}
+        return self._tour_hashes
+
+    @tour_hashes.setter
+    def tour_hashes(self, hashes):
+        self._tour_hashes = hashes
+
 
 class Solver:
     """ACO solver.
@@ -163,23 +259,50 @@ class Solver:
     If top is not specified, it defaults to the number of ants used to solve a
     graph.
 
+    If no initializer is given, edges without pheromone start with none and
+    edges that already have some keep it.
+
+    The pheromone levels belong to the solver (see
+    :mod:`~acopy.pheromone`), so the graph is left as it is unless the levels
+    are exported, such as with the :class:`~acopy.plugins.PheromoneExport`
+    plugin.
+
     :param float rho: percentage of pheromone that evaporates each iteration
     :param float q: amount of pheromone each ant can deposit
     :param int top: number of ants that deposit pheromone
     :param list plugins: zero or more solver plugins
+    :param init: initial pheromone strategy
+    :type init: :class:`~acopy.initializers.Initializer`
+    :param store: type of pheromone storage (default is
+                  :class:`~acopy.pheromone.MapPheromoneStore`)
+    :type store: :class:`~acopy.pheromone.PheromoneStore`
+    :param bool pooled: whether each ant reuses one solution for all of its
+                        tours (only records are copied, so plugins must
+                        copy any other solutions they keep)
+    :param bool top_only: whether to keep only the solutions of the top ants
+                          (the costs and tour hashes of all solutions are
+                          still kept)
+    :raises ValueError: if only the top solutions are kept without a top
     """
 
-    def __init__(self, rho=.03, q=1, top=None, plugins=None):
+    def __init__(self, rho=.03, q=1, top=None, plugins=None, init=None,
+                 store=None, pooled=False, top_only=False):
+        if top_only and not top:
+            raise ValueError('top must be given to keep only top solutions')
         self.rho = rho
         self.q = q
         self.top = top
+        self.init = init
+        self.store = store or MapPheromoneStore
+        self.pooled = pooled
+        self.top_only = top_only
         self.plugins = collections.OrderedDict()
         if plugins:
             self.add_plugins(*plugins)
 
     def __repr__(self):
         return (f'{self.__class__.__name__}(rho={self.rho}, q={self.q}, '
-                f'top={self.top})')
+                f'top={self.top}, init={self.init})')
 
     def solve(self, *args, **kwargs):
         """Find and return the best solution.
@@ -205,58 +328,176 @@ class Solver:
                              (default is one per graph node)
         :param int limit: maximum number of iterations to perform (default is
                           unlimited so it will run forever)
-        :return: better solutions as they are found
+        :return: better solutions as they are found (closing it early still
+                 finishes the plugins)
         :rtype: iter
         """
         # initialize the colony of ants and the graph
         gen_size = gen_size or len(graph.nodes)
         ants = colony.get_ants(gen_size)
-        for u, v in graph.edges:
-            graph.edges[u, v].setdefault('pheromone', 0)
+        if self.pooled:
+            for ant in ants:
+                ant.pooled = True
+        pheromone = self.get_pheromone_store(graph)
+        seeds = self.initialize_pheromone(graph, pheromone)
 
         state = State(graph=graph, ants=ants, limit=limit, gen_size=gen_size,
-                      colony=colony)
+                      colony=colony, pheromone=pheromone)
 
         # call start hook for all plugins
         self._call_plugins('start', state=state)
 
-        # find solutions and update the graph pheromone accordingly
-        for __ in utils.looper(limit):
-            solutions = self.find_solutions(state.graph, state.ants)
-
-            # we want to ensure the ants are sorted with the solutions, but
-            # since ants aren't directly comparable, so we interject a list of
-            # unique numbers that satifies any two solutions that are equal
-            data = list(zip(solutions, range(len(state.ants)), state.ants))
-            data.sort()
-            solutions, __, ants = zip(*data)
-
-            state.solutions = solutions
-            state.ants = ants
-            self.global_update(state)
-
-            # yield increasingly better solutions
-            state.best = state.solutions[0]
-            if state.is_new_record:
+        try:
+            # the seed solutions are the first record
+            if seeds:
+                state.best = min(seeds)
                 yield state.record
 
-            # call iteration hook for all plugins
-            if self._call_plugins('iteration', state=state):
-                break
+            # find solutions and update the graph pheromone accordingly
+            for __ in utils.looper(limit):
+                start = time.perf_counter()
+                if self.top_only:
+                    solutions, costs, hashes, ants = self.select_solutions(
+                        state.graph, state.ants, self.top,
+                        pheromone=state.pheromone)
+                else:
+                    solutions = self.find_solutions(
+                        state.graph, state.ants, pheromone=state.pheromone)
+
+                    # the ants are sorted with their solutions (each solution
+                    # knows its ant); ants that failed to find a solution are
+                    # kept at the end
+                    failed = [ant for ant, solution
+                              in zip(state.ants, solutions)
+                              if solution is None]
+                    solutions = sorted((s for s in solutions if s is not None),
+                                       key=operator.attrgetter('cost'))
+                    costs = [solution.cost for solution in solutions]
+                    hashes = None
+                    ants = [solution.ant for solution in solutions] + failed
+                state.end_phase('find_solutions', start)
+                if not solutions:
+                    continue
+
+                state.solutions = solutions
+                state.costs = costs
+                state.tour_hashes = hashes
+                state.ants = ants
+                start = time.perf_counter()
+                self.global_update(state)
+                state.end_phase('global_update', start)
+
+                # yield increasingly better solutions; pooled solutions are
+                # reused by their ants so a new record must be copied out
+                best = state.solutions[0]
+                if self.pooled and (state.record is None or
+                                    best < state.record):
+                    best = best.copy()
+                state.best = best
+                if state.is_new_record:
+                    yield state.record
+
+                # call iteration hook for all plugins; a plugin that changes
+                # the graph may replace the record, which must be yielded too
+                record = state.record
+                start = time.perf_counter()
+                should_stop = self._call_plugins('iteration', state=state)
+                state.end_phase('plugins', start)
+                if state.record is not record and state.record is not None:
+                    yield state.record
+                if should_stop:
+                    break
+        except GeneratorExit:
+            # the caller stopped early, but the plugins must still finish
+            # (such as to stop their threads or close their files)
+            self._call_plugins('finish', state=state)
+            raise
 
         # call finish hook for all plugins
         self._call_plugins('finish', state=state)
 
-    def find_solutions(self, graph, ants):
+    def get_pheromone_store(self, graph):
+        """Return new pheromone storage for the graph.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :rtype: :class:`~acopy.pheromone.PheromoneStore`
+        """
+        return self.store(graph)
+
+    def initialize_pheromone(self, graph, pheromone):
+        """Make sure every edge of the graph has a pheromone level.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph`
+        :param pheromone: pheromone levels of the graph
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: seed solutions
+        :rtype: list
+        """
+        if self.init is not None:
+            return self.init.initialize(graph, pheromone)
+        pheromone.reset(0, keep=True)
+        return []
+
+    def find_solutions(self, graph, ants, pheromone=None):
         """Return the solutions found for the given ants.
 
         :param graph: a graph
         :type graph: :class:`networkx.Graph`
         :param list ants: the ants to use
-        :return: one solution per ant
+        :param pheromone: pheromone levels of the graph
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: one solution per ant (``None`` for an ant that failed to
+                 complete a tour)
         :rtype: list
         """
-        return [ant.tour(graph) for ant in ants]
+        return [ant.tour(graph, pheromone=pheromone) for ant in ants]
+
+    def select_solutions(self, graph, ants, k, pheromone=None):
+        """Return the best solutions found for the given ants.
+
+        Each solution is compared with the best ``k`` so far as soon as it is
+        found, so no more than ``k`` solutions are kept at a time and the
+        solutions are never fully sorted.
+
+        :param graph: a graph
+        :type graph: :class:`networkx.Graph`
+        :param list ants: the ants to use
+        :param int k: number of solutions to keep
+        :param pheromone: pheromone levels of the graph
+        :type pheromone: :class:`~acopy.pheromone.PheromoneStore`
+        :return: the best solutions (best first), the costs of all solutions
+                 (in no particular order), the hashes of their distinct
+                 tours, and the ants (those of the best solutions first and
+                 those that failed to complete a tour last)
+        :rtype: tuple
+        """
+        heap = []  # the worst of the best solutions is at the top
+        costs = []
+        hashes = set()
+        succeeded = []
+        failed = []
+        for i, ant in enumerate(ants):
+            solution = ant.tour(graph, pheromone=pheromone)
+            if solution is None:
+                failed.append(ant)
+                continue
+            costs.append(solution.cost)
+            hashes.add(hash(solution))
+            succeeded.append(ant)
+            # earlier ants win ties, as they do in a stable sort
+            item = (-solution.cost, -i, solution)
+            if len(heap) < k:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        heap.sort(reverse=True)
+        solutions = [solution for __, __, solution in heap]
+        best = {id(solution.ant) for solution in solutions}
+        ants = ([solution.ant for solution in solutions] +
+                [ant for ant in succeeded if id(ant) not in best] + failed)
+        return solutions, costs, hashes, ants
 
     def global_update(self, state):
         """Perform a global pheromone update.
@@ -264,17 +505,13 @@ class Solver:
         :param state: solver state
         :type state: :class:`~State`
         """
-        for edge in state.graph.edges:
-            amount = 0
-            if self.top:
-                solutions = state.solutions[:self.top]
-            else:
-                solutions = state.solutions
-            for solution in solutions:
-                if edge in solution.path:
-                    amount += self.q / solution.cost
-            p = state.graph.edges[edge]['pheromone']
-            state.graph.edges[edge]['pheromone'] = (1 - self.rho) * p + amount
+        if self.top:
+            solutions = state.solutions[:self.top]
+        else:
+            solutions = state.solutions
+        state.pheromone.evaporate(self.rho)
+        for solution in solutions:
+            state.pheromone.deposit(solution.path, self.q / solution.cost)
 
     def add_plugin(self, plugin):
         """Add a single solver plugin.
@@ -316,7 +553,8 @@ class SolverPlugin:
     Solver plugins can be added to any solver to customize its behavior.
     Plugins are initialized once when added, once before the first solver
     iteration, once after each solver iteration has completed, and once after
-    all iterations have completed.
+    all iterations have completed (or the caller stops iterating over
+    :meth:`~Solver.optimize` early and closes it).
 
     Implementing each hook is optional.
     """
@@ -365,6 +603,9 @@ class SolverPlugin:
     def on_finish(self, state):
         """Perform actions once all iterations have completed.
 
+        This is also called when the generator returned by
+        :meth:`~Solver.optimize` is closed (or garbage collected) early.
+
         :param state: solver state
         :type state: :class:`acopy.solvers.State`
         """
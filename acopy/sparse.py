@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+"""Support for sparse, non-complete graphs such as road networks.
+
+Instead of networkx edge dictionaries, a sparse graph is compiled into
+compressed sparse row (CSR) arrays that hold the adjacency, the weights, and
+the pheromone levels. Ants that reach a dead end (a node whose neighbors have
+all been visited) either repair their tour by travelling the shortest path to
+the nearest unvisited node, or give up. Tours are always closed through the
+shortest path back to the starting node.
+"""
+import array
+import bisect
+import heapq
+import random
+import sys
+
+from .ant import Ant
+from .ant import Colony
+from .initializers import Initializer
+from .pheromone import PheromoneStore
+from .solvers import Solution
+from .solvers import Solver
+
+
+class CSRGraph:
+    """Compressed sparse row representation of a graph.
+
+    Nodes are referred to by their index in :attr:`nodes`. The neighbors of
+    node ``i`` occupy the slots ``indptr[i]`` through ``indptr[i + 1]`` of the
+    ``indices``, ``weights``, and ``edges`` arrays, sorted by neighbor index.
+    Each slot refers to a position in the ``pheromone`` array through
+    ``edges``, so both directions of an undirected edge share one level.
+
+    :param list nodes: the original node labels
+    :param indptr: row pointer array of length ``len(nodes) + 1``
+    :param indices: column index array with one neighbor per slot
+    :param weights: weight array with one weight per slot
+    :param edges: pheromone position array with one position per slot
+    :param int num_edges: number of distinct (pheromone carrying) edges
+    :param str typecode: typecode of the pheromone array (``'d'`` or ``'f'``)
+    :param bool directed: whether the edges are directed
+    """
+
+    def __init__(self, nodes, indptr, indices, weights, edges, num_edges,
+                 typecode='d', directed=False):
+        self.nodes = nodes
+        self.directed = directed
+        self.index = {node: i for i, node in enumerate(nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.edges = edges
+        self.pheromone = array.array(typecode, [0]) * num_edges
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def is_directed(self):
+        """Return whether the edges are directed."""
+        return self.directed
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(nodes={len(self.nodes)}, '
+                f'slots={len(self.indices)}, edges={len(self.pheromone)})')
+
+    @classmethod
+    def from_graph(cls, graph, weight='weight', weight_typecode='d',
+                   typecode='d'):
+        """Compile a networkx graph into CSR arrays.
+
+        Self-loops are ignored and missing weights default to 1. Integer
+        weights (such as those of TSPLIB problems) can be kept in an ``'i'``
+        array and the pheromone in an ``'f'`` array to halve their memory.
+
+        :param graph: the graph to compile
+        :type graph: :class:`networkx.Graph`
+        :param str weight: name of the edge attribute holding the weight
+        :param str weight_typecode: typecode of the weight array (``'d'``,
+                                    ``'f'``, or ``'i'``)
+        :param str typecode: typecode of the pheromone array (``'d'`` or
+                             ``'f'``)
+        :return: compiled graph
+        :rtype: :class:`CSRGraph`
+        """
+        nodes = list(graph.nodes)
+        index = {node: i for i, node in enumerate(nodes)}
+        directed = graph.is_directed()
+
+        indptr = array.array('q', [0])
+        indices = array.array('i')
+        weights = array.array(weight_typecode)
+        edges = array.array('i')
+        edge_ids = {}
+        for node in nodes:
+            i = index[node]
+            row = sorted((index[v], data.get(weight, 1))
+                         for v, data in graph[node].items() if v != node)
+            for j, w in row:
+                key = (i, j) if directed else (min(i, j), max(i, j))
+                indices.append(j)
+                weights.append(w)
+                edges.append(edge_ids.setdefault(key, len(edge_ids)))
+            indptr.append(len(indices))
+        return cls(nodes, indptr, indices, weights, edges, len(edge_ids),
+                   typecode=typecode, directed=directed)
+
+    def neighbors(self, node):
+        """Return the slots of the edges leaving the given node.
+
+        :param int node: node index
+        :rtype: range
+        """
+        return range(self.indptr[node], self.indptr[node + 1])
+
+    def find_slot(self, u, v):
+        """Return the slot of the edge from ``u`` to ``v``.
+
+        :param int u: source node index
+        :param int v: target node index
+        :return: slot or -1 if there is no such edge
+        :rtype: int
+        """
+        lo, hi = self.indptr[u], self.indptr[u + 1]
+        slot = bisect.bisect_left(self.indices, v, lo, hi)
+        if slot < hi and self.indices[slot] == v:
+            return slot
+        return -1
+
+    def find_path(self, source, is_target):
+        """Return the shortest path to the nearest matching node.
+
+        :param int source: starting node index
+        :param callable is_target: predicate on a node index
+        :return: slots along the path or ``None`` if no node is reachable
+        :rtype: list
+        """
+        distances = {source: 0}
+        previous = {}
+        heap = [(0, source)]
+        while heap:
+            distance, u = heapq.heappop(heap)
+            if distance > distances[u]:
+                continue
+            if u != source and is_target(u):
+                slots = []
+                while u != source:
+                    u, slot = previous[u]
+                    slots.append(slot)
+                return slots[::-1]
+            for slot in self.neighbors(u):
+                v = self.indices[slot]
+                candidate = distance + self.weights[slot]
+                if candidate < distances.get(v, sys.float_info.max):
+                    distances[v] = candidate
+                    previous[v] = u, slot
+                    heapq.heappush(heap, (candidate, v))
+        return None
+
+
+class CSRPheromoneStore(PheromoneStore):
+    """Pheromone levels for a :class:`CSRGraph`, one per distinct edge.
+
+    The levels are kept in an array of their own, starting from a copy of
+    the ``pheromone`` array of the graph, so many solvers can share one
+    compiled graph. Use :meth:`export` to copy the levels back into the
+    graph.
+
+    Edges are given as pairs of node indices.
+
+    :param graph: the compiled graph
+    :type graph: :class:`CSRGraph`
+    """
+
+    growable = False
+
+    def __init__(self, graph):
+        super().__init__(graph)
+        self.data = array.array(graph.pheromone.typecode, graph.pheromone)
+
+    def _find(self, u, v):
+        slot = self.graph.find_slot(u, v)
+        if slot < 0:
+            raise KeyError((u, v))
+        return self.graph.edges[slot]
+
+    def get(self, u, v):
+        return self.data[self._find(u, v)]
+
+    def set(self, u, v, level):
+        self.data[self._find(u, v)] = level
+
+    def deposit(self, path, amount):
+        data = self.data
+        for u, v in path:
+            data[self._find(u, v)] += amount
+
+    def scale(self, factor):
+        data = self.data
+        for i, level in enumerate(data):
+            data[i] = level * factor
+
+    def reset(self, level=0, keep=False):
+        if not keep:
+            data = self.data
+            data[:] = array.array(data.typecode, [level]) * len(data)
+
+    def items(self):
+        graph = self.graph
+        seen = bytearray(len(self.data))
+        for u in range(len(graph)):
+            for slot in graph.neighbors(u):
+                edge = graph.edges[slot]
+                if not seen[edge]:
+                    seen[edge] = 1
+                    yield (u, graph.indices[slot]), self.data[edge]
+
+    def levels(self):
+        return iter(self.data)
+
+    def snapshot(self):
+        return array.array(self.data.typecode, self.data)
+
+    def restore(self, snapshot):
+        self.data[:] = array.array(self.data.typecode, snapshot)
+
+    def export(self, graph=None, name='pheromone'):
+        """Copy the levels into the ``pheromone`` array of a compiled graph.
+
+        :param graph: compiled graph with the same edges (default is the
+                      graph of the store)
+        :type graph: :class:`CSRGraph`
+        :param str name: ignored
+        """
+        graph = self.graph if graph is None else graph
+        graph.pheromone[:] = array.array(graph.pheromone.typecode, self.data)
+
+
+class SparseSolution(Solution):
+    """Tour for a :class:`CSRGraph`.
+
+    Nodes are indexes into ``graph.nodes``. Moving between two nodes that do
+    not share an edge travels the shortest path between them; the nodes along
+    the way are part of the :attr:`path` but not of :attr:`nodes`.
+
+    :param graph: a compiled graph
+    :type graph: :class:`CSRGraph`
+    :param int start: starting node index
+    :param ant: ant responsible
+    :type ant: :class:`SparseAnt`
+    """
+
+    def __init__(self, graph, start, ant=None):
+        super().__init__(graph, start, ant=ant)
+        self.slots = []
+        self.visited = bytearray(len(graph))
+        self.visited[start] = 1
+
+    def __contains__(self, node):
+        return bool(self.visited[node])
+
+    def reset(self, start):
+        self.start = start
+        self.current = start
+        self.cost = 0
+        self.path.clear()
+        self.slots.clear()
+        self.nodes.clear()
+        self.nodes.append(start)
+        self.visited[:] = bytes(len(self.visited))
+        self.visited[start] = 1
+
+    def copy(self):
+        solution = super().copy()
+        solution.slots = self.slots.copy()
+        return solution
+
+    def get_id(self):
+        """Return the ID of the solution in terms of the node labels.
+
+        :return: solution ID
+        :rtype: tuple
+        """
+        labels = self.graph.nodes
+        return tuple(labels[n] for n in super().get_id())
+
+    def add_node(self, node):
+        """Record a node as visited.
+
+        :param int node: the node visited
+        :raises ValueError: if the node is unreachable
+        """
+        self._travel(node)
+        self.nodes.append(node)
+        self.visited[node] = 1
+
+    def close(self):
+        """Close the tour so that the first and last nodes are the same.
+
+        :raises ValueError: if the start is unreachable
+        """
+        self._travel(self.start)
+
+    def repair(self):
+        """Travel to the nearest unvisited node.
+
+        :return: whether an unvisited node was reachable
+        :rtype: bool
+        """
+        slots = self.graph.find_path(self.current,
+                                     lambda n: not self.visited[n])
+        if slots is None:
+            return False
+        for slot in slots:
+            self.traverse(slot)
+        self.nodes.append(self.current)
+        self.visited[self.current] = 1
+        return True
+
+    def traverse(self, slot):
+        """Travel along the edge in the given slot.
+
+        :param int slot: the slot of an edge leaving the current node
+        """
+        node = self.graph.indices[slot]
+        self.path.append((self.current, node))
+        self.slots.append(slot)
+        self.cost += self.graph.weights[slot]
+        self.current = node
+
+    def _travel(self, node):
+        slot = self.graph.find_slot(self.current, node)
+        if slot != -1:
+            slots = [slot]
+        else:
+            slots = self.graph.find_path(self.current, node.__eq__)
+            if slots is None:
+                raise ValueError(f'node {self.graph.nodes[node]} is '
+                                 'unreachable')
+        for slot in slots:
+            self.traverse(slot)
+
+    def trace(self, q, rho=0, pheromone=None):
+        """Deposit pheromone on the edges.
+
+        Note that by default no pheromone evaporates.
+
+        :param float q: the amount of pheromone
+        :param float rho: the percentage of pheromone to evaporate
+        :param pheromone: where to deposit (default is the compiled graph)
+        :type pheromone: :class:`CSRPheromoneStore`
+        """
+        amount = q / self.cost
+        pheromone = _get_levels(self.graph, pheromone)
+        for slot in self.slots:
+            edge = self.graph.edges[slot]
+            pheromone[edge] = (pheromone[edge] + amount) * (1 - rho)
+            if not pheromone[edge]:
+                pheromone[edge] = sys.float_info.min
+
+
+class SparseAnt(Ant):
+    """An ant for :class:`CSRGraph` s.
+
+    When every neighbor of the current node has been visited, the ant either
+    repairs its tour by travelling the shortest path to the nearest unvisited
+    node or discards it.
+
+    :param float alpha: how much pheromone matters
+    :param float beta: how much distance matters
+    :param bool repair: whether to repair tours at dead ends
+    """
+
+    solution_class = SparseSolution
+
+    def __init__(self, alpha=1, beta=3, repair=True):
+        super().__init__(alpha=alpha, beta=beta)
+        self.repair = repair
+
+    def __repr__(self):
+        return (f'SparseAnt(alpha={self.alpha}, beta={self.beta}, '
+                f'repair={self.repair})')
+
+    def tour(self, graph, pheromone=None):
+        """Find a solution to the given graph.
+
+        :param graph: the graph to solve
+        :type graph: :class:`CSRGraph`
+        :param pheromone: pheromone levels (default is the compiled graph)
+        :type pheromone: :class:`CSRPheromoneStore`
+        :return: one solution or ``None`` if the ant reached a dead end and
+                 does not repair its tours
+        :rtype: :class:`SparseSolution`
+        """
+        solution = self.initialize_solution(graph)
+        remaining = len(graph) - 1
+        while remaining:
+            unvisited = self.get_unvisited_nodes(graph, solution)
+            if unvisited:
+                slot = self.choose_destination(graph, solution.current,
+                                               unvisited, pheromone=pheromone)
+                solution.add_node(graph.indices[slot])
+            elif not self.repair or not solution.repair():
+                return None
+            remaining -= 1
+        solution.close()
+        return solution
+
+    def get_starting_node(self, graph):
+        """Return a starting node index for an ant.
+
+        :param graph: the graph being solved
+        :type graph: :class:`CSRGraph`
+        :return: node index
+        :rtype: int
+        """
+        return random.randrange(len(graph))
+
+    def get_unvisited_nodes(self, graph, solution):
+        """Return the slots of the edges to unvisited neighbors.
+
+        :param graph: the graph being solved
+        :type graph: :class:`CSRGraph`
+        :param solution: in progress solution
+        :type solution: :class:`SparseSolution`
+        :return: slots
+        :rtype: list
+        """
+        indices = graph.indices
+        visited = solution.visited
+        return [s for s in graph.neighbors(solution.current)
+                if not visited[indices[s]]]
+
+    def get_scores(self, graph, current, destinations, pheromone=None):
+        """Return scores for the given slots.
+
+        :param graph: the graph being solved
+        :type graph: :class:`CSRGraph`
+        :param int current: the node from which to score the destinations
+        :param list destinations: slots of the available edges
+        :param pheromone: pheromone levels (default is the compiled graph)
+        :type pheromone: :class:`CSRPheromoneStore`
+        :return: scores
+        :rtype: list
+        """
+        levels = _get_levels(graph, pheromone)
+        return [self.score(graph.weights[slot], levels[graph.edges[slot]])
+                for slot in destinations]
+
+
+class SparseColony(Colony):
+    """Colony of :class:`SparseAnt` s.
+
+    :param float alpha: relative factor for edge pheromone
+    :param float beta: relative factor for edge weight
+    :param bool repair: whether ants repair their tours at dead ends
+    """
+
+    ant_class = SparseAnt
+
+    def __init__(self, alpha=1, beta=3, repair=True):
+        super().__init__(alpha=alpha, beta=beta)
+        self.repair = repair
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(alpha={self.alpha}, '
+                f'beta={self.beta}, repair={self.repair})')
+
+
+class SparseSolver(Solver):
+    """ACO solver for sparse graphs.
+
+    Graphs are compiled into a :class:`CSRGraph` before solving. The
+    pheromone levels are kept in a :class:`CSRPheromoneStore`, so one compiled
+    graph can be solved by many solvers at once. Use a :class:`SparseColony`
+    as the source of ants.
+
+    Initializers that only set a level, such as
+    :class:`~acopy.initializers.Constant`, are supported, but those that
+    start from seed tours are not.
+
+    :param float rho: percentage of pheromone that evaporates each iteration
+    :param float q: amount of pheromone each ant can deposit
+    :param int top: number of ants that deposit pheromone
+    :param list plugins: zero or more solver plugins
+    :param init: initial pheromone strategy
+    :type init: :class:`~acopy.initializers.Initializer`
+    :raises ValueError: if the initializer starts from seed tours
+    """
+
+    def __init__(self, rho=.03, q=1, top=None, plugins=None, init=None,
+                 **kwargs):
+        if init is not None and _has_tours(init):
+            raise ValueError(f'{init!r} starts from seed tours, which '
+                             'compiled graphs do not support')
+        super().__init__(rho=rho, q=q, top=top, plugins=plugins, init=init,
+                         **kwargs)
+
+    def optimize(self, graph, colony, gen_size=None, limit=None):
+        """Find and return increasingly better solutions.
+
+        :param graph: graph to solve
+        :type graph: :class:`networkx.Graph` or :class:`CSRGraph`
+        :param colony: colony from which to source each :class:`SparseAnt`
+        :type colony: :class:`SparseColony`
+        :param int gen_size: number of :class:`SparseAnt` s to use
+                             (default is one per graph node)
+        :param int limit: maximum number of iterations to perform (default is
+                          unlimited so it will run forever)
+        :return: better solutions as they are found
+        :rtype: iter
+        """
+        if not isinstance(graph, CSRGraph):
+            graph = CSRGraph.from_graph(graph)
+        yield from super().optimize(graph, colony, gen_size=gen_size,
+                                    limit=limit)
+
+    def get_pheromone_store(self, graph):
+        """Return new pheromone storage for the compiled graph.
+
+        :param graph: graph to solve
+        :type graph: :class:`CSRGraph`
+        :rtype: :class:`CSRPheromoneStore`
+        """
+        return CSRPheromoneStore(graph)
+
+    def initialize_pheromone(self, graph, pheromone):
+        """Start from the pheromone levels of the compiled graph.
+
+        If the solver has an initializer, every edge is set to its level.
+
+        :param graph: graph to solve
+        :type graph: :class:`CSRGraph`
+        :param pheromone: pheromone levels of the graph
+        :type pheromone: :class:`CSRPheromoneStore`
+        :return: seed solutions
+        :rtype: list
+        """
+        if self.init is not None:
+            pheromone.reset(self.init.get_level(graph, []))
+        return []
+
+    def global_update(self, state):
+        """Perform a global pheromone update.
+
+        :param state: solver state
+        :type state: :class:`~acopy.solvers.State`
+        """
+        graph = state.graph
+        state.pheromone.evaporate(self.rho)
+        pheromone = state.pheromone.data
+        if self.top:
+            solutions = state.solutions[:self.top]
+        else:
+            solutions = state.solutions
+        for solution in solutions:
+            amount = self.q / solution.cost
+            for slot in solution.slots:
+                pheromone[graph.edges[slot]] += amount
+
+
+def _has_tours(init):
+    # seed tours are built from and traced on networkx graphs
+    cls = type(init)
+    return (cls.get_tours is not Initializer.get_tours or
+            cls.initialize is not Initializer.initialize)
+
+
+def _get_levels(graph, pheromone):
+    return graph.pheromone if pheromone is None else pheromone.data
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+"""Parameter tuning by racing.
+
+Racing (F-race) evaluates a set of candidate configurations on one instance
+and seed (a block) at a time. Once enough blocks have been evaluated, a
+Friedman test on the ranks of the candidates within each block decides
+whether they differ; if so, every candidate that is significantly worse than
+the best one according to the post-hoc test is eliminated. This spends most
+of the evaluations on the promising candidates.
+"""
+import itertools
+import json
+import math
+import multiprocessing
+import random
+
+from . import ant
+from . import batch
+from . import solvers
+
+
+def get_candidates(space, count=None):
+    """Return candidate configurations from a parameter space.
+
+    :param dict space: list of values for each parameter
+    :param int count: maximum number of candidates (sampled at random from
+                      the full grid if it has more)
+    :return: configurations
+    :rtype: list
+    """
+    names = sorted(space)
+    grid = [dict(zip(names, values))
+            for values in itertools.product(*(space[n] for n in names))]
+    if count is not None and count < len(grid):
+        grid = random.sample(grid, count)
+    return grid
+
+
+def get_solver(config):
+    """Return the solver, colony, and number of ants for a configuration.
+
+    :param dict config: configuration
+    :return: solver, colony, and number of ants
+    :rtype: tuple
+    """
+    solver = solvers.Solver(rho=config.get('rho', .03),
+                            q=config.get('q', 1),
+                            top=config.get('top'))
+    colony = ant.Colony(alpha=config.get('alpha', 1),
+                        beta=config.get('beta', 3))
+    return solver, colony, config.get('ants')
+
+
+def load_config(path):
+    """Load a configuration from a JSON file.
+
+    :param str path: path to the file
+    :rtype: dict
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_config(config, path):
+    """Save a configuration to a JSON file.
+
+    :param dict config: configuration
+    :param str path: path to the file
+    """
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def rank(values):
+    """Return the ranks of the values, giving ties their average rank.
+
+    :param list values: values to rank
+    :return: ranks starting at 1
+    :rtype: list
+    """
+    order = sorted(range(len(values)), key=values.__getitem__)
+    ranks = [0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        value = values[order[i]]
+        while j + 1 < len(order) and values[order[j + 1]] == value:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def friedman(blocks, confidence=.95):
+    """Return the candidates that are not significantly worse than the best.
+
+    :param list blocks: one list of costs per block, one cost per candidate
+    :param float confidence: confidence level of the tests
+    :return: indexes of the surviving candidates
+    :rtype: list
+    """
+    b, k = len(blocks), len(blocks[0])
+    ranks = [rank(costs) for costs in blocks]
+    totals = [sum(r[j] for r in ranks) for j in range(k)]
+    a = sum(x * x for r in ranks for x in r)
+    c = b * k * (k + 1) ** 2 / 4
+    if a == c:
+        return list(range(k))  # all candidates tie in every block
+
+    t = (k - 1) * sum((r - b * (k + 1) / 2) ** 2 for r in totals) / (a - c)
+    if _chi2_sf(t, k - 1) >= 1 - confidence:
+        return list(range(k))
+
+    df = (b - 1) * (k - 1)
+    spread = math.sqrt(2 * b * (a - c) / df * (1 - t / (b * (k - 1))))
+    critical = _t_ppf(1 - (1 - confidence) / 2, df) * spread
+    best = min(totals)
+    return [j for j in range(k) if totals[j] - best <= critical]
+
+
+def race(candidates, paths, format_, limit=None, budget=None, first_test=5,
+         confidence=.95, seed=None, workers=None):
+    """Race the candidate configurations on the graphs in the files.
+
+    Each block solves one file (in turn) with one seed for every surviving
+    candidate in parallel.
+
+    :param list candidates: configurations to race
+    :param list paths: paths to the files
+    :param str format_: format of the files
+    :param int limit: maximum number of iterations per solve
+    :param int budget: maximum number of solves (default is enough for each
+                       candidate to see every file 5 times)
+    :param int first_test: number of blocks before the first test
+    :param float confidence: confidence level of the tests
+    :param str seed: random seed for the race
+    :param int workers: number of processes (default is one per CPU)
+    :return: surviving candidates and their mean cost rank, best first,
+             after each block
+    :rtype: iter
+    :raises ValueError: if the budget is less than one solve per candidate
+    """
+    if budget is not None and budget < len(candidates):
+        raise ValueError('the budget must allow one solve per candidate')
+    if seed is None:
+        seed = str(random.getrandbits(64))
+    if budget is None:
+        budget = len(candidates) * len(paths) * 5
+    survivors = list(range(len(candidates)))
+    results = []  # results[block][candidate] for every candidate
+    spent = 0
+    with multiprocessing.Pool(workers) as pool:
+        for block in itertools.count():
+            if len(survivors) < 2 and results:
+                break
+            if spent + len(survivors) > budget:
+                break
+            path = paths[block % len(paths)]
+            tasks = []
+            for i in survivors:
+                solver, colony, gen_size = get_solver(candidates[i])
+                tasks.append({
+                    'path': path,
+                    'format_': format_,
+                    'solver': solver,
+                    'colony': colony,
+                    'gen_size': gen_size,
+                    'limit': limit,
+                    'seed': f'{seed}:{block}',
+                })
+            costs = dict.fromkeys(range(len(candidates)))
+            for i, result in zip(survivors, pool.map(batch._solve_task,
+                                                     tasks, chunksize=1)):
+                if result['error']:
+                    raise RuntimeError(f'{path}: {result["error"]}')
+                costs[i] = result['cost']
+            results.append(costs)
+            spent += len(survivors)
+
+            blocks = [[r[i] for i in survivors] for r in results]
+            if len(results) >= first_test and len(survivors) > 1:
+                survivors = [survivors[j] for j in friedman(blocks,
+                                                            confidence)]
+                blocks = [[r[i] for i in survivors] for r in results]
+
+            mean_ranks = [sum(x) / len(blocks)
+                          for x in zip(*(rank(b) for b in blocks))]
+            ordered = sorted(zip(mean_ranks, survivors))
+            yield [(candidates[i], r) for r, i in ordered]
+
+
+def _chi2_sf(x, df):
+    # P(X > x) for a chi-square distribution; the regularized upper incomplete
+    # gamma function Q(df / 2, x / 2)
+    a, x = df / 2, x / 2
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1 / a
+        for n in range(1, 500):
+            term *= x / (a + n)
+            total += term
+            if abs(term) < abs(total) * 1e-15:
+                break
+        return max(0.0, 1 - total * math.exp(log_prefix))
+    # continued fraction (modified Lentz)
+    b = x + 1 - a
+    c = 1 / 1e-300
+    d = 1 / b
+    h = d
+    for n in range(1, 500):
+        an = -n * (n - a)
+        b += 2
+        d = an * d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an / c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+    return math.exp(log_prefix) * h
+
+
+def _betainc(a, b, x):
+    # regularized incomplete beta function I_x(a, b)
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    if x > (a + 1) / (a + b + 2):
+        return 1 - _betainc(b, a, 1 - x)
+    log_prefix = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) +
+                  a * math.log(x) + b * math.log(1 - x))
+    c, d = 1.0, 1 - (a + b) * x / (a + 1)
+    d = 1 / (1e-300 if abs(d) < 1e-300 else d)
+    h = d
+    for m in range(1, 500):
+        for numerator, step in (
+                (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)), False),
+                (-(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1)),
+                 True)):
+            d = 1 + numerator * d
+            d = 1 / (1e-300 if abs(d) < 1e-300 else d)
+            c = 1 + numerator / c
+            c = 1e-300 if abs(c) < 1e-300 else c
+            h *= d * c
+            if step and abs(d * c - 1) < 1e-15:
+                return math.exp(log_prefix) * h / a
+    return math.exp(log_prefix) * h / a
+
+
+def _t_cdf(t, df):
+    tail = _betainc(df / 2, .5, df / (df + t * t)) / 2
+    return 1 - tail if t > 0 else tail
+
+
+def _t_ppf(p, df):
+    lo, hi = -1e3, 1e3
+    for __ in range(100):
+        mid = (lo + hi) / 2
+        if _t_cdf(mid, df) < p:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
@@ -1,6 +1,24 @@
 # -*- coding: utf-8 -*-
-from . import data  # noqa: F401
-from . import plot  # noqa: F401
+import importlib
+import sys
+
 from .general import looper  # noqa: F401
 from .general import is_plot_enabled  # noqa: F401
 from .general import positive  # noqa: F401
+from .general import get_peak_rss  # noqa: F401
+from .general import IndexedSet  # noqa: F401
+
+
+def __getattr__(name):
+    # these modules import networkx, tsplib95, numpy, or matplotlib, so they
+    # are only imported when first used
+    if name in ('data', 'plot', 'tsplib'):
+        return importlib.import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+if sys.version_info < (3, 7):
+    # modules cannot define __getattr__ before Python 3.7
+    from . import data  # noqa: F401
+    from . import plot  # noqa: F401
+    from . import tsplib  # noqa: F401
@@ -4,11 +4,13 @@ import json
 import string
 import math
 
-import tsplib95
-import networkx
+# networkx and tsplib95 are slow to import, so they are imported by the
+# functions that need them rather than by the module
 
 
 def get_formats():
+    import networkx
+
     supported = ['json', 'tsplib95']
     for d in dir(networkx):
         if d.startswith('read_') and callable(getattr(networkx, d)):
@@ -19,17 +21,50 @@ def get_formats():
 
 
 def read_json(path):
+    import networkx
+
     with open(path) as f:
         data = json.load(f)
     return networkx.Graph(data)
 
 
 def read_tsplib95(path):
+    import tsplib95
+
+    from . import tsplib
+
+    # the fast reader covers the common problems, tsplib95 the rest
+    try:
+        return tsplib.read(path).get_graph()
+    except ValueError:
+        problem = tsplib95.load(path)
+        return problem.get_graph()
+
+
+def read_tsplib95_points(path):
+    """Return the coordinates of the nodes of a TSPLIB problem.
+
+    Unlike :func:`read_tsplib95` this does not compute the weight of every
+    edge, so it works for problems far too large for a complete graph.
+
+    :param str path: path to the problem file
+    :return: map of coordinates by node and the distance function of the
+             problem, which takes two coordinates
+    :rtype: tuple
+    :raises ValueError: if the problem has no coordinates for its nodes
+    """
+    import tsplib95
+
     problem = tsplib95.load(path)
-    return problem.get_graph()
+    distance = tsplib95.distances.TYPES.get(problem.edge_weight_type)
+    if not problem.node_coords or distance is None:
+        raise ValueError(f'{path} has no coordinates for its nodes')
+    return dict(problem.node_coords), distance
 
 
 def read_graph_data(path, format_):
+    import networkx
+
     if format_ == 'json':
         read_format = read_json
     elif format_ == 'tsplib95':
@@ -40,6 +75,8 @@ def read_graph_data(path, format_):
 
 
 def get_demo_graph():
+    import networkx
+
     TEST_COORDS_33 = [
         (34.021150, -84.267249), (34.021342, -84.363437),
         (34.022585, -84.362150), (34.022718, -84.361903),
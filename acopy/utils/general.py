@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 import sys
+import importlib.util
 import itertools
 
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
 
 def looper(limit):
     """Return an optionally endless list of indexes."""
@@ -13,19 +19,15 @@ def looper(limit):
 def is_plot_enabled():
     """Return true if plotting is enabled.
 
-    Plotting requires matplotlib and pandas to be installed.
+    Plotting requires matplotlib to be installed. It is looked for without
+    being imported.
 
     :return: indication of whether plotting is enabled
     :rtype: bool
     """
     if is_plot_enabled.cache is None:
-        try:
-            import matplotlib  # noqa: 401
-            import pandas  # noqa: 401
-        except ImportError:
-            is_plot_enabled.cache = False
-        else:
-            is_plot_enabled.cache = True
+        spec = importlib.util.find_spec('matplotlib')
+        is_plot_enabled.cache = spec is not None
     return is_plot_enabled.cache
 
 
@@ -34,3 +36,77 @@ is_plot_enabled.cache = None
 
 def positive(value):
     return max(value, sys.float_info.min)
+
+
+def get_peak_rss():
+    """Return the peak resident set size of the process so far.
+
+    :return: bytes or ``None`` if it cannot be measured on this platform
+    :rtype: int
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes everywhere except on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class IndexedSet:
+    """Array of distinct items with constant time removal.
+
+    Removing an item moves the last item into its place, so the order of the
+    items is not preserved.
+
+    :param iterable items: initial items
+    """
+
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.positions = {item: i for i, item in enumerate(self.items)}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __getitem__(self, index):
+        return self.items[index]
+
+    def reset(self, items=()):
+        """Replace the items, reusing the storage.
+
+        :param iterable items: the new items
+        """
+        self.items.clear()
+        self.positions.clear()
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Add an item if not already present."""
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def remove(self, item):
+        """Remove an item.
+
+        :raises KeyError: if the item is not present
+        """
+        self.pop(self.positions[item])
+
+    def pop(self, index=-1):
+        """Remove and return the item at the given position."""
+        items = self.items
+        index %= len(items)
+        item = items[index]
+        last = items.pop()
+        del self.positions[item]
+        if index < len(items):
+            items[index] = last
+            self.positions[last] = index
+        return item
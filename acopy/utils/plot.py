@@ -1,13 +1,90 @@
 # -*- coding: utf-8 -*-
+import collections
 import functools
 
 try:
     import matplotlib.pyplot as plt
-    import pandas as pd
 except ImportError:
     pass
 
 
+class Downsampler:
+    """Bounded min/max/mean summary of a growing series of values.
+
+    Consecutive values are summarised in buckets of :attr:`width` values.
+    Once there are twice as many buckets as ``size``, neighboring buckets are
+    merged and the width doubles, so the summary never holds more than
+    ``2 * size`` buckets however long the series gets.
+
+    :param int size: number of buckets to aim for (such as the width of the
+                     plot in pixels)
+    """
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.width = 1
+        self.count = 0
+        self.buckets = []  # [low, high, total, number of values]
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value, low=None, high=None):
+        """Add the next value of the series.
+
+        A value of ``None`` takes up a position without being summarised.
+
+        :param float value: the value
+        :param float low: lowest value if the value is itself a summary
+        :param float high: highest value if the value is itself a summary
+        """
+        if self.count % self.width == 0:
+            if len(self.buckets) == 2 * self.size:
+                self._merge()
+            self.buckets.append([float('inf'), float('-inf'), 0, 0])
+        self.count += 1
+        if value is None:
+            return
+        bucket = self.buckets[-1]
+        bucket[0] = min(bucket[0], value if low is None else low)
+        bucket[1] = max(bucket[1], value if high is None else high)
+        bucket[2] += value
+        bucket[3] += 1
+
+    def extend(self, values):
+        """Add many values of the series.
+
+        :param list values: the values
+        """
+        for value in values:
+            self.add(value)
+
+    def summary(self):
+        """Return the summary of each bucket that holds a value.
+
+        :return: the middle positions, lows, highs, and means of the buckets
+        :rtype: tuple
+        """
+        xs, lows, highs, means = [], [], [], []
+        for i, (low, high, total, n) in enumerate(self.buckets):
+            if n:
+                start = i * self.width
+                filled = min(self.width, self.count - start)
+                xs.append(start + (filled - 1) / 2)
+                lows.append(low)
+                highs.append(high)
+                means.append(total / n)
+        return xs, lows, highs, means
+
+    def _merge(self):
+        merged = []
+        for a, b in zip(self.buckets[::2], self.buckets[1::2]):
+            merged.append([min(a[0], b[0]), max(a[1], b[1]),
+                           a[2] + b[2], a[3] + b[3]])
+        self.buckets = merged
+        self.width *= 2
+
+
 class Plotter:
     """Utility for plotting iteration data using matplotlib.
 
@@ -15,51 +92,121 @@ class Plotter:
     plugin which collects stats about solutions and pheromone levels on each
     iteration.
 
+    Stats are summarised lazily, a chunk of iterations at a time, into
+    :class:`Downsampler` s with about one bucket per pixel, so the cost of a
+    plot does not grow with the number of iterations. Stats recorded since
+    the last plot are picked up by :meth:`refresh`, which makes it possible
+    to plot while the solver runs (see :class:`~acopy.plugins.LivePlot`).
+
     :param dict stats: map of stats by name
+    :param int size: number of buckets per series
+    :param int chunk_size: number of iterations to summarise at a time
     """
 
-    def __init__(self, stats):
+    #: series of each stat that holds a map of values by name
+    SERIES = {
+        'solutions': ['best', 'worst', 'avg', 'global_best'],
+        'edge_pheromone': ['min', 'max', 'avg'],
+        'unique_solutions': ['total', 'iteration', 'new'],
+    }
+
+    #: stats shown by :meth:`plot` and their titles
+    FIGURES = [
+        ('solutions', 'Solutions (stats)'),
+        ('pheromone_levels', 'Edge Pheromone (levels)'),
+        ('edge_pheromone', 'Edge Pheromone (stats)'),
+        ('unique_solutions', 'Solutions (uniqueness)'),
+    ]
+
+    def __init__(self, stats, size=1000, chunk_size=1000):
         self.stats = stats
+        self.size = size
+        self.chunk_size = chunk_size
+        self.series = collections.defaultdict(dict)
+        self.axes = {}
+        self._cursors = collections.Counter()
 
     def plot(self):
         """Create and show the plot."""
-        plt.figure()
-        plt.title('Solutions (stats)')
-        self.plot_solutions()
+        self.show(block=True)
+
+    def show(self, block=False):
+        """Show the plot, creating it first if necessary.
+
+        :param bool block: whether to wait until the plot is closed
+        """
+        if not self.axes:
+            for stat, title in self.FIGURES:
+                plt.figure()
+                plt.title(title)
+                self.axes[stat] = plt.gca()
+        self.refresh()
+        plt.show(block=block)
 
-        plt.figure()
-        plt.title('Edge Pheromone (levels)')
-        self.plot_pheromone_levels(legend=False)
+    def refresh(self):
+        """Summarise new stats and redraw the plot if it is shown."""
+        self.update()
+        for stat, ax in self.axes.items():
+            title = ax.get_title()
+            ax.cla()
+            ax.set_title(title)
+            self._plot(stat, ax=ax, legend=stat != 'pheromone_levels')
+            ax.figure.canvas.draw_idle()
+            ax.figure.canvas.flush_events()
 
-        plt.figure()
-        plt.title('Edge Pheromone (stats)')
-        self.plot_edge_pheromone()
+    def update(self):
+        """Summarise the stats recorded since the last update."""
+        for stat, records in list(self.stats.items()):
+            start = self._cursors[stat]
+            while start < len(records):
+                chunk = records[start:start + self.chunk_size]
+                self._summarise(stat, chunk)
+                start += len(chunk)
+            self._cursors[stat] = start
 
-        plt.figure()
-        plt.title('Solutions (uniqueness)')
-        self.plot_unique_solutions()
+    def get_series(self, stat, name):
+        """Return the summary of one series of a stat.
 
-        plt.show()
+        :param str stat: name of the stat
+        :param str name: name of the series
+        :rtype: :class:`Downsampler`
+        """
+        series = self.series[stat]
+        if name not in series:
+            series[name] = Downsampler(self.size)
+        return series[name]
 
-    def _plot(self, stat, ax=None, **kwargs):
-        data = self._extract_and_process(stat)
-        data.plot(ax=ax or plt.gca(), **kwargs)
+    def _summarise(self, stat, chunk):
+        if stat == 'pheromone_levels':
+            series = self.get_series(stat, 'levels')
+            for levels in chunk:
+                if levels:
+                    series.add(sum(levels) / len(levels),
+                               low=min(levels), high=max(levels))
+                else:
+                    series.add(None)
+        elif stat in self.SERIES:
+            for name in self.SERIES[stat]:
+                series = self.get_series(stat, name)
+                for record in chunk:
+                    series.add(record[name])
+        else:
+            self.get_series(stat, stat).extend(chunk)
+
+    def _plot(self, stat, ax=None, legend=True):
+        self.update()
+        ax = ax or plt.gca()
+        for name, series in self.series[stat].items():
+            xs, lows, highs, means = series.summary()
+            line, = ax.plot(xs, means, label=name)
+            if lows != highs:
+                ax.fill_between(xs, lows, highs, alpha=.25,
+                                color=line.get_color(), linewidth=0)
+        if legend:
+            ax.legend()
 
     def __getattr__(self, name):
         if name.startswith('plot_'):
             __, stat = name.split('_', 1)
             return functools.partial(self._plot, stat)
         raise AttributeError(name)
-
-    def _extract_and_process(self, stat):
-        extractor = getattr(self, f'extract_{stat}', lambda: self.stats[stat])
-        processor = getattr(self, f'process_{stat}', lambda d: pd.DataFrame(d))
-        return processor(extractor())
-
-    def extract_ant_distances(self):
-        iterations = []
-        for distances in self.stats['ant_distances']:
-            if all(d is not None for d in distances):
-                distances = list(sorted(distances))
-            iterations.append(distances)
-        return iterations
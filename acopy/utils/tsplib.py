@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+"""Fast reader for large TSPLIB problems.
+
+Loading a problem with :mod:`tsplib95` and building its graph computes every
+distance with a Python function call and keeps every edge in a networkx
+dictionary, which takes minutes for a few thousand nodes. This reader parses
+the node coordinates or the explicit edge weights straight into arrays and
+computes the distances of EUC_2D, CEIL_2D, ATT, and GEO problems a whole
+matrix at a time (with numpy, if it is installed), so a problem can be fed to
+the sparse solver without building a networkx graph at all.
+
+Distances are rounded exactly as in the TSPLIB specification, including its
+value of pi for GEO problems.
+"""
+import array
+import itertools
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+#: distance types whose distances can be computed from coordinates
+DISTANCE_TYPES = ('EUC_2D', 'CEIL_2D', 'ATT', 'GEO')
+
+#: explicit formats listing the upper triangle of the matrix row by row
+UPPER_FORMATS = ('UPPER_ROW', 'UPPER_DIAG_ROW', 'LOWER_COL', 'LOWER_DIAG_COL')
+
+#: explicit formats listing the lower triangle of the matrix row by row
+LOWER_FORMATS = ('LOWER_ROW', 'LOWER_DIAG_ROW', 'UPPER_COL', 'UPPER_DIAG_COL')
+
+GEO_PI = 3.141592
+GEO_RADIUS = 6378.388
+
+
+class Problem:
+    """A TSPLIB problem read into arrays.
+
+    The weights form a row-major matrix in which the weight from the node at
+    index ``i`` to the node at index ``j`` is ``weights[i * n + j]``.
+
+    :param dict specs: the specification part of the problem
+    :param list nodes: the node labels
+    :param weights: the weight matrix as a flat array
+    :type weights: :class:`array.array`
+    :param list coords: coordinates of the nodes, if given
+    """
+
+    def __init__(self, specs, nodes, weights, coords=None):
+        self.specs = specs
+        self.nodes = nodes
+        self.weights = weights
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(name={self.name!r}, '
+                f'nodes={len(self)})')
+
+    @property
+    def name(self):
+        """Name of the problem."""
+        return self.specs.get('NAME')
+
+    @property
+    def is_directed(self):
+        """Whether the weights of the problem are asymmetric."""
+        return self.specs.get('TYPE') == 'ATSP'
+
+    def get_weight(self, i, j):
+        """Return the weight of the edge between two nodes.
+
+        :param int i: index of the first node
+        :param int j: index of the second node
+        :rtype: int
+        """
+        return self.weights[i * len(self) + j]
+
+    def get_points(self):
+        """Return the coordinates of the nodes.
+
+        :return: map of coordinates by node
+        :rtype: dict
+        :raises ValueError: if the problem has no coordinates for its nodes
+        """
+        if self.coords is None:
+            raise ValueError(f'{self.name} has no coordinates for its nodes')
+        return dict(zip(self.nodes, self.coords))
+
+    def get_graph(self):
+        """Return the complete graph of the problem.
+
+        Unlike :meth:`tsplib95.models.StandardProblem.get_graph`, the graph
+        has no self-loops.
+
+        :rtype: :class:`networkx.Graph`
+        """
+        import networkx
+
+        graph = networkx.DiGraph() if self.is_directed else networkx.Graph()
+        graph.graph.update(name=self.name, type=self.specs.get('TYPE'),
+                           dimension=len(self))
+        coords = self.coords or itertools.repeat(None)
+        for node, coord in zip(self.nodes, coords):
+            graph.add_node(node, coord=coord)
+        n = len(self)
+        weights = self.weights
+        for i, u in enumerate(self.nodes):
+            start = 0 if self.is_directed else i + 1
+            row = i * n
+            graph.add_edges_from((u, self.nodes[j],
+                                  {'weight': weights[row + j]})
+                                 for j in range(start, n) if j != i)
+        return graph
+
+    def get_csr_graph(self, typecode='d'):
+        """Return the complete graph of the problem compiled into arrays.
+
+        :param str typecode: typecode of the pheromone array (``'d'`` or
+                             ``'f'``)
+        :rtype: :class:`~acopy.sparse.CSRGraph`
+        """
+        from ..sparse import CSRGraph
+
+        n = len(self)
+        if numpy is not None:
+            indices, weights, edges = self._get_csr_arrays_vectorized()
+        else:
+            indices, weights, edges = self._get_csr_arrays()
+        indptr = array.array('q', range(0, n * (n - 1) + 1, n - 1))
+        num_edges = n * (n - 1) if self.is_directed else n * (n - 1) // 2
+        return CSRGraph(list(self.nodes), indptr, indices, weights, edges,
+                        num_edges, typecode=typecode,
+                        directed=self.is_directed)
+
+    def _get_csr_arrays(self):
+        n = len(self)
+        indices = array.array('i')
+        weights = array.array(self.weights.typecode)
+        edges = array.array('i')
+        for i in range(n):
+            row = i * n
+            for j in range(n):
+                if j == i:
+                    continue
+                indices.append(j)
+                weights.append(self.weights[row + j])
+                if self.is_directed:
+                    edges.append(len(edges))
+                else:
+                    edges.append(_get_pair_index(n, min(i, j), max(i, j)))
+        return indices, weights, edges
+
+    def _get_csr_arrays_vectorized(self):
+        n = len(self)
+        mask = ~numpy.eye(n, dtype=bool)
+        rows, cols = numpy.nonzero(mask)
+        matrix = numpy.frombuffer(self.weights, dtype=self.weights.typecode)
+        slot_weights = matrix.reshape(n, n)[mask]
+        if self.is_directed:
+            slot_edges = numpy.arange(len(rows))
+        else:
+            lo, hi = numpy.minimum(rows, cols), numpy.maximum(rows, cols)
+            slot_edges = _get_pair_index(n, lo, hi)
+        typecode = self.weights.typecode
+        return (_to_array('i', cols), _to_array(typecode, slot_weights),
+                _to_array('i', slot_edges))
+
+
+def read(path):
+    """Read a TSPLIB problem into arrays.
+
+    The problem must either give the coordinates of its nodes and use one of
+    the :data:`DISTANCE_TYPES`, or give its weights explicitly.
+
+    :param str path: path to the problem file
+    :rtype: :class:`Problem`
+    :raises ValueError: if the problem is not supported
+    """
+    with open(path) as f:
+        return parse(f.read())
+
+
+def parse(text):
+    """Parse the text of a TSPLIB problem into arrays.
+
+    :param str text: the problem
+    :rtype: :class:`Problem`
+    :raises ValueError: if the problem is not supported
+    """
+    specs, sections = _split(text)
+    edge_weight_type = specs.get('EDGE_WEIGHT_TYPE')
+    coords = None
+    if 'NODE_COORD_SECTION' in sections:
+        labels, coords = _parse_coords(sections['NODE_COORD_SECTION'])
+        nodes = sorted(labels)
+        order = {label: i for i, label in enumerate(labels)}
+        coords = [coords[order[node]] for node in nodes]
+    elif 'DISPLAY_DATA_SECTION' in sections:
+        labels, __ = _parse_coords(sections['DISPLAY_DATA_SECTION'])
+        nodes = sorted(labels)
+    elif 'DIMENSION' in specs:
+        nodes = list(range(int(specs['DIMENSION'])))
+    else:
+        raise ValueError('unsupported problem: the nodes are not given')
+
+    if edge_weight_type == 'EXPLICIT':
+        values = ' '.join(sections.get('EDGE_WEIGHT_SECTION', ())).split()
+        weights = get_explicit_weights(values, len(nodes),
+                                       specs.get('EDGE_WEIGHT_FORMAT'))
+    elif edge_weight_type in DISTANCE_TYPES and coords is not None:
+        weights = get_distances(coords, edge_weight_type)
+    else:
+        raise ValueError(f'unsupported problem: EDGE_WEIGHT_TYPE is '
+                         f'{edge_weight_type}')
+    return Problem(specs, nodes, weights, coords=coords)
+
+
+def get_distances(coords, edge_weight_type):
+    """Return the matrix of distances between the coordinates.
+
+    :param list coords: the coordinates as pairs
+    :param str edge_weight_type: one of the :data:`DISTANCE_TYPES`
+    :return: the distance matrix as a flat array
+    :rtype: :class:`array.array`
+    :raises ValueError: if the distance type is not supported
+    """
+    if edge_weight_type not in DISTANCE_TYPES:
+        raise ValueError(f'unsupported distance type: {edge_weight_type}')
+    if numpy is not None:
+        return _get_distances_vectorized(coords, edge_weight_type)
+    distance = {
+        'EUC_2D': _euclidean,
+        'CEIL_2D': _ceil_euclidean,
+        'ATT': _pseudo_euclidean,
+        'GEO': _geographical,
+    }[edge_weight_type]
+    if edge_weight_type == 'GEO':
+        coords = [(_geo_radians(x), _geo_radians(y)) for x, y in coords]
+    weights = array.array('i')
+    for a in coords:
+        weights.extend([distance(a, b) for b in coords])
+    return weights
+
+
+def get_explicit_weights(values, n, edge_weight_format):
+    """Return the matrix of explicit weights.
+
+    :param list values: the weights as listed in the problem
+    :param int n: number of nodes
+    :param str edge_weight_format: the format of the listed weights
+    :return: the weight matrix as a flat array
+    :rtype: :class:`array.array`
+    :raises ValueError: if the format is not supported
+    """
+    if any('.' in v or 'e' in v.lower() for v in values):
+        typecode, convert = 'd', float
+    else:
+        typecode, convert = 'i', int
+    if edge_weight_format == 'FULL_MATRIX':
+        return array.array(typecode, map(convert, values[:n * n]))
+
+    diagonal = 'DIAG' in (edge_weight_format or '')
+    if edge_weight_format in UPPER_FORMATS:
+        offset = 0 if diagonal else 1
+        pairs = ((i, j) for i in range(n) for j in range(i + offset, n))
+    elif edge_weight_format in LOWER_FORMATS:
+        offset = 1 if diagonal else 0
+        pairs = ((i, j) for i in range(n) for j in range(i + offset))
+    else:
+        raise ValueError(f'unsupported format: {edge_weight_format}')
+
+    weights = array.array(typecode, [0]) * (n * n)
+    for (i, j), value in zip(pairs, values):
+        weights[i * n + j] = weights[j * n + i] = convert(value)
+    return weights
+
+
+def _split(text):
+    specs = {}
+    sections = {}
+    lines = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line[0].isalpha():
+            key, __, value = line.partition(':')
+            key = key.strip()
+            if key == 'EOF':
+                break
+            if key.endswith('_SECTION'):
+                lines = sections[key] = []
+                if value.strip():
+                    lines.append(value)
+            else:
+                specs[key] = value.strip()
+                lines = None
+        elif lines is not None:
+            lines.append(line)
+    return specs, sections
+
+
+def _parse_coords(lines):
+    labels = []
+    coords = []
+    for line in lines:
+        label, *coord = line.split()
+        labels.append(int(label))
+        coords.append(tuple(map(float, coord)))
+    return labels, coords
+
+
+def _nint(x):
+    return int(x + 0.5)
+
+
+def _square(a, b):
+    dx, dy = a[0] - b[0], a[1] - b[1]
+    return dx * dx + dy * dy
+
+
+def _euclidean(a, b):
+    return _nint(math.sqrt(_square(a, b)))
+
+
+def _ceil_euclidean(a, b):
+    return math.ceil(math.sqrt(_square(a, b)))
+
+
+def _pseudo_euclidean(a, b):
+    r = math.sqrt(_square(a, b) / 10)
+    t = _nint(r)
+    return t + 1 if t < r else t
+
+
+def _geo_radians(value):
+    degrees = int(value)
+    return GEO_PI * (degrees + 5 * (value - degrees) / 3) / 180
+
+
+def _geographical(a, b):
+    q1 = math.cos(a[1] - b[1])
+    q2 = math.cos(a[0] - b[0])
+    q3 = math.cos(a[0] + b[0])
+    cos = .5 * ((1 + q1) * q2 - (1 - q1) * q3)
+    return int(GEO_RADIUS * math.acos(max(-1, min(cos, 1))) + 1)
+
+
+def _get_distances_vectorized(coords, edge_weight_type,
+                              block_size=2 ** 20):
+    xy = numpy.array(coords, dtype=float)
+    if edge_weight_type == 'GEO':
+        degrees = numpy.trunc(xy)
+        xy = GEO_PI * (degrees + 5 * (xy - degrees) / 3) / 180
+    x, y = xy[:, 0], xy[:, 1]
+
+    # a block of rows at a time keeps the temporary matrices small
+    weights = array.array('i')
+    rows = max(1, block_size // len(xy))
+    for start in range(0, len(xy), rows):
+        a, b = x[start:start + rows, None], y[start:start + rows, None]
+        if edge_weight_type == 'GEO':
+            q1 = numpy.cos(b - y)
+            q2 = numpy.cos(a - x)
+            q3 = numpy.cos(a + x)
+            cos = numpy.clip(.5 * ((1 + q1) * q2 - (1 - q1) * q3), -1, 1)
+            distances = numpy.trunc(GEO_RADIUS * numpy.arccos(cos) + 1)
+        else:
+            dx, dy = a - x, b - y
+            squares = dx * dx + dy * dy
+            if edge_weight_type == 'EUC_2D':
+                distances = numpy.floor(numpy.sqrt(squares) + .5)
+            elif edge_weight_type == 'CEIL_2D':
+                distances = numpy.ceil(numpy.sqrt(squares))
+            else:
+                r = numpy.sqrt(squares / 10)
+                t = numpy.floor(r + .5)
+                distances = numpy.where(t < r, t + 1, t)
+        weights.frombytes(distances.astype('i').tobytes())
+    return weights
+
+
+def _to_array(typecode, values):
+    result = array.array(typecode)
+    result.frombytes(numpy.ascontiguousarray(values, dtype=typecode)
+                     .tobytes())
+    return result
+
+
+def _get_pair_index(n, i, j):
+    # position of the pair i < j in the row-major upper triangle
+    return i * n - i * (i + 1) // 2 + j - i - 1
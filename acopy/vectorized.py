@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""Solve many small graphs at once with numpy.
+
+For graphs of a few dozen nodes, most of the time of a
+:class:`~acopy.solvers.Solver` goes to the Python overhead of each ant, each
+step, and each plugin rather than to the tours themselves. Here the weight
+matrices of a batch of graphs are padded to the size of the largest one and
+stacked into a single array, and every ant of every graph takes each step of
+its tour at the same time, so the time per iteration depends on the size of
+the batch rather than the number of graphs.
+
+The ants behave like those of an :class:`~acopy.ant.Ant`, except that an ant
+whose choices all score zero (such as when no pheromone has been deposited
+yet) chooses among them uniformly. Plugins are not supported.
+
+This module requires numpy (``pip install acopy[fast]``).
+"""
+import random
+import sys
+
+import numpy
+
+from .solvers import Solution
+
+
+class StackedGraphs:
+    """Weight matrices of many graphs stacked into one array.
+
+    Graph ``i`` has the nodes ``nodes[i]``, referred to by their index. Its
+    weights are ``weights[i, :n, :n]`` where ``n`` is ``sizes[i]``; missing
+    edges, self-loops, and the padding beyond ``n`` have an infinite weight.
+    Missing weights default to 1. Whether each edge exists is kept in
+    ``edges``.
+
+    :param list graphs: the graphs to stack
+    :param str weight: name of the edge attribute holding the weight
+    """
+
+    def __init__(self, graphs, weight='weight'):
+        self.graphs = list(graphs)
+        self.nodes = [list(graph.nodes) for graph in self.graphs]
+        self.sizes = numpy.array([len(nodes) for nodes in self.nodes])
+        size = max(self.sizes, default=0)
+        self.weights = numpy.full((len(self.graphs), size, size), numpy.inf)
+        for i, graph in enumerate(self.graphs):
+            index = {node: j for j, node in enumerate(self.nodes[i])}
+            directed = graph.is_directed()
+            for u, v, w in graph.edges(data=weight, default=1):
+                if u != v:
+                    self.weights[i, index[u], index[v]] = w
+                    if not directed:
+                        self.weights[i, index[v], index[u]] = w
+        self.edges = numpy.isfinite(self.weights)
+
+    def __len__(self):
+        return len(self.graphs)
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(graphs={len(self)}, '
+                f'size={self.weights.shape[-1]})')
+
+    def get_solution(self, i, tour):
+        """Return the solution for a graph from a tour of node indices.
+
+        :param int i: index of the graph
+        :param list tour: node indices in visited order
+        :rtype: :class:`~acopy.solvers.Solution`
+        """
+        nodes = self.nodes[i]
+        return Solution.from_nodes(self.graphs[i], [nodes[j] for j in tour])
+
+
+class VectorizedSolver:
+    """ACO solver for batches of small graphs.
+
+    :param float rho: percentage of pheromone that evaporates each iteration
+    :param float q: amount of pheromone each ant can deposit
+    :param int top: number of ants that deposit pheromone
+    """
+
+    def __init__(self, rho=.03, q=1, top=None):
+        self.rho = rho
+        self.q = q
+        self.top = top
+
+    def __repr__(self):
+        return (f'{self.__class__.__name__}(rho={self.rho}, q={self.q}, '
+                f'top={self.top})')
+
+    def solve(self, graphs, colony, gen_size=None, limit=100,
+              batch_size=1024):
+        """Find and return the best solution of each graph.
+
+        Graphs of similar sizes are solved together in batches, so little of
+        each batch is padding. The random numbers are drawn from a generator
+        seeded by :mod:`random`, so :func:`random.seed` makes the results
+        repeatable.
+
+        :param list graphs: graphs to solve
+        :param colony: colony whose alpha and beta the ants use
+        :type colony: :class:`~acopy.ant.Colony`
+        :param int gen_size: number of ants per graph (default is one per
+                             node of the largest graph in a batch)
+        :param int limit: number of iterations to perform
+        :param int batch_size: most graphs to solve at once
+        :return: the best solution of each graph, in the order of the graphs
+                 (``None`` for a graph on which no ant completed a tour)
+        :rtype: list
+        """
+        graphs = list(graphs)
+        rng = numpy.random.default_rng(random.getrandbits(64))
+        order = sorted(range(len(graphs)), key=lambda i: len(graphs[i]))
+        solutions = [None] * len(graphs)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            stack = StackedGraphs([graphs[i] for i in batch])
+            tours = self.solve_stack(stack, colony, gen_size, limit, rng)
+            for j, i in enumerate(batch):
+                if tours[j] is not None:
+                    solutions[i] = stack.get_solution(j, tours[j])
+        return solutions
+
+    def solve_stack(self, stack, colony, gen_size, limit, rng):
+        """Return the best tour of each graph of a stack.
+
+        :param stack: the graphs to solve
+        :type stack: :class:`StackedGraphs`
+        :param colony: colony whose alpha and beta the ants use
+        :type colony: :class:`~acopy.ant.Colony`
+        :param int gen_size: number of ants per graph
+        :param int limit: number of iterations to perform
+        :param rng: source of random numbers
+        :type rng: :class:`numpy.random.Generator`
+        :return: best tour of node indices of each graph (or ``None``)
+        :rtype: list
+        """
+        weights = stack.weights
+        count, size = weights.shape[:2]
+        gen_size = gen_size or size
+        with numpy.errstate(divide='ignore'):
+            heuristic = numpy.where(weights == 0, sys.float_info.max / size,
+                                    (1 / weights) ** colony.beta)
+        pheromone = numpy.zeros_like(weights)
+        best_costs = numpy.full(count, numpy.inf)
+        best_tours = numpy.zeros((count, size), dtype=int)
+        graph_ids = numpy.arange(count)[:, None]
+        top = self.top or gen_size
+        for __ in range(limit):
+            with numpy.errstate(over='ignore'):
+                scores = pheromone ** colony.alpha * heuristic
+            tours, costs = self.find_tours(stack, scores, gen_size, rng)
+            ranked = numpy.argsort(costs, axis=1, kind='stable')
+            better = costs[graph_ids[:, 0], ranked[:, 0]] < best_costs
+            best_costs[better] = costs[better, ranked[better, 0]]
+            best_tours[better] = tours[better, ranked[better, 0]]
+            deposits = ranked[:, :top]
+            self.global_update(stack, pheromone, tours[graph_ids, deposits],
+                               costs[graph_ids, deposits])
+        return [tour[:n].tolist() if numpy.isfinite(cost) else None
+                for tour, cost, n in zip(best_tours, best_costs, stack.sizes)]
+
+    def find_tours(self, stack, scores, gen_size, rng):
+        """Return the tours of the ants of every graph and their costs.
+
+        The tours of smaller graphs are padded by repeating their last node.
+        Ants that reach a dead end have an infinite cost.
+
+        :param stack: the graphs to solve
+        :type stack: :class:`StackedGraphs`
+        :param scores: score of each edge of each graph
+        :type scores: :class:`numpy.ndarray`
+        :param int gen_size: number of ants per graph
+        :param rng: source of random numbers
+        :type rng: :class:`numpy.random.Generator`
+        :return: tours with shape ``(graphs, ants, size)`` and costs with
+                 shape ``(graphs, ants)``
+        :rtype: tuple
+        """
+        weights, edges = stack.weights, stack.edges
+        count, size = weights.shape[:2]
+        sizes = stack.sizes[:, None]
+        graph_ids = numpy.arange(count)[:, None]
+        ant_ids = numpy.arange(gen_size)[None, :]
+        # single precision halves the memory traffic of the cumulative sums
+        # at every step and is plenty for choosing among the scores
+        limit = numpy.finfo(numpy.float32).max / size
+        scores = numpy.minimum(scores, limit).astype(numpy.float32)
+
+        starts = (rng.random((count, gen_size)) * sizes).astype(int)
+        unvisited = numpy.empty((count, gen_size, size), dtype=bool)
+        unvisited[:] = (numpy.arange(size) < sizes)[:, None, :]
+        unvisited[graph_ids, ant_ids, starts] = False
+        tours = numpy.empty((count, gen_size, size), dtype=int)
+        tours[:, :, 0] = starts
+        costs = numpy.zeros((count, gen_size))
+        failed = numpy.zeros((count, gen_size), dtype=bool)
+        current = starts
+        for step in range(1, size):
+            reachable = unvisited & edges[graph_ids, current]
+            cumulative = numpy.cumsum(scores[graph_ids, current] * reachable,
+                                      axis=-1)
+            stuck = cumulative[..., -1] == 0
+            if stuck.any():
+                # choose uniformly when every choice scores zero
+                cumulative[stuck] = numpy.cumsum(reachable[stuck], axis=-1)
+            totals = cumulative[..., -1]
+            moving = (step < sizes) & ~failed
+            failed |= moving & (totals == 0)
+            moving &= totals > 0
+            picks = rng.random((count, gen_size)) * totals
+            nodes = numpy.argmax(cumulative > picks[..., None], axis=-1)
+            nodes = numpy.where(moving, nodes, current)
+            costs += numpy.where(moving, weights[graph_ids, current, nodes],
+                                 0)
+            unvisited[graph_ids, ant_ids, nodes] = False
+            tours[:, :, step] = nodes
+            current = nodes
+        costs += weights[graph_ids, current, starts]
+        costs[failed] = numpy.inf
+        return tours, costs
+
+    def global_update(self, stack, pheromone, tours, costs):
+        """Evaporate pheromone and deposit it along the given tours.
+
+        :param stack: the graphs being solved
+        :type stack: :class:`StackedGraphs`
+        :param pheromone: pheromone levels, updated in place
+        :type pheromone: :class:`numpy.ndarray`
+        :param tours: tours of the ants that deposit pheromone
+        :type tours: :class:`numpy.ndarray`
+        :param costs: costs of the tours
+        :type costs: :class:`numpy.ndarray`
+        """
+        pheromone *= 1 - self.rho
+        graph_ids = numpy.arange(len(stack))[:, None, None]
+        amounts = numpy.broadcast_to((self.q / costs)[..., None], tours.shape)
+        sources, targets = tours, numpy.roll(tours, -1, axis=-1)
+        numpy.add.at(pheromone, (graph_ids, sources, targets), amounts)
+        undirected = numpy.array([not g.is_directed() for g in stack.graphs])
+        numpy.add.at(pheromone, (graph_ids, targets, sources),
+                     amounts * undirected[:, None, None])
@@ -43,7 +43,9 @@ setup(
     extras_require={
         'plot': [
             'matplotlib~=3.2',
-            'pandas~=1.0',
+        ],
+        'fast': [
+            'numpy>=1.17',
         ],
     },
     license="Apache Software License 2.0",
@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
+import collections
+import math
+import random
+
 import pytest
 import networkx
 
 from acopy import Ant
 from acopy import Solution
+from acopy.ant import FastAnt
+from acopy.ant import HeuristicCache
 
 
 def test_ant_get_unvisited_nodes():
@@ -43,3 +49,77 @@ def test_ant_score_edge_when_no_pheromone():
     ant = Ant(alpha=1, beta=1)
     with pytest.raises(KeyError):
         ant.score_edge({'weight': 1})
+
+
+def test_fast_ant_tour_visits_every_node():
+    graph = networkx.complete_graph(6)
+    for u, v in graph.edges:
+        graph.edges[u, v].update(weight=u + v + 1, pheromone=1)
+    solution = FastAnt().tour(graph)
+    assert sorted(solution.nodes) == list(range(6))
+    assert solution.current == solution.start
+
+
+def test_fast_ant_sampling_matches_choose_node():
+    random.seed(42)
+    scores = [1, 0, 4, 2, 3]
+    choices = list('abcde')
+    trials = 20000
+    ant = Ant()
+    fast_ant = FastAnt()
+    fast = collections.Counter()
+    slow = collections.Counter()
+    for __ in range(trials):
+        fast[choices[fast_ant.choose_index(scores)]] += 1
+        slow[ant.choose_node(choices, scores)] += 1
+
+    # chi-square goodness of fit with 3 degrees of freedom (b never appears)
+    # against the expected frequencies at a significance level of 0.001
+    total = sum(scores)
+    for counts in (fast, slow):
+        assert counts['b'] == 0
+        chi2 = sum((counts[c] - trials * s / total) ** 2 / (trials * s / total)
+                   for c, s in zip(choices, scores) if s)
+        assert chi2 < 16.27
+
+
+def test_heuristic_cache_evicts_least_recently_used():
+    graph = networkx.Graph()
+    graph.add_edge(0, 1, weight=2)
+    cache = HeuristicCache(size=2)
+    cache.get(graph, 1)
+    cache.get(graph, 2)
+    cache.get(graph, 1)
+    cache.get(graph, 3)
+    assert list(cache.tables) == [1, 3]
+    assert cache.get(graph, 3)[1][0] == 1 / 8
+
+
+def test_heuristic_cache_forgets_other_graphs():
+    cache = HeuristicCache()
+    cache.get(networkx.complete_graph(2), 1)
+    table = cache.get(networkx.complete_graph(3), 1)
+    assert len(cache.tables) == 1
+    assert set(table) == {0, 1, 2}
+
+
+def test_fast_ant_cached_scores_match_score_edge():
+    graph = networkx.complete_graph(4)
+    for u, v in graph.edges:
+        graph.edges[u, v].update(weight=u + v + 1, pheromone=(u + 1) / 2)
+    ant = FastAnt(alpha=2, beta=3, heuristics=HeuristicCache())
+    scores = ant.get_scores(graph, 0, [1, 2, 3])
+    expected = [ant.score_edge(graph.edges[0, n]) for n in (1, 2, 3)]
+    assert scores == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('level', [0, .5, 4])
+def test_fast_ant_cached_scores_of_zero_weights_match_score_edge(level):
+    graph = networkx.complete_graph(3)
+    for u, v in graph.edges:
+        graph.edges[u, v].update(weight=v - u - 1, pheromone=level)
+    ant = FastAnt(alpha=2, beta=3, heuristics=HeuristicCache())
+    scores = ant.get_scores(graph, 0, [1, 2])
+    expected = [ant.score_edge(graph.edges[0, n]) for n in (1, 2)]
+    assert scores == expected
+    assert all(math.isfinite(score) for score in scores)
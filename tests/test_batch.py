@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+
+import pytest
+
+from acopy import Colony
+from acopy import Solver
+from acopy import batch
+
+
+@pytest.fixture
+def paths(tmp_path):
+    paths = []
+    for n in (4, 5, 6):
+        graph = {u: {v: {'weight': abs(u - v)} for v in range(n) if v != u}
+                 for u in range(n)}
+        path = tmp_path / f'graph{n}.json'
+        path.write_text(json.dumps(graph))
+        paths.append(str(path))
+    (tmp_path / 'broken.json').write_text('{')
+    return paths
+
+
+def test_find_files_in_directory(paths, tmp_path):
+    assert len(batch.find_files(str(tmp_path))) == 4
+
+
+def test_find_files_matching_pattern(paths, tmp_path):
+    assert batch.find_files(str(tmp_path / 'graph*.json')) == paths
+
+
+def test_find_files_expands_home(paths, tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    assert batch.find_files('~/graph*.json') == paths
+    assert len(batch.find_files('~')) == 4
+
+
+def test_solve_file_reports_errors(tmp_path):
+    result = batch.solve_file(str(tmp_path / 'missing.json'), 'json',
+                              Solver(), Colony(), limit=1)
+    assert result['error'].startswith('FileNotFoundError')
+    assert result['cost'] is None
+
+
+def test_solve_files(paths, tmp_path):
+    paths = paths + [str(tmp_path / 'broken.json')]
+    results = list(batch.solve_files(paths, 'json', Solver(), Colony(),
+                                     limit=3, seed='x', workers=2))
+    by_path = {r['path']: r for r in results}
+    assert set(by_path) == set(paths)
+    assert by_path[paths[2]]['cost'] == 10
+    assert by_path[paths[2]]['iterations'] == 3
+    assert by_path[paths[2]]['seed'] == 'x:graph6.json'
+    assert by_path[paths[3]]['error']
+
+
+def test_summary_writer_csv():
+    file = io.StringIO()
+    writer = batch.SummaryWriter(file, 'csv')
+    writer.write({'path': 'a.json', 'cost': 3})
+    assert file.getvalue().splitlines() == [
+        'path,cost,iterations,seconds,seed,error',
+        'a.json,3,,,,',
+    ]
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+
+import pytest
+import networkx
+
+from acopy import Colony
+from acopy import Solver
+from acopy import cache
+from acopy import plugins
+from acopy.initializers import SeedTours
+
+
+@pytest.fixture
+def graph():
+    random.seed(0)
+    G = networkx.complete_graph(8)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = random.randint(1, 100)
+    return networkx.relabel_nodes(G, {n: (n, 'x') for n in G})
+
+
+@pytest.fixture
+def result_cache(tmp_path):
+    return cache.ResultCache(str(tmp_path / 'cache'))
+
+
+def test_graph_hash_ignores_order(graph):
+    G = networkx.Graph()
+    G.add_nodes_from(reversed(list(graph.nodes)))
+    G.add_edges_from((v, u, d) for u, v, d in reversed(list(graph.edges(
+        data=True))))
+    assert cache.get_graph_hash(G) == cache.get_graph_hash(graph)
+    u, v = next(iter(G.edges))
+    G.edges[u, v]['weight'] += 1
+    assert cache.get_graph_hash(G) != cache.get_graph_hash(graph)
+
+
+def test_repeated_request_is_cached(result_cache, graph):
+    timer = plugins.Timer()
+    solver = Solver(plugins=[timer])
+    first = result_cache.solve(solver, graph, Colony(), limit=5, seed='a')
+    assert timer.iterations == 5
+    timer.iterations = 0
+    second = result_cache.solve(solver, graph, Colony(), limit=5, seed='a')
+    assert timer.iterations == 0
+    assert result_cache.hits == 1
+    assert second.nodes == first.nodes
+    assert second.cost == first.cost
+
+
+def test_cache_is_keyed_by_parameters(result_cache, graph):
+    result_cache.solve(Solver(), graph, Colony(), limit=2, seed='a')
+    result_cache.solve(Solver(), graph, Colony(), limit=2, seed='b')
+    result_cache.solve(Solver(rho=.5), graph, Colony(), limit=2, seed='a')
+    result_cache.solve(Solver(), graph, Colony(beta=1), limit=2, seed='a')
+    result_cache.solve(Solver(plugins=[plugins.Printout()]), graph,
+                       Colony(), limit=2, seed='a')
+    assert result_cache.misses == 5
+    assert result_cache.hits == 0
+
+
+def test_cache_is_keyed_by_seed_tours(graph):
+    nodes = list(graph.nodes)
+    keys = [cache.get_params(Solver(init=SeedTours([tour])), Colony())
+            for tour in (nodes, nodes[::-1], nodes)]
+    assert keys[0] != keys[1]
+    assert keys[0] == keys[2]
+
+
+def test_larger_limit_resumes(result_cache, graph):
+    first = result_cache.solve(Solver(), graph, Colony(), limit=3, seed='a')
+    result_cache.solve(Solver(), graph, Colony(), limit=3, seed='b')
+    second = result_cache.solve(Solver(), graph, Colony(), limit=8,
+                                seed='a')
+    assert result_cache.resumes == 1
+    assert second.cost <= first.cost
+    assert len(os.listdir(result_cache.path)) == 3
+
+
+def test_resume_starts_from_cached_pheromone(result_cache, graph,
+                                             monkeypatch):
+    result_cache.solve(Solver(rho=.5), graph, Colony(), limit=2, seed='a')
+    key = os.listdir(result_cache.path)[0].rsplit('-', 1)[0]
+    levels = result_cache.get(key, 2)['levels']
+
+    starts = []
+
+    class Recorder(plugins.PheromoneExchange):
+        def on_start(self, state):
+            super().on_start(state)
+            starts.append(self.start)
+
+    monkeypatch.setattr(cache, 'PheromoneExchange', Recorder)
+    result_cache.solve(Solver(rho=.5), graph, Colony(), limit=3, seed='a')
+    assert starts == [pytest.approx(levels)]
+
+
+def test_unlimited_requests_are_not_cached(result_cache, graph):
+    solver = Solver(plugins=[plugins.Threshold(threshold=10 ** 6)])
+    assert result_cache.solve(solver, graph, Colony(), seed='a') is not None
+    assert os.listdir(result_cache.path) == []
+
+
+def test_unseeded_requests_are_not_cached(result_cache, graph):
+    timer = plugins.Timer()
+    solver = Solver(plugins=[timer])
+    for _ in range(2):
+        timer.iterations = 0
+        result_cache.solve(solver, graph, Colony(), limit=2)
+        assert timer.iterations == 2
+    assert result_cache.hits == 0
+    assert result_cache.misses == 2
+    assert os.listdir(result_cache.path) == []
+
+
+def test_least_recently_used_results_are_evicted(result_cache):
+    entry = {'limit': 1, 'tour': None, 'cost': None, 'levels': [0] * 50,
+             'random_state': None}
+    result_cache.put('a', 1, entry)
+    size = os.path.getsize(result_cache._get_path('a', 1))
+    result_cache.max_size = 2 * size
+    result_cache.put('b', 1, entry)
+    os.utime(result_cache._get_path('a', 1), ns=(1, 1))
+    os.utime(result_cache._get_path('b', 1), ns=(2, 2))
+    assert result_cache.get('a', 1) is not None
+    result_cache.put('c', 1, entry)
+    assert result_cache.get('b', 1) is None
+    assert result_cache.get('a', 1) is not None
+    assert result_cache.get('c', 1) is not None
+
+
+def test_eviction_tolerates_results_removed_meanwhile(result_cache,
+                                                      monkeypatch):
+    entry = {'limit': 1, 'tour': None, 'cost': None, 'levels': [],
+             'random_state': None}
+    result_cache.put('a', 1, entry)
+    result_cache.put('b', 1, entry)
+    result_cache.max_size = 0
+    remove = os.remove
+
+    def remove_twice(path):
+        remove(path)
+        remove(path)
+
+    monkeypatch.setattr(os, 'remove', remove_twice)
+    result_cache.evict()
+    result_cache.clear()
+    assert result_cache.get('a', 1) is None
+    assert os.listdir(result_cache.path) == []
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from acopy import Colony
+from acopy import Solver
+from acopy import decomposition
+
+
+@pytest.fixture
+def grid():
+    return {(x, y): (x, y) for x in range(8) for y in range(4)}
+
+
+def test_euclidean():
+    assert decomposition.euclidean((0, 0), (3, 4)) == 5
+    assert decomposition.euclidean((1, 2, 3), (1, 2, 3)) == 0
+
+
+def test_partition_splits_widest_axis(grid):
+    clusters = decomposition.partition(grid, 8)
+    assert sorted(len(c) for c in clusters) == [8] * 4
+    assert sorted(n for c in clusters for n in c) == sorted(grid)
+    for cluster in clusters:
+        xs = {x for x, y in cluster}
+        assert max(xs) - min(xs) == 1
+
+
+def test_stitch_cuts_tours_facing_each_other():
+    points = {n: (x, y) for n, (x, y) in enumerate([
+        (0, 0), (1, 0), (1, 1), (0, 1),
+        (5, 0), (6, 0), (6, 1), (5, 1),
+    ])}
+    tours = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    nodes = decomposition.stitch(tours, points)
+    assert sorted(nodes) == list(range(8))
+    cost = sum(decomposition.euclidean(points[u], points[v])
+               for u, v in zip(nodes, nodes[1:] + nodes[:1]))
+    assert cost == 14
+
+
+def test_refine_path_keeps_ends():
+    points = {n: (n, 0) for n in range(6)}
+    path = [0, 3, 1, 4, 2, 5]
+    refined = decomposition.refine_path(path, points, Solver(), Colony(),
+                                        gen_size=6, limit=20, seed='1')
+    assert refined == [0, 1, 2, 3, 4, 5]
+
+
+def test_refine_path_returns_none_without_improvement():
+    points = {n: (n, 0) for n in range(5)}
+    path = [0, 1, 2, 3, 4]
+    assert decomposition.refine_path(path, points, Solver(), Colony(),
+                                     limit=5, seed='1') is None
+
+
+def test_decomposition_solver_visits_every_node_once(grid):
+    solver = decomposition.DecompositionSolver(cluster_size=8, window=6,
+                                               limit=5, workers=1)
+    solution = solver.solve(grid, seed='1')
+    assert sorted(solution.nodes) == sorted(grid)
+    assert solution.cost >= len(grid)
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import random
+import socket
+import threading
+
+import pytest
+import networkx
+
+from acopy import Colony
+from acopy import Solver
+from acopy import distributed
+
+
+@pytest.fixture
+def graph():
+    random.seed(0)
+    G = networkx.complete_graph(10)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = random.randint(1, 100)
+    return networkx.relabel_nodes(G, {n: f'n{n}' for n in G})
+
+
+def run_worker(address, rounds=None):
+    worker = distributed.Worker(Solver(rho=.1), Colony(), gen_size=5)
+    worker.run(address, rounds=rounds, timeout=5)
+
+
+def start_worker(address, rounds=None):
+    process = multiprocessing.Process(target=run_worker,
+                                      args=(address, rounds))
+    process.start()
+    return process
+
+
+def serve_in_thread(coordinator):
+    result = {}
+    thread = threading.Thread(
+        target=lambda: result.update(best=coordinator.serve()))
+    thread.start()
+    return thread, result
+
+
+def assert_tour(graph, solution):
+    assert sorted(solution.nodes) == sorted(graph.nodes)
+    assert solution.cost == sum(graph.edges[e]['weight']
+                                for e in solution.path)
+
+
+def test_messages():
+    a, b = socket.socketpair()
+    with a, b:
+        distributed.send_message(a, {'type': 'hello', 'levels': [1.5, 2]})
+        assert distributed.recv_message(b) == {'type': 'hello',
+                                               'levels': [1.5, 2]}
+        a.close()
+        assert distributed.recv_message(b) is None
+
+
+def test_instance_round_trip(graph):
+    instance = distributed.compile_instance(graph)
+    G, edges = distributed.load_instance(instance)
+    assert len(G) == len(graph)
+    assert len(edges) == G.number_of_edges() == graph.number_of_edges()
+    nodes = list(graph.nodes)
+    for u, v in edges:
+        assert (G.edges[u, v]['weight'] ==
+                graph.edges[nodes[u], nodes[v]]['weight'])
+
+
+def test_coordinator_requires_a_limit(graph):
+    with pytest.raises(ValueError):
+        distributed.Coordinator(graph)
+
+
+def test_worker_processes(graph):
+    coordinator = distributed.Coordinator(graph, iterations=3, rounds=6,
+                                          seed='a')
+    workers = [start_worker(coordinator.address) for __ in range(2)]
+    best = coordinator.serve()
+    for worker in workers:
+        worker.join(10)
+        assert worker.exitcode == 0
+    assert_tour(graph, best)
+    assert coordinator.merged == 6
+    assert len(coordinator.levels) == graph.number_of_edges()
+    assert coordinator.workers == 0
+
+
+def test_workers_join_and_leave(graph):
+    coordinator = distributed.Coordinator(graph, iterations=2, rounds=4,
+                                          seed='b')
+    thread, result = serve_in_thread(coordinator)
+
+    # a worker that leaves mid round does not hold up the others
+    with socket.create_connection(coordinator.address) as sock:
+        distributed.send_message(sock, {'type': 'hello'})
+        work = distributed.recv_message(sock)
+        assert 'instance' in work and work['levels'] is None
+
+    leaving = start_worker(coordinator.address, rounds=1)
+    leaving.join(10)
+    assert leaving.exitcode == 0
+
+    joining = start_worker(coordinator.address)
+    joining.join(10)
+    thread.join(10)
+    assert joining.exitcode == 0
+    assert coordinator.merged == 4
+    assert coordinator.workers == 0
+    assert_tour(graph, result['best'])
+
+
+def test_time_limit(graph):
+    coordinator = distributed.Coordinator(graph, iterations=1,
+                                          time_limit=.5)
+    worker = start_worker(coordinator.address)
+    best = coordinator.serve()
+    worker.join(10)
+    assert worker.exitcode == 0
+    assert coordinator.merged > 0
+    assert_tour(graph, best)
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import os
+import subprocess
+import sys
+
+import pytest
+
+import acopy
+
+
+#: modules that only the code paths using them should import
+HEAVY_MODULES = ['matplotlib', 'networkx', 'numpy', 'pandas', 'tsplib95']
+
+#: modules only import lazily from Python 3.7
+lazy = pytest.mark.skipif(sys.version_info < (3, 7),
+                          reason='requires module __getattr__')
+
+#: most seconds that importing the command line interface may take
+IMPORT_BUDGET = .5
+
+
+def run_python(*args):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(acopy.__file__)))
+    env = {**os.environ, 'PYTHONPATH': root}
+    result = subprocess.run([sys.executable, *args], env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            universal_newlines=True)
+    return result
+
+
+@lazy
+@pytest.mark.parametrize('module', ['acopy', 'acopy.cli'])
+def test_import_skips_heavy_modules(module):
+    code = (f'import sys, {module}; '
+            f'print(*(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    assert run_python('-c', code).stdout.split() == []
+
+
+@lazy
+def test_cli_import_time_budget():
+    result = run_python('-X', 'importtime', '-c', 'import acopy.cli')
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        __, cumulative, name = line.split('|')
+        if name.strip() == 'acopy.cli':
+            assert int(cumulative) / 1e6 < IMPORT_BUDGET
+            break
+    else:
+        pytest.fail('acopy.cli was not imported')
+
+
+def test_lazy_utils_modules():
+    code = ('import sys, acopy; acopy.utils.data.get_formats(); '
+            'print("networkx" in sys.modules)')
+    assert run_python('-c', code).stdout.strip() == 'True'
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import pytest
+import networkx
+
+from acopy import Colony
+from acopy import Solver
+from acopy import initializers
+
+
+@pytest.fixture
+def graph():
+    # four points on a line: 0 - 1 - 2 - 3
+    G = networkx.Graph()
+    for u in range(4):
+        for v in range(u + 1, 4):
+            G.add_edge(u, v, weight=v - u)
+    return G
+
+
+def test_nearest_neighbor_tour(graph):
+    assert initializers.nearest_neighbor_tour(graph, start=1) == [1, 0, 2, 3]
+
+
+def test_nearest_neighbor_tour_when_dead_end():
+    with pytest.raises(ValueError):
+        initializers.nearest_neighbor_tour(networkx.star_graph(3))
+
+
+def test_greedy_edge_tour(graph):
+    assert initializers.greedy_edge_tour(graph) == [0, 1, 2, 3]
+
+
+def test_constant_sets_every_edge(graph):
+    seeds = initializers.Constant(level=.5).initialize(graph)
+    assert not seeds
+    assert all(d['pheromone'] == .5 for d in graph.edges.values())
+
+
+@pytest.mark.parametrize('init', [initializers.Initializer(),
+                                  initializers.SeedTours([])])
+def test_level_without_seeds(graph, init):
+    assert init.initialize(graph) == []
+    assert all(d['pheromone'] == 0 for d in graph.edges.values())
+    assert Solver(init=init).solve(graph, Colony(), limit=1) is not None
+
+
+def test_nearest_neighbor_level(graph):
+    seeds = initializers.NearestNeighbor().initialize(graph)
+    assert [s.cost for s in seeds] == [6]
+    assert all(d['pheromone'] == 1 / 24 for d in graph.edges.values())
+
+
+def test_seed_tours_deposit_pheromone(graph):
+    init = initializers.SeedTours([[0, 2, 1, 3]], q=8, level=0)
+    seeds = init.initialize(graph)
+    assert seeds[0].cost == 8
+    assert graph.edges[0, 2]['pheromone'] == 1
+    assert graph.edges[0, 1]['pheromone'] == 0
+
+
+def test_solver_reports_seed_as_first_record(graph):
+    solver = Solver(init=initializers.SeedTours([[3, 2, 1, 0]]))
+    first = next(solver.optimize(graph, Colony(), limit=1))
+    assert first.nodes == [3, 2, 1, 0]
+    assert first.ant is None
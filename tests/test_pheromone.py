@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import functools
+import random
+import threading
+import tracemalloc
+
+import pytest
+import networkx
+
+from acopy import Solver
+from acopy import plugins
+from acopy.ant import Colony
+from acopy.pheromone import ArrayPheromoneStore
+from acopy.pheromone import DictPheromoneStore
+from acopy.pheromone import MapPheromoneStore
+
+
+@pytest.fixture
+def graph():
+    G = networkx.complete_graph(4)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = u + v + 1
+    return G
+
+
+COMPACT = functools.partial(ArrayPheromoneStore, typecode='f', packed=True)
+
+
+@pytest.fixture(params=[
+    DictPheromoneStore,
+    MapPheromoneStore,
+    ArrayPheromoneStore,
+    functools.partial(ArrayPheromoneStore, typecode='f'),
+    functools.partial(ArrayPheromoneStore, packed=True),
+])
+def store_class(request):
+    return request.param
+
+
+@pytest.fixture
+def store(store_class, graph):
+    store = store_class(graph)
+    store.reset(1)
+    return store
+
+
+def test_store_set_is_symmetric(store):
+    store.set(0, 1, 3)
+    assert store.get(1, 0) == 3
+    assert store.get_levels(1, [0, 2]) == [3, 1]
+
+
+def test_store_deposit(store):
+    store.deposit([(0, 1), (1, 2)], .5)
+    assert store.get(0, 1) == 1.5
+    assert store.get(2, 1) == 1.5
+    assert store.get(0, 2) == 1
+
+
+def test_store_evaporate(store):
+    store.deposit([(0, 1)], 1)
+    store.evaporate(.25)
+    assert store.get(0, 1) == pytest.approx(1.5)
+    assert store.get(0, 2) == pytest.approx(.75)
+
+
+def test_store_reset_keep_leaves_levels(store):
+    store.set(0, 1, 3)
+    store.reset(0, keep=True)
+    assert store.get(0, 1) == 3
+
+
+def test_store_items(store, graph):
+    store.set(0, 1, 3)
+    items = dict(store.items())
+    assert len(items) == graph.number_of_edges()
+    assert sorted(items.values()) == [1] * 5 + [3]
+
+
+def test_store_snapshot_and_restore(store):
+    snapshot = store.snapshot()
+    store.deposit([(0, 1)], 1)
+    store.evaporate(.5)
+    store.restore(snapshot)
+    assert store.get(0, 1) == 1
+    assert store.get(2, 3) == 1
+
+
+def test_store_copies_graph_levels(graph, store_class):
+    graph.edges[0, 1]['pheromone'] = 2
+    store = store_class(graph)
+    store.reset(0, keep=True)
+    assert store.get(1, 0) == 2
+    assert store.get(0, 2) == 0
+
+
+def test_store_reset_keep_sets_edges_without_levels(graph, store_class):
+    graph.edges[0, 1]['pheromone'] = 2
+    store = store_class(graph)
+    store.set(3, 2, 4)
+    store.reset(.5, keep=True)
+    assert store.get(1, 0) == 2
+    assert store.get(2, 3) == 4
+    assert store.get(0, 2) == .5
+    store.set(0, 2, 3)
+    store.reset(1, keep=True)
+    assert store.get(0, 2) == 3
+
+
+def test_store_export(store, graph):
+    store.set(0, 1, 3)
+    store.export()
+    assert graph.edges[0, 1]['pheromone'] == 3
+    G = graph.copy()
+    store.export(G, name='level')
+    assert G.edges[1, 0]['level'] == 3
+    assert G.edges[2, 3]['level'] == 1
+
+
+def test_map_store_grows_with_graph(graph):
+    store = MapPheromoneStore(graph)
+    graph.add_edge(0, 4, weight=1)
+    store.set(4, 0, 2)
+    store.reset(1, keep=True)
+    assert store.get(0, 4) == 2
+    assert store.get(0, 1) == 1
+
+
+def test_map_store_directed():
+    graph = networkx.complete_graph(3, networkx.DiGraph)
+    store = MapPheromoneStore(graph)
+    store.reset(1)
+    store.deposit([(0, 1)], 1)
+    assert store.get(0, 1) == 2
+    assert store.get(1, 0) == 1
+
+
+@pytest.mark.parametrize('levels', [False, True])
+def test_array_store_tracks_edges_without_levels_compactly(levels):
+    graph = networkx.complete_graph(200)
+    if levels:
+        graph.edges[0, 1]['pheromone'] = 2
+    tracemalloc.start()
+    try:
+        store = COMPACT(graph)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    size = len(store.data) * store.data.itemsize
+    assert peak < size * 1.5 + 64 * 1024
+    store.reset(1, keep=True)
+    assert store.get(1, 0) == (2 if levels else 1)
+    assert store.get(2, 3) == 1
+
+
+def test_array_store_rescales_before_underflow(graph):
+    store = ArrayPheromoneStore(graph)
+    store.reset(1)
+    for __ in range(300):
+        store.evaporate(.5)
+    assert store.factor >= store.min_scale
+    assert store.get(0, 1) == pytest.approx(.5 ** 300)
+
+
+def test_packed_array_store_keeps_upper_triangle(graph):
+    store = COMPACT(graph)
+    assert len(store.data) == 10
+    assert store.data.itemsize == 4
+
+
+def test_packed_array_store_rejects_directed_graphs():
+    with pytest.raises(ValueError):
+        ArrayPheromoneStore(networkx.complete_graph(3, networkx.DiGraph),
+                            packed=True)
+
+
+def test_compact_array_store_levels_match_double_precision(graph):
+    double = ArrayPheromoneStore(graph)
+    single = COMPACT(graph)
+    random.seed(2)
+    for __ in range(1000):
+        path = random.sample(list(graph.edges), 2)
+        amount = random.random()
+        for store in (double, single):
+            store.evaporate(.1)
+            store.deposit(path, amount)
+    for (u, v), level in double.items():
+        assert single.get(u, v) == pytest.approx(level, rel=1e-5)
+
+
+def test_compact_array_store_final_costs_match_double_precision():
+    random.seed(3)
+    graph = networkx.complete_graph(30)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = random.randint(1, 100)
+    costs = []
+    for store in (ArrayPheromoneStore, COMPACT):
+        random.seed(4)
+        solver = Solver(store=store)
+        costs.append(solver.solve(graph, Colony(), gen_size=10,
+                                  limit=20).cost)
+    assert costs[1] == pytest.approx(costs[0], rel=.05)
+
+
+def test_solver_with_array_store_leaves_graph_alone(graph):
+    random.seed(1)
+    solver = Solver(store=ArrayPheromoneStore)
+    solution = solver.solve(graph, Colony(), gen_size=4, limit=5)
+    assert len(solution.nodes) == 4
+    assert all('pheromone' not in edge for edge in graph.edges.values())
+
+
+def test_solver_leaves_graph_alone_by_default(graph):
+    random.seed(1)
+    solution = Solver().solve(graph, Colony(), gen_size=4, limit=5)
+    assert len(solution.nodes) == 4
+    assert all('pheromone' not in edge for edge in graph.edges.values())
+
+
+def test_pheromone_export_plugin(graph):
+    random.seed(1)
+    solver = Solver(plugins=[plugins.PheromoneExport()])
+    solver.solve(graph, Colony(), gen_size=4, limit=5)
+    assert all(edge['pheromone'] > 0 for edge in graph.edges.values())
+
+
+def test_interleaved_solvers_keep_their_own_pheromone(graph):
+    stores = {}
+
+    class Spy(plugins.SolverPlugin):
+        def on_start(self, state):
+            stores[self.solver.q] = state.pheromone
+
+    depositing = Solver(q=1, plugins=[Spy()])
+    evaporating = Solver(q=0, plugins=[Spy()])
+    a = depositing.optimize(graph, Colony(), gen_size=4, limit=10)
+    b = evaporating.optimize(graph, Colony(), gen_size=4, limit=10)
+    for __ in zip(a, b):
+        pass
+    list(a)
+    list(b)
+    assert max(stores[1].levels()) > 0
+    assert max(stores[0].levels()) == 0
+
+
+def test_threads_share_one_graph():
+    random.seed(5)
+    graph = networkx.complete_graph(12)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = random.randint(1, 100)
+    results = []
+
+    def solve():
+        solution = Solver().solve(graph, Colony(), gen_size=6, limit=10)
+        results.append(solution)
+
+    threads = [threading.Thread(target=solve) for __ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    for solution in results:
+        assert sorted(solution.nodes) == list(graph.nodes)
+        assert solution.cost == sum(graph.edges[e]['weight']
+                                    for e in solution.path)
+    assert all('pheromone' not in edge for edge in graph.edges.values())
@@ -0,0 +1,442 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import random
+import socket
+import threading
+import tracemalloc
+
+import pytest
+import networkx
+from click.testing import CliRunner
+
+from acopy import Colony
+from acopy import Solver
+from acopy import cli
+from acopy import plugins
+from acopy.ant import FastAnt
+from acopy.pheromone import ArrayPheromoneStore
+from acopy.pheromone import DictPheromoneStore
+from acopy.solvers import Solution
+from acopy.solvers import State
+
+
+@pytest.fixture
+def graph():
+    G = networkx.complete_graph(4)
+    for u, v in G.edges:
+        G.edges[u, v].update(weight=1, pheromone=1)
+    return G
+
+
+@pytest.fixture
+def state(graph):
+    state = State(graph, None, None, None, None,
+                  pheromone=DictPheromoneStore(graph))
+    solution = Solution(graph, 0)
+    for node in (1, 2, 3):
+        solution.add_node(node)
+    solution.close()
+    state.best = solution
+    return state
+
+
+def test_graph_updater_set_weight_reevaluates_record(state):
+    updater = plugins.GraphUpdater()
+    updater.set_weight(0, 1, 3)
+    updater.on_iteration(state)
+    assert state.record.cost == 6
+    assert state.record.nodes == [0, 1, 2, 3]
+
+
+def test_graph_updater_rescales_pheromone(state):
+    updater = plugins.GraphUpdater()
+    updater.set_weight(0, 1, 5)
+    updater.on_iteration(state)
+    levels = {level for __, __, level in state.graph.edges(data='pheromone')}
+    assert levels == {0.5}
+
+
+def test_graph_updater_add_node_seeds_pheromone_from_neighbors(state):
+    state.graph.edges[0, 1]['pheromone'] = 4
+    updater = plugins.GraphUpdater()
+    updater.add_node(4, {0: 1, 1: 1})
+    updater.on_iteration(state)
+    assert 4 in state.record.nodes
+    assert state.record.cost == 5
+    assert state.graph.edges[4, 0]['pheromone'] > 0
+
+
+def test_graph_updater_remove_node_repairs_record(state):
+    updater = plugins.GraphUpdater()
+    updater.remove_node(2)
+    updater.on_iteration(state)
+    assert state.record.nodes == [0, 1, 3]
+    assert state.record.cost == 3
+
+
+class LastIteration(plugins.SolverPlugin):
+    # queue changes on the updater in the last iteration of a run
+    def __init__(self, updater, change):
+        super().__init__()
+        self.updater = updater
+        self.change = change
+
+    def on_iteration(self, state):
+        if state.limit == 1:
+            self.change(self.updater)
+        state.limit -= 1
+
+
+@pytest.mark.parametrize('change', [
+    lambda updater: updater.remove_node(3),
+    lambda updater: updater.set_weight(0, 1, 10),
+])
+def test_graph_updater_record_is_returned_by_solve(change):
+    graph = networkx.complete_graph(5)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = 1
+    updater = plugins.GraphUpdater()
+    solver = Solver(plugins=[LastIteration(updater, change), updater])
+    best = solver.solve(graph, Colony(), limit=2)
+    assert sorted(best.nodes) == sorted(graph.nodes)
+    assert best.cost == sum(graph.edges[e]['weight'] for e in best.path)
+
+
+def test_graph_updater_rejects_new_nodes_for_fixed_store():
+    graph = networkx.complete_graph(4)
+    updater = plugins.GraphUpdater()
+    updater.add_node(4, {0: 1})
+    solver = Solver(store=ArrayPheromoneStore, plugins=[updater])
+    with pytest.raises(ValueError):
+        solver.solve(graph, Colony(), limit=1)
+
+
+def test_graph_updater_checks_changes_as_they_are_queued(state):
+    state.pheromone = ArrayPheromoneStore(state.graph)
+    updater = plugins.GraphUpdater()
+    updater.on_start(state)
+    updater.set_weight(0, 2, 3)
+    with pytest.raises(ValueError):
+        updater.add_node(4, {0: 1})
+    with pytest.raises(ValueError):
+        updater.set_weight(0, 4, 1)
+    updater.on_iteration(state)
+    assert state.graph.edges[0, 2]['weight'] == 3
+    assert 4 not in state.graph
+
+
+def test_graph_updater_does_nothing_without_changes(state):
+    record = state.record
+    plugins.GraphUpdater().on_iteration(state)
+    assert state.record is record
+
+
+@pytest.fixture
+def stagnant_state(state):
+    state.solutions = [state.record] * 10
+    state.costs = [state.record.cost] * 10
+    return state
+
+
+def test_stagnation_restart_resets_pheromone_keeping_record(stagnant_state):
+    solver = Solver(q=4)
+    restart = plugins.StagnationRestart()
+    solver.add_plugin(restart)
+    restart.on_iteration(stagnant_state)
+    graph = stagnant_state.graph
+    assert restart.restarts == 1
+    assert graph.edges[0, 1]['pheromone'] == 1 + 1 / 16
+    assert graph.edges[0, 2]['pheromone'] == 1 / 16
+
+
+def test_stagnation_restart_ignores_diverse_colony(state):
+    other = Solution.from_nodes(state.graph, [0, 2, 1, 3])
+    state.solutions = [state.record, other]
+    state.costs = [state.record.cost, other.cost]
+    restart = plugins.StagnationRestart(min_unique=.5)
+    Solver(plugins=[restart])
+    restart.on_iteration(state)
+    assert restart.restarts == 0
+
+
+def test_stagnation_restart_stops_when_restarts_are_fruitless(stagnant_state):
+    restart = plugins.StagnationRestart(patience=2)
+    Solver(plugins=[restart])
+    restart.on_iteration(stagnant_state)
+    restart.on_iteration(stagnant_state)
+    with pytest.raises(StopIteration):
+        restart.on_iteration(stagnant_state)
+    assert restart.restarts == 2
+
+
+def test_stagnation_restart_counts_reversed_tours_once(stagnant_state):
+    record = stagnant_state.record
+    reverse = Solution.from_nodes(stagnant_state.graph, [0, 3, 2, 1])
+    stagnant_state.solutions = [record, reverse] * 5
+    restart = plugins.StagnationRestart()
+    Solver(plugins=[restart])
+    restart.on_iteration(stagnant_state)
+    assert restart.restarts == 1
+
+
+def test_stagnation_restart_lets_a_converged_colony_explore():
+    random.seed(0)
+    graph = networkx.complete_graph(10)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = random.randint(1, 100)
+    recorder = plugins.StatsRecorder()
+    restart = plugins.StagnationRestart()
+    solver = Solver(rho=.5, top=1, plugins=[recorder, restart])
+    solver.solve(graph, Colony(alpha=1, beta=1), gen_size=10, limit=100)
+    unique = [s['iteration'] for s in recorder.stats['unique_solutions']]
+    assert 0 < restart.restarts < 50
+    # every restart is followed by an iteration that explores again
+    after = [n for n, m in zip(unique[2:], unique[1:]) if m == 1]
+    assert len(after) == restart.restarts - (unique[-1] == 1)
+    assert min(after) > 1
+
+
+def run_top_solver(top_only, plugins, limit):
+    random.seed(0)
+    graph = networkx.complete_graph(10)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = random.randint(1, 100)
+    solver = Solver(top=1, top_only=top_only, plugins=plugins)
+    solver.solve(graph, Colony(), gen_size=10, limit=limit)
+
+
+def test_stagnation_restart_counts_all_tours_when_top_only():
+    restart = plugins.StagnationRestart(min_unique=.5)
+    run_top_solver(True, [restart], limit=1)
+    assert restart.restarts == 0
+
+
+def test_stats_recorder_counts_all_tours_when_top_only():
+    stats = []
+    for top_only in (False, True):
+        recorder = plugins.StatsRecorder()
+        run_top_solver(top_only, [recorder], limit=3)
+        stats.append(recorder.stats)
+    assert stats[0]['unique_solutions'] == stats[1]['unique_solutions']
+    assert stats[0]['solutions'] == stats[1]['solutions']
+    assert stats[1]['unique_solutions'][1]['iteration'] > 1
+
+
+def test_stagnation_restart_branching_factor(state):
+    restart = plugins.StagnationRestart()
+    assert restart.get_branching_factor(state.graph) == 3
+    for u, v in state.record.path:
+        state.graph.edges[u, v]['pheromone'] = 10
+    assert restart.get_branching_factor(state.graph) == 2
+
+
+def test_pheromone_exchange_sets_and_measures_levels(state):
+    edges = list(state.graph.edges)
+    exchange = plugins.PheromoneExchange(edges, [2.0] * len(edges))
+    exchange.on_start(state)
+    assert exchange.start == [2.0] * len(edges)
+    state.pheromone.evaporate(.5)
+    exchange.on_finish(state)
+    assert exchange.get_deltas() == pytest.approx([-1.0] * len(edges))
+
+
+def test_record_emitter_writes_new_records(tmp_path, state):
+    path = tmp_path / 'records.jsonl'
+    emitter = plugins.RecordEmitter(str(path))
+    emitter.on_start(state)
+    emitter.on_iteration(state)
+    emitter.on_iteration(state)
+    state.best = Solution.from_nodes(state.graph, [3, 2, 1, 0])
+    emitter.on_iteration(state)
+    emitter.on_finish(state)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['iteration'] for line in lines] == [1]
+    assert lines[0]['tour'] == [0, 1, 2, 3]
+    assert lines[0]['cost'] == 4
+
+
+def test_record_emitter_writes_to_unix_socket(tmp_path, state):
+    path = str(tmp_path / 'sink.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+    emitter = plugins.RecordEmitter(f'unix:{path}')
+    emitter.on_start(state)
+    conn, __ = server.accept()
+    emitter.on_iteration(state)
+    emitter.on_finish(state)
+    with conn, server:
+        data = conn.makefile().readline()
+    assert json.loads(data)['tour'] == [0, 1, 2, 3]
+
+
+def test_darwin_buckets_bound_distinct_values(state):
+    state.ants = [FastAnt() for __ in range(50)]
+    state.best.ant = state.ants[0]
+    darwin = plugins.Darwin(sigma=1, step=.25, buckets=3)
+    darwin.on_start(state)
+    darwin.on_iteration(state)
+    pairs = {(ant.alpha, ant.beta) for ant in state.ants}
+    assert len(pairs) <= 3
+    assert all((a * 4).is_integer() for a, __ in pairs if a > .01)
+
+
+def test_metrics_exporter_writes_openmetrics(state, tmp_path):
+    path = tmp_path / 'acopy.prom'
+    exporter = plugins.MetricsExporter(str(path))
+    exporter.on_start(state)
+    state.solutions = [state.record, state.record]
+    state.timings['find_solutions'] += 2
+    exporter.on_iteration(state)
+    exporter.on_finish(state)
+    lines = path.read_text().splitlines()
+    assert '# TYPE acopy_iterations counter' in lines
+    assert 'acopy_iterations_total 1' in lines
+    assert 'acopy_running 0' in lines
+    assert 'acopy_record_cost 4' in lines
+    assert 'acopy_unique_solutions 1' in lines
+    assert 'acopy_phase_seconds_total{phase="find_solutions"} 2' in lines
+    assert 'acopy_pheromone{stat="mean"} 1.0' in lines
+    assert lines[-1] == '# EOF'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_metrics_exporter_limits_write_rate(state, tmp_path):
+    path = tmp_path / 'acopy.prom'
+    exporter = plugins.MetricsExporter(str(path), interval=60)
+    exporter.on_start(state)
+    path.unlink()
+    exporter.on_iteration(state)
+    assert not path.exists()
+
+
+def test_reporting_thread_stops_when_optimize_is_abandoned(graph, capsys):
+    printout = plugins.Printout()
+    solver = Solver(plugins=[printout])
+    records = solver.optimize(graph, Colony(), limit=10)
+    next(records)
+    assert printout._thread.is_alive()
+    records.close()
+    assert not printout._thread.is_alive()
+    assert capsys.readouterr().out.endswith('\r\n')
+
+
+def test_memory_profiler_samples_components(graph):
+    file = io.StringIO()
+    profiler = plugins.MemoryProfiler(interval=2, file=file)
+    recorder = plugins.StatsRecorder()
+    solver = Solver(plugins=[recorder, profiler])
+    solver.solve(graph, Colony(), gen_size=3, limit=4)
+    samples = [json.loads(line) for line in file.getvalue().splitlines()]
+    assert samples == profiler.samples
+    assert [s['iteration'] for s in samples] == [0, 2, 4]
+    assert 'traced' not in samples[0]
+    assert samples[1]['traced']['StatsRecorder'] > 0
+    assert samples[2]['counts']['StatsRecorder'] > \
+        samples[1]['counts']['StatsRecorder']
+    assert samples[2]['counts']['graph'] == 10
+    assert samples[2]['counts']['pheromone'] == 6
+    assert set(samples[2]['peaks']) == {'find_solutions', 'global_update',
+                                        'plugins'}
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_profiler_keeps_tracing_started_earlier(graph):
+    profiler = plugins.MemoryProfiler(interval=10)
+    tracemalloc.start()
+    try:
+        Solver(plugins=[profiler]).solve(graph, Colony(), limit=3)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert [s['iteration'] for s in profiler.samples] == [0, 3]
+    assert 'traced' in profiler.samples[0]
+
+
+def test_memory_profiler_without_reset_peak(graph, monkeypatch):
+    monkeypatch.delattr(tracemalloc, 'reset_peak', raising=False)
+    profiler = plugins.MemoryProfiler(interval=2)
+    Solver(plugins=[profiler]).solve(graph, Colony(), limit=4)
+    assert [s['iteration'] for s in profiler.samples] == [0, 2, 4]
+    assert profiler.peaks['find_solutions'] > 0
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_profiler_without_tracing(graph):
+    profiler = plugins.MemoryProfiler(interval=1, trace=False)
+    Solver(plugins=[profiler]).solve(graph, Colony(), limit=2)
+    assert len(profiler.samples) == 3
+    assert not any('traced' in s for s in profiler.samples)
+    assert 'Component' in profiler.get_report()
+
+
+def test_cli_memprofile():
+    result = CliRunner().invoke(
+        cli.main, ['demo', '--limit', '2', '--memprofile'])
+    assert result.exit_code == 0
+    assert 'Component' in result.stdout
+    assert json.loads(result.stderr.splitlines()[-1])['iteration'] == 2
+
+
+class Events(plugins.ReportingPlugin):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.events = []
+        self.go = threading.Event()
+        self.go.set()
+
+    def get_snapshot(self, event, state):
+        return self.iteration
+
+    def report(self, event, snapshot):
+        self.go.wait()
+        self.events.append((event, snapshot))
+
+
+def test_reporting_plugin_limits_rate(graph):
+    reporter = Events(interval=60)
+    Solver(plugins=[reporter]).solve(graph, Colony(), limit=20)
+    events = [event for event, __ in reporter.events]
+    assert events[0] == 'start'
+    assert events[-1] == 'finish'
+    assert set(events[1:-1]) == {'record'}
+    assert reporter.events[-1] == ('finish', 20)
+
+
+def test_reporting_plugin_drops_iterations_when_behind(state):
+    reporter = Events(interval=0, maxsize=2)
+    reporter.go.clear()
+    reporter.on_start(state)
+    state.is_new_record = False
+    for __ in range(5):
+        reporter.on_iteration(state)
+    assert reporter.dropped >= 3
+    reporter.go.set()
+    reporter.on_finish(state)
+    assert reporter.events[-1] == ('finish', 5)
+
+
+def test_reporting_plugin_raises_errors_on_finish(state):
+    reporter = Events()
+    reporter.report = lambda event, snapshot: 1 / 0
+    reporter.on_start(state)
+    with pytest.raises(ZeroDivisionError):
+        reporter.on_finish(state)
+
+
+def test_printout_prints_records_with_tours(state, capsys):
+    printout = plugins.Printout(interval=60)
+    printout.initialize(None)
+    state.gen_size, state.colony, state.limit = 4, Colony(), 2
+    printout.on_start(state)
+    state.is_new_record = True
+    printout.on_iteration(state)
+    state.is_new_record = False
+    printout.on_iteration(state)
+    printout.on_finish(state)
+    lines = capsys.readouterr().out.split('\n')
+    assert lines[:2] == ['Using 4 ants from Colony(alpha=1, beta=3)',
+                         'Performing 2 iterations:']
+    assert lines[3].split() == ['1', '4', '0', '1', '2', '3']
+    assert lines[4] == '\r' + '-' * len(lines[3])
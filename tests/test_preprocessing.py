@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+import networkx
+
+from acopy import Colony
+from acopy import Solver
+from acopy import preprocessing
+from acopy.decomposition import euclidean
+from acopy.solvers import Solution
+
+
+@pytest.fixture
+def graph():
+    # two pairs of nearly coincident points on the corners of a square
+    points = {'a': (0, 0), 'b': (0, 1), 'c': (1, 1), 'd': (1, 0),
+              'a2': (0, .01), 'c2': (1, .99)}
+    G = networkx.Graph()
+    for u in points:
+        for v in points:
+            if u < v:
+                G.add_edge(u, v, weight=euclidean(points[u], points[v]))
+    return G
+
+
+def test_collapse_groups_nearby_nodes(graph):
+    reduction = preprocessing.collapse(graph, tolerance=.05)
+    assert reduction.groups == {'a': ['a', 'a2'], 'b': ['b'],
+                                'c': ['c', 'c2'], 'd': ['d']}
+    assert sorted(reduction.graph.nodes) == ['a', 'b', 'c', 'd']
+    assert reduction.removed == 2
+    assert repr(reduction) == 'Reduction(nodes=6, kept=4, removed=2)'
+    assert len(graph) == 6
+
+
+def test_collapse_without_tolerance_keeps_distinct_nodes(graph):
+    graph.add_edge('d2', 'd', weight=0)
+    for node in 'abc':
+        graph.add_edge('d2', node, weight=graph.edges['d', node]['weight'])
+    reduction = preprocessing.collapse(graph)
+    assert reduction.removed == 1
+    assert reduction.groups['d'] == ['d', 'd2']
+
+
+def test_collapse_directed_needs_both_directions():
+    graph = networkx.complete_graph(3, networkx.DiGraph)
+    for u, v in graph.edges:
+        graph.edges[u, v]['weight'] = 5
+    graph.edges[0, 1]['weight'] = 0
+    assert preprocessing.collapse(graph, tolerance=1).removed == 0
+    graph.edges[1, 0]['weight'] = 1
+    assert preprocessing.collapse(graph, tolerance=1).groups[0] == [0, 1]
+
+
+def test_expand_visits_groups_together(graph):
+    reduction = preprocessing.collapse(graph, tolerance=.05)
+    reduced = Solution.from_nodes(reduction.graph, ['a', 'b', 'c', 'd'])
+    solution = reduction.expand(reduced)
+    assert solution.graph is graph
+    assert solution.nodes == ['a', 'a2', 'b', 'c', 'c2', 'd']
+    assert solution.cost == pytest.approx(4)
+
+
+def test_solve_reduced_graph(graph):
+    random.seed(1)
+    reduction = preprocessing.collapse(graph, tolerance=.05)
+    best = Solver().solve(reduction.graph, Colony(), limit=5)
+    assert sorted(reduction.expand(best).nodes) == sorted(graph.nodes)
@@ -83,3 +83,35 @@ def test_solution_path(create_solution, is_closed, answer):
 def test_solution_cost(create_solution, is_closed, answer):
     solution = create_solution(2, 3, is_closed=is_closed)
     assert solution.cost == answer
+
+
+def test_solution_reset_reuses_buffers(create_solution):
+    solution = create_solution(1, 2, 3, is_closed=True)
+    nodes, path = solution.nodes, solution.path
+    solution.reset(4)
+    assert solution.nodes is nodes and solution.path is path
+    assert (solution.nodes, solution.path, solution.cost) == ([4], [], 0)
+    assert 4 in solution and 1 not in solution
+
+
+def test_solution_copy_does_not_share_buffers(create_solution):
+    solution = create_solution(1, 2, 3)
+    copy = solution.copy()
+    solution.reset(4)
+    assert copy.nodes == [1, 2, 3]
+    assert copy.cost == 6
+    assert 2 in copy
+
+
+def test_solution_id_ignores_direction_on_undirected_graphs(graph):
+    forward = Solution.from_nodes(graph, [2, 1, 4, 3])
+    backward = Solution.from_nodes(graph, [3, 4, 1, 2])
+    assert forward.get_id() == backward.get_id() == (1, 2, 3, 4)
+    assert hash(forward) == hash(backward)
+
+
+def test_solution_id_keeps_direction_on_directed_graphs(graph):
+    graph = graph.to_directed()
+    forward = Solution.from_nodes(graph, [1, 2, 3, 4])
+    backward = Solution.from_nodes(graph, [1, 4, 3, 2])
+    assert forward.get_id() != backward.get_id()
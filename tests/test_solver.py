@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import random
+import tracemalloc
+
+import pytest
+import networkx
+
+from acopy import Solver
+from acopy import SolverPlugin
+from acopy.ant import Colony
+from acopy.ant import FastColony
+
+
+class AllocationProbe(SolverPlugin):
+
+    def initialize(self, solver):
+        super().initialize(solver)
+        self.current = []
+        self.transient = []
+
+    def on_iteration(self, state):
+        current, peak = tracemalloc.get_traced_memory()
+        self.current.append(current)
+        self.transient.append(peak - current)
+        tracemalloc.reset_peak()
+
+
+@pytest.fixture
+def graph():
+    random.seed(0)
+    G = networkx.complete_graph(20)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = random.randint(1, 100)
+    return G
+
+
+def trace_allocations(graph, colony, pooled):
+    random.seed(1)
+    probe = AllocationProbe()
+    solver = Solver(pooled=pooled, plugins=[probe])
+    tracemalloc.start()
+    try:
+        solver.solve(graph, colony, gen_size=10, limit=25)
+    finally:
+        tracemalloc.stop()
+    return probe
+
+
+@pytest.mark.skipif(not hasattr(tracemalloc, 'reset_peak'),
+                    reason='requires tracemalloc.reset_peak')
+@pytest.mark.parametrize('colony', [Colony(), FastColony()])
+def test_pooled_solver_allocation_is_flat(graph, colony):
+    pooled = trace_allocations(graph.copy(), colony, pooled=True)
+    fresh = trace_allocations(graph.copy(), colony, pooled=False)
+    assert max(pooled.transient[5:]) * 10 < min(fresh.transient[5:])
+    assert pooled.current[-1] - pooled.current[5] < 16 * 1024
+
+
+def test_pooled_solver_keeps_records_intact(graph):
+    random.seed(2)
+    solver = Solver(pooled=True)
+    records = list(solver.optimize(graph, Colony(), gen_size=10, limit=20))
+    for record in records:
+        assert sorted(record.nodes) == list(graph.nodes)
+        assert record.cost == sum(graph.edges[e]['weight']
+                                  for e in record.path)
+    assert len({id(record) for record in records}) == len(records)
+
+
+class SolutionsProbe(SolverPlugin):
+
+    def initialize(self, solver):
+        super().initialize(solver)
+        self.iterations = []
+
+    def on_iteration(self, state):
+        self.iterations.append((list(state.solutions), list(state.costs),
+                                list(state.ants)))
+
+
+def test_top_only_requires_top():
+    with pytest.raises(ValueError):
+        Solver(top_only=True)
+
+
+@pytest.mark.parametrize('top_only', [False, True])
+def test_top_only_keeps_best_solutions(graph, top_only):
+    random.seed(3)
+    probe = SolutionsProbe()
+    solver = Solver(top=3, top_only=top_only, plugins=[probe])
+    solver.solve(graph, Colony(), gen_size=10, limit=5)
+    for solutions, costs, ants in probe.iterations:
+        assert len(costs) == 10
+        assert len(ants) == 10
+        assert len(set(map(id, ants))) == 10
+        assert [s.ant for s in solutions] == ants[:len(solutions)]
+        assert [s.cost for s in solutions] == sorted(costs)[:len(solutions)]
+        assert len(solutions) == (3 if top_only else 10)
+
+
+def test_top_only_finds_same_top_solutions(graph):
+    found = []
+    for top_only in (False, True):
+        random.seed(4)
+        probe = SolutionsProbe()
+        solver = Solver(top=3, top_only=top_only, plugins=[probe])
+        solver.solve(graph.copy(), Colony(), gen_size=10, limit=1)
+        solutions, __, __ = probe.iterations[0]
+        found.append([s.nodes for s in solutions[:3]])
+    assert found[0] == found[1]
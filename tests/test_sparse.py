@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+import networkx
+
+from acopy import initializers
+from acopy import plugins
+from acopy.sparse import CSRGraph
+from acopy.sparse import CSRPheromoneStore
+from acopy.sparse import SparseAnt
+from acopy.sparse import SparseColony
+from acopy.sparse import SparseSolution
+from acopy.sparse import SparseSolver
+
+
+@pytest.fixture
+def star():
+    # every tour through the hub must pass through it more than once
+    G = networkx.Graph()
+    G.add_edge('hub', 'a', weight=1)
+    G.add_edge('hub', 'b', weight=2)
+    G.add_edge('hub', 'c', weight=3)
+    G.add_edge('a', 'b', weight=5)
+    return CSRGraph.from_graph(G)
+
+
+def test_csr_graph_arrays(star):
+    assert star.nodes == ['hub', 'a', 'b', 'c']
+    assert list(star.indptr) == [0, 3, 5, 7, 8]
+    assert list(star.indices) == [1, 2, 3, 0, 2, 0, 1, 0]
+    assert list(star.weights) == [1, 2, 3, 1, 5, 2, 5, 3]
+    assert len(star.pheromone) == 4
+
+
+def test_csr_graph_shares_pheromone_between_directions(star):
+    forward = star.edges[star.find_slot(0, 3)]
+    backward = star.edges[star.find_slot(3, 0)]
+    assert forward == backward
+
+
+def test_csr_graph_find_slot_when_no_edge(star):
+    assert star.find_slot(1, 3) == -1
+
+
+def test_csr_graph_find_path(star):
+    slots = star.find_path(1, lambda n: n == 3)
+    assert [star.indices[s] for s in slots] == [0, 3]
+
+
+def test_solution_close_through_shortest_path(star):
+    solution = SparseSolution(star, 3)
+    solution.add_node(0)
+    solution.add_node(1)
+    solution.close()
+    assert solution.nodes == [3, 0, 1]
+    assert solution.path == [(3, 0), (0, 1), (1, 0), (0, 3)]
+    assert solution.cost == 8
+    assert solution.get_id() == ('hub', 'a', 'c')
+
+
+def test_ant_repairs_dead_ends(star):
+    for __ in range(20):
+        solution = SparseAnt(repair=True).tour(star)
+        assert sorted(solution.nodes) == [0, 1, 2, 3]
+        assert solution.current == solution.start
+
+
+def test_ant_discards_dead_ends():
+    G = networkx.path_graph(3)
+    graph = CSRGraph.from_graph(G)
+    ant = SparseAnt(repair=False)
+    ant.get_starting_node = lambda graph: 1
+    assert ant.tour(graph) is None
+
+
+def test_solver_solves_sparse_graph():
+    G = networkx.grid_2d_graph(4, 4)
+    solver = SparseSolver()
+    solution = solver.solve(G, SparseColony(), gen_size=8, limit=5)
+    assert sorted(solution.nodes) == list(range(16))
+    assert solution.cost >= 16
+
+
+def test_csr_pheromone_store_shares_levels_between_directions(star):
+    store = CSRPheromoneStore(star)
+    store.reset(1)
+    store.deposit([(0, 3)], 2)
+    assert store.get(3, 0) == 3
+    assert sorted(level for __, level in store.items()) == [1, 1, 1, 3]
+    with pytest.raises(KeyError):
+        store.get(1, 3)
+
+
+def test_csr_graph_compact_arrays():
+    graph = networkx.Graph()
+    graph.add_edge('a', 'b', weight=2)
+    graph.add_edge('b', 'c', weight=3)
+    compact = CSRGraph.from_graph(graph, weight_typecode='i', typecode='f')
+    assert list(compact.weights) == [2, 2, 3, 3]
+    assert compact.pheromone.typecode == 'f'
+    store = CSRPheromoneStore(compact)
+    store.reset(.5)
+    assert store.snapshot().typecode == 'f'
+
+
+def test_sparse_solver_leaves_compiled_graph_alone(star):
+    random.seed(2)
+    solver = SparseSolver()
+    solver.solve(star, SparseColony(), gen_size=4, limit=5)
+    assert set(star.pheromone) == {0}
+
+
+def test_sparse_solver_sets_initial_level(star):
+    levels = []
+
+    class Spy(plugins.SolverPlugin):
+        def on_start(self, state):
+            levels.extend(state.pheromone.levels())
+
+    solver = SparseSolver(init=initializers.Constant(level=2),
+                          plugins=[Spy()])
+    solver.solve(star, SparseColony(), gen_size=4, limit=1)
+    assert set(levels) == {2}
+    assert set(star.pheromone) == {0}
+
+
+@pytest.mark.parametrize('init', [
+    initializers.NearestNeighbor(),
+    initializers.GreedyEdge(),
+    initializers.SeedTours([['hub', 'a', 'b']]),
+])
+def test_sparse_solver_rejects_seed_tours(init):
+    with pytest.raises(ValueError):
+        SparseSolver(init=init)
+
+
+def test_csr_pheromone_store_export(star):
+    store = CSRPheromoneStore(star)
+    store.reset(2)
+    assert set(star.pheromone) == {0}
+    store.export()
+    assert set(star.pheromone) == {2}
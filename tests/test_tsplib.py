@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+import tsplib95
+
+from acopy.sparse import CSRGraph
+from acopy.utils import data
+from acopy.utils import tsplib
+
+
+MATRIX = [
+    [0, 3, 5, 8],
+    [3, 0, 2, 7],
+    [5, 2, 0, 4],
+    [8, 7, 4, 0],
+]
+
+
+def get_coords_text(edge_weight_type, coords):
+    lines = [
+        'NAME: test',
+        'TYPE: TSP',
+        f'DIMENSION: {len(coords)}',
+        f'EDGE_WEIGHT_TYPE: {edge_weight_type}',
+        'NODE_COORD_SECTION',
+    ]
+    lines.extend(f'{i} {x} {y}' for i, (x, y) in enumerate(coords, 1))
+    lines.append('EOF')
+    return '\n'.join(lines) + '\n'
+
+
+def get_explicit_text(edge_weight_format, values):
+    lines = [
+        'NAME: test',
+        'TYPE: TSP',
+        f'DIMENSION: {len(MATRIX)}',
+        'EDGE_WEIGHT_TYPE: EXPLICIT',
+        f'EDGE_WEIGHT_FORMAT: {edge_weight_format}',
+        'EDGE_WEIGHT_SECTION',
+        ' '.join(map(str, values)),
+        'EOF',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture(params=[True, False], ids=['numpy', 'python'])
+def vectorized(request, monkeypatch):
+    if not request.param:
+        monkeypatch.setattr(tsplib, 'numpy', None)
+    elif tsplib.numpy is None:
+        pytest.skip('numpy is not installed')
+    return request.param
+
+
+def random_coords(n, scale=10000):
+    random.seed(0)
+    return [(round(random.uniform(0, scale), 3),
+             round(random.uniform(0, scale), 3)) for __ in range(n)]
+
+
+@pytest.mark.parametrize('edge_weight_type', ['EUC_2D', 'CEIL_2D', 'ATT'])
+def test_distances_match_tsplib95(tmp_path, vectorized, edge_weight_type):
+    path = tmp_path / 'test.tsp'
+    path.write_text(get_coords_text(edge_weight_type, random_coords(40)))
+    problem = tsplib.read(str(path))
+    expected = tsplib95.load(str(path))
+    for i in range(len(problem)):
+        for j in range(len(problem)):
+            if i != j:
+                assert problem.get_weight(i, j) == expected.get_weight(i + 1,
+                                                                       j + 1)
+
+
+def test_geo_distances(vectorized):
+    # Dortmund to Munich and Berlin to Paris, in TSPLIB degrees.minutes
+    coords = [(51.31, 7.28), (48.09, 11.35), (52.31, 13.24), (48.51, 2.21)]
+    problem = tsplib.parse(get_coords_text('GEO', coords))
+    assert problem.get_weight(0, 1) == 478
+    assert problem.get_weight(2, 3) == 879
+    assert problem.get_weight(1, 0) == problem.get_weight(0, 1)
+
+
+def test_vectorized_distances_match(monkeypatch):
+    if tsplib.numpy is None:
+        pytest.skip('numpy is not installed')
+    coords = [(x / 100 - 50, y / 50 - 100) for x, y in random_coords(30)]
+    for edge_weight_type in tsplib.DISTANCE_TYPES:
+        expected = tsplib.get_distances(coords, edge_weight_type)
+        with monkeypatch.context() as m:
+            m.setattr(tsplib, 'numpy', None)
+            assert tsplib.get_distances(coords, edge_weight_type) == expected
+
+
+@pytest.mark.parametrize('edge_weight_format,values', [
+    ('FULL_MATRIX', [w for row in MATRIX for w in row]),
+    ('UPPER_ROW', [3, 5, 8, 2, 7, 4]),
+    ('LOWER_ROW', [3, 5, 2, 8, 7, 4]),
+    ('UPPER_DIAG_ROW', [0, 3, 5, 8, 0, 2, 7, 0, 4, 0]),
+    ('LOWER_DIAG_ROW', [0, 3, 0, 5, 2, 0, 8, 7, 4, 0]),
+])
+def test_explicit_weights(edge_weight_format, values):
+    problem = tsplib.parse(get_explicit_text(edge_weight_format, values))
+    assert problem.nodes == [0, 1, 2, 3]
+    assert list(problem.weights) == [w for row in MATRIX for w in row]
+    assert problem.coords is None
+
+
+def test_unsupported_problem():
+    text = get_coords_text('MAN_2D', random_coords(5))
+    with pytest.raises(ValueError):
+        tsplib.parse(text)
+
+
+def test_get_graph():
+    problem = tsplib.parse(get_explicit_text('UPPER_ROW', [3, 5, 8, 2, 7, 4]))
+    graph = problem.get_graph()
+    assert graph.number_of_edges() == 6
+    assert graph.edges[3, 1]['weight'] == 7
+    assert graph.graph['name'] == 'test'
+
+
+def test_get_csr_graph(vectorized):
+    problem = tsplib.parse(get_coords_text('EUC_2D', random_coords(12)))
+    graph = problem.get_csr_graph(typecode='f')
+    expected = CSRGraph.from_graph(problem.get_graph(), weight_typecode='i')
+    assert graph.nodes == expected.nodes
+    assert graph.indptr == expected.indptr
+    assert graph.indices == expected.indices
+    assert graph.weights == expected.weights
+    assert len(graph.pheromone) == len(expected.pheromone)
+    assert graph.pheromone.typecode == 'f'
+    for u in range(len(graph)):
+        for slot in graph.neighbors(u):
+            v = graph.indices[slot]
+            assert graph.edges[slot] == graph.edges[graph.find_slot(v, u)]
+    assert sorted(set(graph.edges)) == list(range(len(graph.pheromone)))
+
+
+def test_get_points():
+    coords = random_coords(5)
+    problem = tsplib.parse(get_coords_text('EUC_2D', coords))
+    assert problem.get_points() == dict(enumerate(coords, 1))
+
+
+def test_read_tsplib95_falls_back(tmp_path):
+    path = tmp_path / 'test.tsp'
+    path.write_text(get_coords_text('MAN_2D', random_coords(5)))
+    graph = data.read_tsplib95(str(path))
+    assert len(graph) == 5
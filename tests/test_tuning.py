@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from acopy import cli
+from acopy import tuning
+
+
+def test_rank_with_ties():
+    assert tuning.rank([3, 1, 3, 2]) == [3.5, 1, 3.5, 2]
+
+
+@pytest.mark.parametrize('x,df,p', [
+    (3.841459, 1, .05),
+    (18.307038, 10, .05),
+    (0, 3, 1),
+])
+def test_chi2_sf(x, df, p):
+    assert tuning._chi2_sf(x, df) == pytest.approx(p, abs=1e-6)
+
+
+@pytest.mark.parametrize('p,df,t', [
+    (.975, 1, 12.706205),
+    (.975, 10, 2.228139),
+    (.5, 5, 0),
+])
+def test_t_ppf(p, df, t):
+    assert tuning._t_ppf(p, df) == pytest.approx(t, abs=1e-5)
+
+
+def test_friedman_keeps_everyone_without_difference():
+    blocks = [[1, 2, 3], [3, 2, 1], [2, 3, 1], [1, 3, 2], [2, 1, 3]]
+    assert tuning.friedman(blocks) == [0, 1, 2]
+
+
+def test_friedman_eliminates_worse_candidates():
+    blocks = [[1, 2, 5, 6], [2, 1, 6, 5], [1, 2, 5, 6], [1, 2, 6, 5],
+              [2, 1, 5, 6], [1, 2, 6, 5]]
+    assert tuning.friedman(blocks) == [0, 1]
+
+
+def test_get_candidates():
+    candidates = tuning.get_candidates({'alpha': [1, 2], 'beta': [3, 4]})
+    assert len(candidates) == 4
+    assert {'alpha': 2, 'beta': 3} in candidates
+
+
+def test_get_candidates_samples_at_most_count():
+    space = {'alpha': [1, 2, 3], 'beta': [3, 4]}
+    assert len(tuning.get_candidates(space, count=2)) == 2
+
+
+@pytest.fixture
+def path(tmp_path):
+    graph = {u: {v: {'weight': abs(u - v)} for v in range(5) if v != u}
+             for u in range(5)}
+    path = tmp_path / 'graph.json'
+    path.write_text(json.dumps(graph))
+    return path
+
+
+def test_race(path):
+    candidates = [{'beta': 3}, {'beta': 1, 'rho': .5}]
+    steps = list(tuning.race(candidates, [str(path)], 'json', limit=2,
+                             budget=6, seed='x', workers=2))
+    assert len(steps) == 3
+    assert all(c in candidates for c, __ in steps[-1])
+
+
+def test_race_requires_one_solve_per_candidate(path):
+    race = tuning.race([{'beta': 3}, {'beta': 1}], [str(path)], 'json',
+                       budget=1)
+    with pytest.raises(ValueError):
+        next(race)
+
+
+def test_cli_tune_rejects_too_small_budget(path):
+    result = CliRunner().invoke(cli.main, ['tune', str(path), '--beta', '1,3',
+                                           '--budget', '1'])
+    assert result.exit_code == 2
+    assert '--budget must allow one solve' in result.output
+
+
+def test_cli_loads_config(tmp_path):
+    config = tmp_path / 'acopy.json'
+    tuning.save_config({'rho': .5, 'q': 2.0}, str(config))
+    runner = CliRunner()
+    result = runner.invoke(cli.main, ['demo', '--config', str(config),
+                                      '--limit', '1'])
+    assert result.exit_code == 0
+    assert 'Solver(rho=0.5, q=2.0' in result.output
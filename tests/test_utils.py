@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+from acopy.utils import IndexedSet
+from acopy.utils.plot import Downsampler
+from acopy.utils.plot import Plotter
+
+
+def test_indexed_set_pop_moves_last_item():
+    items = IndexedSet('abcd')
+    assert items.pop(1) == 'b'
+    assert list(items) == ['a', 'd', 'c']
+    assert items.positions == {'a': 0, 'd': 1, 'c': 2}
+
+
+def test_indexed_set_remove():
+    items = IndexedSet('abc')
+    items.remove('c')
+    items.remove('a')
+    assert list(items) == ['b']
+    assert 'a' not in items
+
+
+def test_downsampler_merges_buckets_to_bound_size():
+    series = Downsampler(size=4)
+    series.extend(range(100))
+    assert len(series) == 100
+    assert series.width == 16
+    assert len(series.buckets) == 7
+    xs, lows, highs, means = series.summary()
+    assert (xs[0], lows[0], highs[0], means[0]) == (7.5, 0, 15, 7.5)
+    assert (xs[-1], lows[-1], highs[-1], means[-1]) == (97.5, 96, 99, 97.5)
+
+
+def test_downsampler_skips_missing_values():
+    series = Downsampler(size=4)
+    series.extend([None, 1, 3])
+    xs, lows, highs, means = series.summary()
+    assert (lows, highs, means) == ([1, 3], [1, 3], [1, 3])
+    assert xs == [1, 2]
+
+
+def test_plotter_summarises_new_stats_in_chunks():
+    stats = {
+        'pheromone_levels': [[1, 2, 3]] * 5,
+        'solutions': [{'best': i, 'worst': i, 'avg': i, 'global_best': i}
+                      for i in range(5)],
+    }
+    plotter = Plotter(stats, size=2, chunk_size=2)
+    plotter.update()
+    stats['pheromone_levels'].append([0, 10])
+    plotter.update()
+    levels = plotter.series['pheromone_levels']['levels']
+    assert len(levels) == 6
+    xs, lows, highs, means = levels.summary()
+    assert min(lows) == 0 and max(highs) == 10
+    assert len(plotter.series['solutions']['best']) == 5
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+import networkx
+
+from acopy import Colony
+
+numpy = pytest.importorskip('numpy')
+vectorized = pytest.importorskip('acopy.vectorized')
+
+
+def line(n, directed=False):
+    # the best tour goes out along the line and straight back
+    G = networkx.complete_graph(n, networkx.DiGraph if directed else None)
+    for u, v in G.edges:
+        G.edges[u, v]['weight'] = abs(u - v)
+    return G
+
+
+def test_stacked_graphs_pad_weights():
+    G = networkx.Graph()
+    G.add_edge('a', 'b', weight=2)
+    G.add_edge('b', 'c')
+    stack = vectorized.StackedGraphs([line(4), G])
+    assert stack.weights.shape == (2, 4, 4)
+    assert list(stack.sizes) == [4, 3]
+    assert stack.weights[0, 3, 1] == 2
+    assert stack.weights[1, 1, 0] == 2
+    assert stack.weights[1, 2, 1] == 1
+    assert not stack.edges[1, 0, 2]
+    assert not stack.edges[1, 3].any()
+    assert not stack.edges[0].diagonal().any()
+
+
+def test_solve_finds_best_tours_in_order():
+    random.seed(3)
+    graphs = [line(8), line(4), line(6, directed=True), line(5)]
+    solver = vectorized.VectorizedSolver(rho=.1, top=3)
+    solutions = solver.solve(graphs, Colony(), gen_size=20, limit=50,
+                             batch_size=3)
+    assert [len(s.nodes) for s in solutions] == [8, 4, 6, 5]
+    assert [s.cost for s in solutions] == [14, 6, 10, 8]
+    assert all(s.graph is g for s, g in zip(solutions, graphs))
+
+
+def test_solve_is_repeatable():
+    graphs = [line(7), line(9)]
+    results = []
+    for __ in range(2):
+        random.seed(4)
+        solutions = vectorized.VectorizedSolver().solve(
+            graphs, Colony(beta=1), gen_size=3, limit=2)
+        results.append([s.nodes for s in solutions])
+    assert results[0] == results[1]
+
+
+def test_solve_without_a_tour():
+    star = networkx.star_graph(3)
+    solutions = vectorized.VectorizedSolver().solve([star, line(3)],
+                                                    Colony(), limit=2)
+    assert solutions[0] is None
+    assert solutions[1].cost == 4
+
+
+def test_global_update_deposits_both_directions():
+    stack = vectorized.StackedGraphs([line(3), line(3, directed=True)])
+    pheromone = numpy.ones((2, 3, 3))
+    tours = numpy.array([[[0, 1, 2]], [[0, 1, 2]]])
+    costs = numpy.array([[4.0], [4.0]])
+    vectorized.VectorizedSolver(rho=.5, q=2).global_update(
+        stack, pheromone, tours, costs)
+    assert pheromone[0, 0, 1] == pheromone[0, 1, 0] == 1
+    assert pheromone[1, 0, 1] == 1
+    assert pheromone[1, 1, 0] == .5